@@ -1,16 +1,25 @@
 import sys
 import os
 import json
-import importlib
-import pkgutil
+import time
+import atexit
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
 from typing import Optional, List, Dict
-from fastapi import FastAPI, HTTPException
+
+# Start the --profile-startup timer before the heavy imports below
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+from startup_profiler import add_profile_argument, startup_profiler
+
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-import ollama 
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict
 import uvicorn
 
+startup_profiler.mark("imports")
+
 # --- SETUP & LOGGING ---
 # (Keeping your existing logging setup)
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -22,7 +31,43 @@ except ImportError:
     logging.basicConfig(level=logging.INFO) # Basic logging if logging_utils is not found
     logger = logging.getLogger("aistudyroom_api") # Fallback
 
-app = FastAPI(title="AI Study Room API")
+startup_profiler.mark("logger_setup")
+
+# Shared helpers (ollama_client, ...) live next to the domain modules (models/ is on sys.path above)
+from ollama_client import close_async_client, running_models, chat_stream as ollama_chat_stream, \
+    generate_stream as ollama_generate_stream
+from admission import INTERACTIVE, get_admission
+from model_residency import analysis_models, get_residency
+from model_catalog import get_model_catalog
+from metrics import render_metrics
+from chat_sessions import get_chat_sessions, to_prompt
+from domain_proxy import RouterChatRequest, close_domain_proxy, get_domain_proxy
+from domain_classifier import MIN_EVIDENCE, get_classifier
+from shared_cache import create_segment, get_shared_cache
+from analysis_cache import get_analysis_cache, get_single_flight
+from verdict_cache import get_verdict_cache
+from model_discovery import (MODELS_HOT_RELOAD, LazyAnalysisService, ModelsWatcher, ModuleMetadata, apply_engine_sources,
+                             discover_modules, engine_stamps, load_engine_sources, prune_service_modules, warm_up)
+from analysis_stream import error_event, get_stream_flights, to_ndjson
+
+startup_profiler.mark("helper_imports")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Here rather than at import, so a --workers parent (which only spawns the workers) skips it
+    load_models()
+    warm_up_analysis_services()
+    preload_models()
+    start_models_watcher()
+    yield
+    # Domain analyzers share this process's async Ollama client
+    if models_watcher is not None:
+        await models_watcher.stop()
+    await get_model_catalog().stop()
+    await close_domain_proxy()
+    await close_async_client()
+
+app = FastAPI(title="AI Study Room API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,15 +75,70 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Chat-Session"],
 )
 
 # --- 1. DYNAMIC TUTOR LOADING LOGIC ---
 MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
 AVAILABLE_TUTORS = {}
 AVAILABLE_ANALYSIS_SERVICES = {}
+# Last good parse of each module file, reused while an edited file does not parse
+MODULE_METADATA = {}
+# Stamps of domain_specs.py / analysis_engine.py the current services were built from
+ENGINE_STAMPS = {}
+
+ANALYSIS_WARMUP = os.environ.get("ANALYSIS_WARMUP", "0") == "1"
+
+GATEWAY_PORT = int(os.environ.get("GATEWAY_PORT", "8019"))
+# Worker processes for `python main.py`; more than one shares a cache segment (shared_cache.py)
+# and splits the per-model Ollama limits between them (admission.py)
+GATEWAY_WORKERS = int(os.environ.get("GATEWAY_WORKERS", "1"))
+# Tutor list as published to the shared segment, so every worker serves the same bytes
+TUTORS_CACHE_KEY = "registry:tutors"
+TUTORS_CACHE_TTL = 365 * 24 * 3600
+
+def build_registry(previous_services: Optional[Dict[str, LazyAnalysisService]] = None, version: int = 0,
+                   previous_metadata: Optional[Dict[str, ModuleMetadata]] = None,
+                   errors: Optional[Dict[str, str]] = None):
+    """Scan the /models directory into fresh (tutors, analysis services, metadata by path) dicts.
+
+    Services whose file is unchanged since `previous_services` are carried over as they are
+    (pass None to rebuild them all); new or edited ones get a LazyAnalysisService tagged with
+    `version`. Files that cannot be parsed are skipped (or keep their entry from
+    `previous_metadata`) and listed in `errors`.
+    """
+    previous_services = previous_services or {}
+    tutors, services = {}, {}
+    modules = discover_modules(MODELS_DIR, previous_metadata, errors)
+    for metadata in modules:
+        try:
+            # Load MODEL_CONFIG for chat tutors
+            if metadata.model_config:
+                config = metadata.model_config
+                tutors[config["id"]] = config
+                logger.info(f"✅ Loaded Tutor Config: {config['display_name']} ({metadata.path})")
+
+            # Register analyze_text for analysis services, e.g. 'Art_Style' -> 'art_style', 'UI-UX_Design' -> 'ui_ux_design'
+            if metadata.has_analyze_text:
+                analysis_id = metadata.name.lower().replace("-", "_")
+                previous = previous_services.get(analysis_id)
+                if previous is not None and previous.path == metadata.path and previous.mtime_ns == metadata.mtime_ns:
+                    services[analysis_id] = previous
+                    continue
+                services[analysis_id] = LazyAnalysisService(analysis_id, metadata.path, metadata.mtime_ns, version)
+                logger.info(f"✅ Registered Analysis Service: {analysis_id} ({metadata.path})")
+
+        except Exception as e:
+            logger.error(f"❌ Failed to load model {metadata.name}: {str(e)}")
+    return tutors, services, {metadata.path: metadata for metadata in modules}
 
 def load_models():
-    """Scans the /models directory and loads all valid tutor configurations and analysis services."""
+    """Scans the /models directory and registers all tutor configurations and analysis services.
+
+    Modules are not executed here: MODEL_CONFIG is read from the source and analysis
+    modules are imported on their first request (or by the optional warm-up).
+    """
+    global AVAILABLE_TUTORS, AVAILABLE_ANALYSIS_SERVICES, MODULE_METADATA, ENGINE_STAMPS
     logger.info(f"📂 Loading models from {MODELS_DIR}...")
     
     # Ensure the directory exists
@@ -46,55 +146,116 @@ def load_models():
         logger.warning(f"⚠️ Models directory not found at {MODELS_DIR}")
         return
 
-    # Add to path so we can import them
-    # Ensure that `models` directory itself is in sys.path
-    models_parent_dir = os.path.dirname(MODELS_DIR)
-    if models_parent_dir not in sys.path:
-        sys.path.append(models_parent_dir)
-
-    for _, name, ispkg in pkgutil.iter_modules([MODELS_DIR]):
+    ENGINE_STAMPS = engine_stamps(MODELS_DIR)
+    AVAILABLE_TUTORS, AVAILABLE_ANALYSIS_SERVICES, MODULE_METADATA = build_registry()
+    publish_tutors()
+
+def publish_tutors():
+    """Store the tutor list in the shared cache segment (multi-worker gateways only)."""
+    shared = get_shared_cache()
+    if shared is not None:
+        shared.set(TUTORS_CACHE_KEY, list(AVAILABLE_TUTORS.values()), TUTORS_CACHE_TTL)
+
+# --- HOT RELOAD ---
+# Edits under models/ are picked up without a restart. The new registry is built
+# (and services that were in use are imported) on a worker thread, then both dicts
+# are swapped in with one assignment. Requests resolve their service when they start,
+# so in-flight ones finish on the old version.
+REGISTRY_VERSION = 0
+LAST_RELOAD: Optional[dict] = None
+_reload_lock = asyncio.Lock()
+
+def _diff(old: dict, new: dict) -> dict:
+    return {
+        "added": sorted(new.keys() - old.keys()),
+        "removed": sorted(old.keys() - new.keys()),
+        "changed": sorted(k for k in new.keys() & old.keys() if new[k] is not old[k] and new[k] != old[k]),
+    }
+
+async def reload_models() -> dict:
+    """Rebuild the registry from models/ and swap it in; returns a timing report."""
+    global AVAILABLE_TUTORS, AVAILABLE_ANALYSIS_SERVICES, MODULE_METADATA, ENGINE_STAMPS, REGISTRY_VERSION, LAST_RELOAD
+    async with _reload_lock:
+        started = time.perf_counter()
+        version = REGISTRY_VERSION + 1
+        report = {"version": version, "errors": {}}
+        stamps = engine_stamps(MODELS_DIR)
+        engine_changes = sorted(os.path.basename(p) for p in stamps.keys() | ENGINE_STAMPS.keys()
+                                if stamps.get(p) != ENGINE_STAMPS.get(p))
+        report["engine"] = engine_changes
         try:
-            # For directories like 'Art_Style', 'Biology', etc.
-            if ispkg: # Treat as a package if it's a directory
-                module_path = f"models.{name}.main" # Assume main.py inside each domain folder
-                module = importlib.import_module(module_path)
-                
-                # Load MODEL_CONFIG for chat tutors
-                if hasattr(module, "MODEL_CONFIG"):
-                    config = module.MODEL_CONFIG
-                    AVAILABLE_TUTORS[config["id"]] = config
-                    logger.info(f"✅ Loaded Tutor Config: {config['display_name']} ({module_path}.py)")
-
-                # Load analyze_text function for analysis services
-                if hasattr(module, "analyze_text"):
-                    # Use a consistent ID for analysis services, e.g., 'art_style', 'cybersecurity'
-                    # Convert 'Art_Style' to 'art_style'
-                    analysis_id = name.lower() 
-                    AVAILABLE_ANALYSIS_SERVICES[analysis_id] = module.analyze_text
-                    logger.info(f"✅ Loaded Analysis Service: {analysis_id} ({module_path}.py)")
-
-            # For individual .py files directly in models/ (e.g., general.py, math.py)
-            else: 
-                module_path = f"models.{name}"
-                module = importlib.import_module(module_path)
-
-                # Load MODEL_CONFIG for chat tutors
-                if hasattr(module, "MODEL_CONFIG"):
-                    config = module.MODEL_CONFIG
-                    AVAILABLE_TUTORS[config["id"]] = config
-                    logger.info(f"✅ Loaded Tutor Config: {config['display_name']} ({module_path}.py)")
-
-                # Load analyze_text function for analysis services
-                if hasattr(module, "analyze_text"):
-                    analysis_id = name.lower()
-                    AVAILABLE_ANALYSIS_SERVICES[analysis_id] = module.analyze_text
-                    logger.info(f"✅ Loaded Analysis Service: {analysis_id} ({module_path}.py)")
-
+            if engine_changes:
+                # Every service is built from these: swap in the new specs/engine and rebuild them all
+                apply_engine_sources(await asyncio.to_thread(load_engine_sources, MODELS_DIR, engine_changes))
+                ENGINE_STAMPS = stamps
+            # A file saved half-way with a syntax error keeps its last good version (see discover_modules)
+            tutors, services, metadata = await asyncio.to_thread(
+                build_registry, None if engine_changes else AVAILABLE_ANALYSIS_SERVICES, version,
+                MODULE_METADATA, report["errors"]
+            )
         except Exception as e:
-            logger.error(f"❌ Failed to load model {name}: {str(e)}")
-
-# Initialize on startup
-load_models()
+            # Anything else (e.g. a broken domain_specs.py): keep serving the current registry
+            report.update(errors={"registry": str(e)}, swapped=False, seconds=round(time.perf_counter() - started, 3))
+            logger.error(f"❌ Model reload failed, keeping version {REGISTRY_VERSION}: {str(e)}")
+            LAST_RELOAD = report
+            return report
+
+        # Import new versions of services that were already loaded, so the swap never hands out a cold
+        # or broken module; a service that fails to import keeps its previous version
+        for analysis_id, service in services.items():
+            previous = AVAILABLE_ANALYSIS_SERVICES.get(analysis_id)
+            if service is not previous and previous is not None and previous.loaded:
+                try:
+                    await asyncio.to_thread(service.load)
+                except Exception as e:
+                    report["errors"][analysis_id] = str(e)
+                    services[analysis_id] = previous
+                    logger.error(f"❌ Failed to reload {analysis_id}, keeping the previous version: {str(e)}")
+
+        tutor_changes = _diff(AVAILABLE_TUTORS, tutors)
+        service_changes = _diff(AVAILABLE_ANALYSIS_SERVICES, services)
+        AVAILABLE_TUTORS, AVAILABLE_ANALYSIS_SERVICES, MODULE_METADATA = tutors, services, metadata
+        prune_service_modules(services.values())
+        publish_tutors()
+        REGISTRY_VERSION = version
+        report.update(tutors=tutor_changes, services=service_changes, swapped=True,
+                      seconds=round(time.perf_counter() - started, 3))
+        LAST_RELOAD = report
+        logger.info(f"🔄 Reloaded models (version {version}) in {report['seconds'] * 1000:.0f} ms: "
+                    f"tutors {tutor_changes}, services {service_changes}")
+
+        new_models = [tutors[t].get("ollama_model") for t in tutor_changes["added"] + tutor_changes["changed"]]
+        get_residency().start_preload(m for m in new_models if m)
+        return report
+
+models_watcher: Optional[ModelsWatcher] = None
+
+startup_profiler.mark("app_construction")
+
+def warm_up_analysis_services():
+    # Optional: import analysis modules in the background so first requests don't pay for it
+    if ANALYSIS_WARMUP:
+        warm_up(
+            AVAILABLE_ANALYSIS_SERVICES.values(),
+            on_error=lambda service, e: logger.error(f"❌ Failed to warm up {service.analysis_id}: {str(e)}"),
+        )
+
+def preload_models():
+    # Load the tutor models and the analyzer models into Ollama before the first request needs them
+    tutor_models = [config["ollama_model"] for config in AVAILABLE_TUTORS.values() if config.get("ollama_model")]
+    get_residency().start_preload(tutor_models + analysis_models())
+    get_model_catalog().start()
+
+def helper_paths():
+    """models/ files that are neither tutors nor analysis services; edits to them need a restart."""
+    return {path for path, m in MODULE_METADATA.items() if not m.model_config and not m.has_analyze_text}
+
+def start_models_watcher():
+    # Pick up added/edited/removed modules under models/ without a restart
+    global models_watcher
+    if MODELS_HOT_RELOAD and os.path.exists(MODELS_DIR):
+        models_watcher = ModelsWatcher(MODELS_DIR, reload_models, helpers=helper_paths)
+        models_watcher.start()
 
 
 # --- 2. DATA MODELS ---
@@ -107,6 +268,8 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     messages: List[ChatMessage]
     tutor_id: str # The frontend sends 'math_solver', 'code_expert', etc.
+    # "" starts a server-side session; send back the X-Chat-Session id from then on
+    session_id: Optional[str] = None
 
 # For your existing Document Analysis (Keeping this intact)
 class Context(BaseModel):
@@ -119,15 +282,18 @@ class TextRequest(BaseModel):
     queryType: Optional[str] = "cybersecurity"
     model_size: Optional[str] = "8b"
     advanced_analysis: Optional[bool] = False
+    single_pass: Optional[bool] = False
     domain: Optional[str] = None
     context: Optional[Context] = None
 
 class AnalysisResponse(BaseModel):
+    # Each domain reports its own flag (is_biology_domain, is_finance_domain, ...)
+    model_config = ConfigDict(extra="allow")
+
     summary: str
     roadmap: str
     key_concepts: Optional[list] = None
     difficulty_level: Optional[str] = None
-    is_cybersecurity_domain: bool
     domain_confidence: float
 
 
@@ -136,6 +302,10 @@ class AnalysisResponse(BaseModel):
 @app.get("/api/tutors")
 def get_tutors():
     """Returns the list of available tutor profiles to the frontend."""
+    shared = get_shared_cache()
+    encoded = shared.get_bytes(TUTORS_CACHE_KEY) if shared is not None else None
+    if encoded is not None:
+        return Response(content=encoded, media_type="application/json")
     return list(AVAILABLE_TUTORS.values())
 
 @app.post("/api/chat")
@@ -163,15 +333,24 @@ async def chat_stream(request: ChatRequest):
     user_messages = [msg.dict() for msg in request.messages]
     final_messages = [system_message] + user_messages
 
-    # 3. Stream Response
+    # Fail fast with 429 + Retry-After instead of opening a stream that would only queue
+    get_admission().check(tutor_config['ollama_model'], INTERACTIVE)
+
+    if request.session_id is not None:
+        session = get_chat_sessions().open(request.session_id, tutor_config['ollama_model'], tutor_config['system_prompt'])
+        return StreamingResponse(
+            session_chunks(session, tutor_config, user_messages), media_type="application/x-ndjson",
+            headers={"X-Chat-Session": session.session_id},
+        )
+
+    # 3. Stream Response (async client: other chats keep streaming between our tokens)
     async def generate_chunks():
         try:
-            stream = ollama.chat(
+            stream = ollama_chat_stream(
                 model=tutor_config['ollama_model'],
-                messages=final_messages,
-                stream=True
+                messages=final_messages
             )
-            for chunk in stream:
+            async for chunk in stream:
                 content = chunk.get('message', {}).get('content', '')
                 if content:
                     # Send as JSON string for easy parsing on frontend
@@ -183,6 +362,66 @@ async def chat_stream(request: ChatRequest):
 
     return StreamingResponse(generate_chunks(), media_type="application/x-ndjson")
 
+async def session_chunks(session, tutor_config: dict, messages: List[dict]):
+    """Stream one turn of a server-side session, prefilling only the messages Ollama has not seen."""
+    sessions = get_chat_sessions()
+    # One turn at a time per session: each turn continues the context the previous one returned
+    async with session.lock:
+        new_messages = sessions.begin_turn(session, messages)
+        options = {"model": tutor_config['ollama_model'], "prompt": to_prompt(new_messages)}
+        if session.context:
+            # The system prompt is already part of the context
+            options["context"] = list(session.context)
+        else:
+            options["system"] = tutor_config['system_prompt']
+        reply, context = [], None
+        try:
+            async for chunk in ollama_generate_stream(priority=INTERACTIVE, **options):
+                content = chunk.get('response', '')
+                if content:
+                    reply.append(content)
+                    yield json.dumps({"text": content}) + "\n"
+                if chunk.get('done'):
+                    context = chunk.get('context')
+        except Exception as e:
+            error_msg = f"Error with Ollama model '{tutor_config['ollama_model']}': {str(e)}"
+            logger.error(error_msg)
+            yield json.dumps({"error": error_msg}) + "\n"
+            return
+        sessions.finish_turn(session, messages, "".join(reply), context)
+
+@app.get("/api/chat/sessions")
+async def chat_sessions_stats():
+    """Live chat sessions, their memory use and how many prompt tokens resuming them saved."""
+    return get_chat_sessions().stats()
+
+@app.delete("/api/chat/sessions/{session_id}")
+async def end_chat_session(session_id: str):
+    """Forget a session's history and context (e.g. when the chat is closed)."""
+    if not get_chat_sessions().discard(session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return {"status": "deleted", "session_id": session_id}
+
+
+# --- 3b. PROXY TO REMOTE DOMAIN SERVERS (replaces the Node main-router hop) ---
+
+# Request headers passed on to domain servers
+PROXIED_REQUEST_HEADERS = ("content-type", "accept", "if-none-match")
+
+@app.post("/api/domain-chat")
+async def domain_chat(request: RouterChatRequest):
+    """main-router.mjs's /api/chat: the chat's last message is analyzed by the tutor_id domain server."""
+    logger.info(f"🔀 Proxying chat for domain: {request.tutor_id}")
+    return await get_domain_proxy().chat(request)
+
+@app.api_route("/proxy/{domain}/{path:path}", methods=["GET", "POST"])
+async def proxy_domain(domain: str, path: str, request: Request):
+    """Forward a request to a domain server unchanged, e.g. POST /proxy/biology/analyze/stream."""
+    if request.url.query:
+        path = f"{path}?{request.url.query}"
+    headers = {k: v for k, v in request.headers.items() if k in PROXIED_REQUEST_HEADERS}
+    return await get_domain_proxy().forward(domain, path, request.stream(), headers, method=request.method)
+
 
 # --- 4. EXISTING API ENDPOINTS (DOCUMENT ANALYSIS) ---
 
@@ -190,6 +429,50 @@ async def chat_stream(request: ChatRequest):
 async def root():
     return {"message": "AI Study Room API is running (Tutor + Analysis)"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the /analyze response cache, the domain verdict cache and request coalescing,
+    plus the age of the /models snapshot."""
+    return {
+        **get_analysis_cache().stats(),
+        "domain_verdicts": get_verdict_cache().stats(),
+        "coalescing": {"analyses": get_single_flight().stats(), "streams": get_stream_flights().stats()},
+        "model_catalog": get_model_catalog().stats(),
+    }
+
+@app.get("/queue/stats")
+async def queue_stats():
+    """Per-model slots in use, waiting requests and rejections from admission control."""
+    return get_admission().stats()
+
+@app.get("/models")
+async def list_models(if_none_match: Optional[str] = Header(None)):
+    """Models pulled in Ollama, answered from the catalog snapshot (ETag / If-None-Match aware)."""
+    return await get_model_catalog().response(if_none_match)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics for this process (the in-process analyzers report here too).
+
+    With --workers N each worker answers for itself, labelled worker="<pid>" (metrics.py).
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/models/reload")
+async def reload_status():
+    """Current registry version and the report of the last hot reload."""
+    return {"version": REGISTRY_VERSION, "hot_reload": MODELS_HOT_RELOAD, "last_reload": LAST_RELOAD}
+
+@app.post("/models/reload")
+async def reload_now():
+    """Rescan models/ now instead of waiting for the watcher."""
+    return await reload_models()
+
+@app.get("/models/residency")
+async def model_residency():
+    """Load state and keep_alive of each model, plus what Ollama reports as loaded."""
+    return {"models": get_residency().state(), "ollama_loaded": await running_models()}
+
 # (Existing /analyze logic condensed for brevity - keeping your original logic)
 def is_cybersecurity_related(text: str) -> tuple[bool, float]:
     # Placeholder for your existing helper function logic
@@ -197,25 +480,67 @@ def is_cybersecurity_related(text: str) -> tuple[bool, float]:
     # For now, a dummy implementation:
     return "cybersecurity" in text.lower(), 0.9 if "cybersecurity" in text.lower() else 0.1
 
-@app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_text(request: TextRequest):
-    logger.info(f"Received analysis request for domain: {request.domain}")
+# Candidates returned with an auto-routed analysis
+AUTO_ROUTE_CANDIDATES = 3
+
+def auto_route(text: str):
+    """Score `text` against every loaded analysis service at once; returns (domain_id, top candidates).
 
-    domain_id = request.domain.lower().replace(" ", "_").replace("-", "_") if request.domain else "general"
+    Falls back to general when no domain vocabulary matches.
+    """
+    ranking = [(d, s) for d, s in get_classifier().rank(text) if d in AVAILABLE_ANALYSIS_SERVICES]
+    candidates = [{"domain": d, "score": round(s, 3)} for d, s in ranking[:AUTO_ROUTE_CANDIDATES]]
+    if ranking and ranking[0][1] >= MIN_EVIDENCE:
+        return ranking[0][0], candidates
+    return "general", candidates
+
+def resolve_analysis_service(domain: Optional[str], text: Optional[str] = None):
+    """Return (domain_id, service) for the requested domain.
+
+    Missing or unknown domains are auto-routed by the text when it is given, else sent to general.
+    """
+    domain_id = domain.lower().replace(" ", "_").replace("-", "_") if domain else "general"
     
     analysis_function = AVAILABLE_ANALYSIS_SERVICES.get(domain_id)
 
+    if (not analysis_function or not domain) and text:
+        domain_id, _ = auto_route(text)
+        analysis_function = AVAILABLE_ANALYSIS_SERVICES.get(domain_id)
+        logger.info(f"🧭 No usable domain '{domain}', auto-routed to: {domain_id}")
+
     if not analysis_function:
-        logger.warning(f"⚠️ No analysis function found for domain: {request.domain}. Falling back to general analysis.")
+        logger.warning(f"⚠️ No analysis function found for domain: {domain}. Falling back to general analysis.")
+        domain_id = "general"
         analysis_function = AVAILABLE_ANALYSIS_SERVICES.get("general") # Fallback to general if domain not found
         if not analysis_function:
-            raise HTTPException(status_code=404, detail=f"No analysis service found for domain '{request.domain}' and no general fallback is available.")
+            raise HTTPException(status_code=404, detail=f"No analysis service found for domain '{domain}' and no general fallback is available.")
+    return domain_id, analysis_function
 
+@app.post("/analyze", response_model=AnalysisResponse)
+async def analyze_text(request: TextRequest):
+    logger.info(f"Received analysis request for domain: {request.domain}")
+
+    domain_id, analysis_function = resolve_analysis_service(request.domain, request.text)
+    return await run_analysis(request, domain_id, analysis_function)
+
+@app.post("/analyze/auto")
+async def analyze_auto(request: TextRequest):
+    """Analyze with the best-matching domain for the text, whatever `domain` says.
+
+    The response adds routed_domain and the top domain_scores.
+    """
+    domain_id, candidates = auto_route(request.text)
+    logger.info(f"🧭 Auto-routed analysis to: {domain_id}")
+    _, analysis_function = resolve_analysis_service(domain_id)
+    response = await run_analysis(request, domain_id, analysis_function)
+    return {**response, "routed_domain": domain_id, "domain_scores": candidates}
+
+async def run_analysis(request: TextRequest, domain_id: str, analysis_function) -> dict:
+    """Run one domain's analysis (the analyzer answers repeats from the response cache itself)."""
     try:
         # Call the dynamically loaded analyze_text function
         # Ensure the signature matches (request: TextRequest)
-        response = await analysis_function(request)
-        return response
+        return (await analysis_function(request)).dict()
     except HTTPException as he:
         logger.error(f"❌ HTTP Exception during analysis for domain {request.domain}: {he.detail}")
         raise he
@@ -223,8 +548,68 @@ async def analyze_text(request: TextRequest):
         logger.error(f"❌ Error during analysis for domain {request.domain}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing analysis request: {str(e)}")
 
+@app.post("/analyze/stream")
+async def analyze_text_stream(request: TextRequest):
+    """Streams the analysis as NDJSON events: verdict, summary tokens, roadmap tokens, key concepts, done."""
+    logger.info(f"Received streaming analysis request for domain: {request.domain}")
+
+    domain_id, analysis_service = resolve_analysis_service(request.domain, request.text)
+    return stream_analysis(request, domain_id, analysis_service)
+
+@app.post("/analyze/auto/stream")
+async def analyze_auto_stream(request: TextRequest):
+    """/analyze/auto as NDJSON events, starting with {"type": "route", "domain": ..., "scores": [...]}."""
+    domain_id, candidates = auto_route(request.text)
+    logger.info(f"🧭 Auto-routed streaming analysis to: {domain_id}")
+    _, analysis_service = resolve_analysis_service(domain_id)
+    return stream_analysis(request, domain_id, analysis_service,
+                           first_event={"type": "route", "domain": domain_id, "scores": candidates})
+
+def stream_analysis(request: TextRequest, domain_id: str, analysis_service, first_event: Optional[dict] = None):
+    async def generate_events():
+        if first_event:
+            yield first_event
+        try:
+            async for event in analysis_service.stream(request):
+                yield event
+        except Exception as e:
+            event = error_event(e)
+            logger.error(f"❌ Error during analysis for domain {domain_id}: {event['error']}")
+            yield event
+
+    return StreamingResponse(to_ndjson(generate_events()), media_type="application/x-ndjson")
+
 
 if __name__ == "__main__":
+    startup_profiler.mark("routes")
+
+    parser = argparse.ArgumentParser(description="AI Study Room API gateway")
+    parser.add_argument("--workers", type=int, default=GATEWAY_WORKERS,
+                        help="worker processes sharing the port and one shared-memory cache segment; each worker "
+                             "admits 1/N of the per-model Ollama limits (OLLAMA_MAX_PARALLEL, "
+                             "OLLAMA_MODEL_CONCURRENCY), at least ADMISSION_INTERACTIVE_RESERVE + 1 slots per "
+                             "model; /metrics then reports "
+                             "only the worker that answers the scrape, labelled with its pid")
+    add_profile_argument(parser)
+    args, _ = parser.parse_known_args()
+    if startup_profiler.enabled:
+        # Serving processes run this in the lifespan; measure it here too
+        load_models()
+        startup_profiler.mark("model_discovery")
+    startup_profiler.finish(args.profile_startup)
+
     # Ensure required models are pulled
     print("🚀 Starting AI Study Room API...")
-    uvicorn.run(app, host="0.0.0.0", port=8019)
\ No newline at end of file
+    if args.workers > 1:
+        # Workers are separate processes: create the cache segment here so all of them map the same one
+        if not os.environ.get("SHARED_CACHE_PATH"):
+            segment_path = create_segment()
+            os.environ["SHARED_CACHE_PATH"] = segment_path
+            atexit.register(os.unlink, segment_path)
+        # Split the per-model Ollama limits between the workers (admission.py)
+        os.environ["ADMISSION_WORKERS"] = str(args.workers)
+        print(f"🧵 Starting {args.workers} workers (shared cache: {os.environ['SHARED_CACHE_PATH']})")
+        uvicorn.run("main:app", host="0.0.0.0", port=GATEWAY_PORT, workers=args.workers,
+                    app_dir=os.path.dirname(os.path.abspath(__file__)))
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=GATEWAY_PORT)
\ No newline at end of file
@@ -1,307 +1,16 @@
-import sys
 import os
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import ollama 
-from typing import Optional, Dict
-import uvicorn
-import json
-import re
-
-# Add parent directory to path to import logging_utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from logging_utils import setup_logger, log_request, log_model_generation, log_generation_complete, log_error, log_response
+import sys
 
-# Setup logger
-logger = setup_logger('biology_api', 'biology_api.log')
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-# Setup logger
+# Add parent directory to path to import the shared analysis engine
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-# Setup logger
-app = FastAPI(title="Biology Document Analysis API")
-logger.info('🚀 Starting Biology Document Analysis API')
-logger.info('🚀 Starting Biology Document Analysis API')
-logger.info('🚀 Starting Biology Document Analysis API')
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:8020"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-class Context(BaseModel):
-    subject: Optional[str] = None
-    level: Optional[str] = None
-    format: Optional[str] = None
-
-class TextRequest(BaseModel):
-    text: str
-    queryType: Optional[str] = "biology"
-    model_size: Optional[str] = "8b"
-    advanced_analysis: Optional[bool] = False
-    domain: Optional[str] = None
-    context: Optional[Context] = None
-
-class AnalysisResponse(BaseModel):
-    summary: str
-    roadmap: str
-    key_concepts: Optional[list] = None
-    difficulty_level: Optional[str] = None
-    is_biology_domain: bool
-    domain_confidence: float
-
-def is_biology_related(text: str) -> tuple[bool, float]:
-    """Use AI model to determine if the text is biology-related and return confidence score."""
-    try:
-        model_name = "llama3:8b"
-        prompt = f"""<s>[INST] You are a biology domain expert. Analyze if the following text is related to biology or biological concepts. 
-        Respond with a JSON object containing two fields:
-        1. "is_biology": boolean (true/false)
-        2. "confidence": float (between 0 and 1)
-        
-        Text to analyze:
-        {text}
-        
-        Respond only with the JSON object, no other text. [/INST]"""
-        
-        response = ollama.generate(
-            model=model_name,
-            prompt=prompt,
-            options={
-                'num_predict': 100,
-                'temperature': 0.1,
-                'top_p': 0.95,
-                'top_k': 50
-            }
-        )
-        
-        try:
-            json_str = response['response'].strip()
-            if json_str.startswith('{') and json_str.endswith('}'):
-                result = json.loads(json_str)
-                return result.get('is_biology', False), result.get('confidence', 0.0)
-            else:
-                if 'true' in json_str.lower():
-                    return True, 0.8
-                elif 'false' in json_str.lower():
-                    return False, 0.2
-                else:
-                    return False, 0.0
-        except json.JSONDecodeError:
-            response_text = response['response'].lower()
-            if 'biology' in response_text or 'biological' in response_text or 'organism' in response_text or 'cell' in response_text:
-                return True, 0.7
-            return False, 0.3
-            
-    except Exception as e:
-        print(f"Error in is_biology_related: {str(e)}")
-        return False, 0.0
-
-def get_model_name(size: str) -> str:
-    """Get the appropriate Llama 3 model name based on size."""
-    return f"llama3:{size}"
-
-@app.get("/")
-async def root():
-    logger.info("🔍 Health check endpoint called")
-    logger.info("🔍 Health check endpoint called")
-    logger.info("🔍 Health check endpoint called")
-    return {"message": "Biology Document Analysis API is running"}
-
-@app.get("/models")
-async def list_models():
-    logger.info("📋 Listing available models")
-    logger.info("📋 Listing available models")
-    logger.info("📋 Listing available models")
-    """List available models and their status."""
-    try:
-        models = ollama.list()
-        return {"models": models}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_text(request: TextRequest):
-    try:
-        log_request(logger, {
-            "text_length": len(request.text),
-            "text_preview": request.text[:100] + "...",
-            "query_type": request.queryType,
-            "model_size": request.model_size,
-            "advanced_analysis": request.advanced_analysis,
-            "context": request.context.dict() if request.context else None
-        })
-        
-        
-        is_biology, confidence = is_biology_related(request.text)
-        print(f"Biology check - is_biology: {is_biology}, confidence: {confidence}")
-        
-        if not is_biology:
-            return AnalysisResponse(
-                summary="This query appears to be outside the biology domain. This model is specialized in biology-related content only.",
-                roadmap="N/A - Content is not biology-related",
-                key_concepts=[],
-                difficulty_level="N/A",
-                is_biology_domain=False,
-                domain_confidence=confidence
-            )
-
-        model_name = get_model_name(request.model_size)
-        logger.info(f"🤖 Using model: {model_name}")
-        
-        try:
-            context_info = ""
-            if request.context:
-                context_info = f"""
-                Context Information:
-                - Subject: {request.context.subject or 'Not specified'}
-                - Level: {request.context.level or 'Not specified'}
-                - Format: {request.context.format or 'Not specified'}
-                """
-
-            summary_prompt = f"""<s>[INST] You are a biology domain expert using the latest Llama 3 model. Analyze the following biology text and provide a comprehensive analysis. 
-            The text is of type: {request.queryType}. 
-            {context_info}
-            Please follow these steps:
-
-1. First, identify and list all different types of biology content in the text
-2. Then, for each type of content:
-   - Provide a detailed overview
-   - Highlight the main biology points and key information
-   - Note any important biology details or requirements
-   - Identify underlying biology themes and patterns
-3. Finally, provide an overall summary that ties everything together
-4. If advanced analysis is requested, also include:
-   - Key biology concepts and their relationships
-   - Difficulty level assessment
-   - Prerequisites for understanding the biology content
-
-Text content:
-{request.text}
-
-Please structure your response as follows:
-1. Biology Content Types Found:
-   - [List all types of biology content found]
-
-2. Detailed Biology Analysis:
-   [For each content type, provide its summary]
-
-3. Overall Biology Summary:
-   [Provide a comprehensive summary that covers all biology content]
-
-4. Advanced Biology Analysis (if requested):
-   - Key Biology Concepts: [List main concepts]
-   - Difficulty Level: [Assess complexity]
-   - Prerequisites: [List required biology knowledge] [/INST]"""
-
-            summary_response = ollama.generate(
-                model=model_name,
-                prompt=summary_prompt,
-                options={
-                    'num_predict': 2000,
-                    'temperature': 0.8,
-                    'top_p': 0.95,
-                    'top_k': 50,
-                    'repeat_penalty': 1.2,
-                    'presence_penalty': 0.1,
-                    'frequency_penalty': 0.1
-                }
-            )
-            log_generation_complete(logger, "summary")
-
-            roadmap_prompt = f"""<s>[INST] You are a biology education expert using the latest Llama 3 model. Based on the following biology text, create a detailed learning roadmap. 
-            The text is of type: {request.queryType}. 
-            {context_info}
-            Please:
-
-1. First, perform a comprehensive biology content analysis:
-   - Identify all biology topics and subtopics
-   - Assess complexity levels
-   - Determine biology prerequisites
-   - Identify key biology learning objectives
-2. Then, create an advanced learning path that:
-   - Starts with foundational biology concepts
-   - Progresses through different biology content types
-   - Includes biology practice opportunities and assessments
-   - Incorporates all types of biology content
-   - Suggests additional biology resources
-3. Finally, provide a detailed study schedule with:
-   - Time estimates for each biology section
-   - Recommended biology study methods
-   - Biology milestone checkpoints
-   - Progress tracking suggestions
-4. Add '\n' whereever there is a line break. 
-
-Text content:
-{request.text}
-
-Please structure your response as follows:
-1. Biology Content Analysis:
-   [List and describe each type of biology content]
-
-2. Biology Learning Roadmap:
-   [Provide a detailed, step-by-step biology learning path]
-
-3. Biology Study Schedule:
-   [Suggest a timeline with biology milestones]
-
-4. Additional Biology Resources:
-   [List recommended biology supplementary materials] [/INST]"""
-
-            roadmap_response = ollama.generate(
-                model=model_name,
-                prompt=roadmap_prompt,
-                options={
-                    'num_predict': 2000,
-                    'temperature': 0.8,
-                    'top_p': 0.95,
-                    'top_k': 50,
-                    'repeat_penalty': 1.2,
-                    'presence_penalty': 0.1,
-                    'frequency_penalty': 0.1
-                }
-            )
-            log_generation_complete(logger, "roadmap")
-
-        except Exception as e:
-            log_error(logger, f"Error during model generation: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Error during model generation: {str(e)}")
-
-        response_text = summary_response['response']
-        key_concepts = []
-        difficulty_level = "Medium"
-
-        if request.advanced_analysis:
-            if "Key Biology Concepts:" in response_text:
-                concepts_section = response_text.split("Key Biology Concepts:")[1].split("\n")[0]
-                key_concepts = [c.strip() for c in concepts_section.split(",")]
-            
-            if "Difficulty Level:" in response_text:
-                difficulty_section = response_text.split("Difficulty Level:")[1].split("\n")[0]
-                difficulty_level = difficulty_section.strip()
+from analysis_engine import get_analyzer, create_domain_app, run_domain_server
 
-        return AnalysisResponse(
-            summary=summary_response['response'],
-            roadmap=roadmap_response['response'],
-            key_concepts=key_concepts if request.advanced_analysis else None,
-            difficulty_level=difficulty_level if request.advanced_analysis else None,
-            is_biology_domain=True,
-            domain_confidence=confidence
-        )
+# Prompts, keywords and port come from the "biology" spec in domain_specs.py
+DOMAIN_ID = "biology"
 
-    except Exception as e:
-        log_error(logger, f"Error in analyze_text: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+app = create_domain_app(DOMAIN_ID)
+analyze_text = get_analyzer(DOMAIN_ID).analyze
+analyze_stream = get_analyzer(DOMAIN_ID).analyze_stream
 
 if __name__ == "__main__":
-    try:
-        models = ollama.list()
-        llama_models = [m for m in models['models'] if m['name'].startswith('llama3')]
-        if not llama_models:
-            print("Warning: No Llama 3 models found. Please pull a model using: ollama pull llama3:8b")
-    except Exception as e:
-        print(f"Error checking models: {e}")
-    
-    uvicorn.run(app, host="0.0.0.0", port=8008)  # Using port 8008 for Biology 
\ No newline at end of file
+    run_domain_server(app, DOMAIN_ID)
@@ -1,22 +1,16 @@
-import sys
 import os
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import ollama 
-from typing import Optional, Dict
-import uvicorn
-import json
-import re
+import sys
 
-# Add parent directory to path to import logging_utils
+# Add parent directory to path to import the shared analysis engine
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from logging_utils import setup_logger, log_request, log_model_generation, log_generation_complete, log_error, log_response
+from analysis_engine import get_analyzer, create_domain_app, run_domain_server
 
-# Setup logger
-logger = setup_logger('business_api', 'business_api.log')
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-# Setup logger
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-# Setup logger
- 
\ No newline at end of file
+# Prompts, keywords and port come from the "business" spec in domain_specs.py
+DOMAIN_ID = "business"
+
+app = create_domain_app(DOMAIN_ID)
+analyze_text = get_analyzer(DOMAIN_ID).analyze
+analyze_stream = get_analyzer(DOMAIN_ID).analyze_stream
+
+if __name__ == "__main__":
+    run_domain_server(app, DOMAIN_ID)
@@ -0,0 +1,231 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+
+from metrics import QUEUE_WAIT, Counter, register_collector
+
+# Admission control in front of Ollama.
+# Every generation waits for a slot on its model (llama3:8b, llama3:70b, ...),
+# with its own concurrency limit. Waiting requests are served by priority class
+# (interactive chat before bulk analysis), then in arrival order. When the queue
+# is full, or a request has waited too long, it is rejected at once with
+# 429/503 and a Retry-After estimate. It no longer sits until the client times out.
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# Default per-model limit, overridden per model with e.g. "llama3:8b=4,llama3:70b=1"
+OLLAMA_MAX_PARALLEL = int(os.environ.get("OLLAMA_MAX_PARALLEL", "4"))
+MODEL_CONCURRENCY = os.environ.get("OLLAMA_MODEL_CONCURRENCY", "")
+# Waiting requests across all models before new ones get 429
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "64"))
+# Longest a request may wait for a slot before it gets 503
+ADMISSION_MAX_WAIT = float(os.environ.get("ADMISSION_MAX_WAIT", "60"))
+# Slots per model that bulk work may not take, so a chat can always start soon
+ADMISSION_INTERACTIVE_RESERVE = int(os.environ.get("ADMISSION_INTERACTIVE_RESERVE", "1"))
+# Processes that share the limits above (the gateway's --workers sets this). Each
+# process enforces its own share, limit // workers, so N workers together stay
+# within the configured per-model limit. A share is never below reserve + 1, so
+# every worker keeps a bulk slot and its interactive reserve; when that raises it
+# above limit // workers the workers together exceed the limit, and a warning says so.
+ADMISSION_WORKERS = max(1, int(os.environ.get("ADMISSION_WORKERS", "1")))
+
+logger = logging.getLogger("admission")
+
+
+def parse_model_limits(spec: str) -> Dict[str, int]:
+    """Parse "model=limit,model=limit" into a dict."""
+    limits = {}
+    for item in spec.split(","):
+        if "=" in item:
+            model, limit = item.rsplit("=", 1)
+            limits[model.strip()] = max(1, int(limit))
+    return limits
+
+
+class AdmissionRejected(HTTPException):
+    """Raised instead of queueing when Ollama is saturated; carries a Retry-After header."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+        self.retry_after = retry_after
+
+
+class ModelQueue:
+    """Concurrency limit and priority wait queue for one model."""
+
+    def __init__(self, model: str, limit: int, reserve: int):
+        self.model = model
+        self.limit = limit
+        self.bulk_limit = max(1, limit - reserve)
+        self.active = 0
+        # Typical time a slot is held; starts pessimistic and follows observed generations
+        self.avg_seconds = 30.0
+        self._waiters: List[list] = []
+        self._order = itertools.count()
+
+    def capacity(self, priority: int) -> int:
+        return self.limit if priority == INTERACTIVE else self.bulk_limit
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def has_room(self, priority: int) -> bool:
+        """A free slot for `priority` that no queued request of the same or higher priority is owed."""
+        if self.active >= self.capacity(priority):
+            return False
+        return not any(p <= priority and not future.done() for p, _, future in self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until a new request would likely get a slot."""
+        return min(300, max(1, math.ceil(self.avg_seconds * (self.waiting + 1) / self.limit)))
+
+    def enqueue(self, priority: int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._order), future])
+        return future
+
+    def release(self, held_seconds: float):
+        self.active -= 1
+        self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * held_seconds
+        self.wake()
+
+    def wake(self):
+        """Hand free slots to the highest-priority waiters that fit."""
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.active >= self.capacity(priority):
+                break
+            heapq.heappop(self._waiters)
+            self.active += 1
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "bulk_limit": self.bulk_limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "avg_seconds": round(self.avg_seconds, 3),
+        }
+
+
+class AdmissionController:
+    """Process-wide scheduler handing out per-model generation slots."""
+
+    def __init__(self, default_limit: int = OLLAMA_MAX_PARALLEL, model_limits: Optional[Dict[str, int]] = None,
+                 max_queue: int = ADMISSION_MAX_QUEUE, max_wait: float = ADMISSION_MAX_WAIT,
+                 reserve: int = ADMISSION_INTERACTIVE_RESERVE, workers: int = ADMISSION_WORKERS):
+        self.default_limit = default_limit
+        self.model_limits = model_limits if model_limits is not None else parse_model_limits(MODEL_CONCURRENCY)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.reserve = reserve
+        self.workers = workers
+        self.queued = 0
+        self.rejected = {"queue_full": 0, "wait_timeout": 0}
+        self._queues: Dict[str, ModelQueue] = {}
+
+    def queue(self, model: str) -> ModelQueue:
+        if model not in self._queues:
+            configured = self.model_limits.get(model, self.default_limit)
+            limit = max(configured // self.workers, self.reserve + 1)
+            if limit * self.workers > configured:
+                logger.warning(
+                    f"⚠️ {model}: a limit of {configured} split between {self.workers} workers leaves no room for "
+                    f"the interactive reserve ({self.reserve}); each worker admits {limit}, "
+                    f"{limit * self.workers} in total"
+                )
+            self._queues[model] = ModelQueue(model, limit, self.reserve)
+        return self._queues[model]
+
+    def check(self, model: str, priority: int = BULK):
+        """Fail fast (429) when a request for `model` would not even fit in the queue."""
+        queue = self.queue(model)
+        if not queue.has_room(priority) and self.queued >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise AdmissionRejected(
+                429, f"Ollama is busy ({self.queued} requests waiting); retry later", queue.retry_after()
+            )
+
+    async def acquire(self, model: str, priority: int = BULK):
+        queue = self.queue(model)
+        if queue.has_room(priority):
+            queue.active += 1
+            QUEUE_WAIT.observe(0.0, model, PRIORITY_NAMES[priority])
+            return
+        self.check(model, priority)
+
+        future = queue.enqueue(priority)
+        self.queued += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+            QUEUE_WAIT.observe(time.monotonic() - started, model, PRIORITY_NAMES[priority])
+        except asyncio.TimeoutError:
+            self.rejected["wait_timeout"] += 1
+            raise AdmissionRejected(
+                503, f"No {model} slot became free within {self.max_wait:.0f}s; retry later", queue.retry_after()
+            )
+        except BaseException:
+            # Cancelled (e.g. client went away) right as a slot was handed over: give it back
+            if future.done() and not future.cancelled():
+                queue.release(0.0)
+            else:
+                future.cancel()
+            raise
+        finally:
+            self.queued -= 1
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: int = BULK):
+        """Hold one generation slot on `model` for the duration of the block."""
+        await self.acquire(model, priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.queue(model).release(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "workers": self.workers,
+            "max_wait_seconds": self.max_wait,
+            "rejected": dict(self.rejected),
+            "models": {model: queue.stats() for model, queue in self._queues.items()},
+        }
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission() -> AdmissionController:
+    """Return the process-wide admission controller."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
+
+
+register_collector(
+    "admission_waiting_requests", "Requests waiting for an Ollama slot, per model", ("model",),
+    lambda: {(model, ): queue.waiting for model, queue in get_admission()._queues.items()},
+)
+register_collector(
+    "admission_rejected_total", "Requests turned away by admission control", ("reason",),
+    lambda: {(reason, ): count for reason, count in get_admission().rejected.items()}, kind=Counter,
+)
@@ -0,0 +1,314 @@
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from metrics import Counter, register_collector
+from shared_cache import get_shared_cache
+
+# Content-addressed cache for /analyze results.
+# Identical submissions (same text, domain, model size, analysis options and
+# context) are answered from memory, or from an optional SQLite file that
+# survives restarts, instead of re-running the domain check and generations.
+# In a multi-worker gateway a shared-memory tier (shared_cache.py) sits between
+# the two, so a result computed by one worker is a hit in all of them.
+CACHE_TTL = float(os.environ.get("ANALYSIS_CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(os.environ.get("ANALYSIS_CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(os.environ.get("ANALYSIS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_DB_PATH = os.environ.get("ANALYSIS_CACHE_DB", "")
+
+
+def make_cache_key(text: str, domain: str, model_size: Optional[str], advanced_analysis: Optional[bool],
+                   context: Optional[dict] = None, **options) -> str:
+    """Hash everything that changes the analysis output into a stable key."""
+    payload = {
+        "text": text,
+        "domain": domain,
+        "model_size": model_size,
+        "advanced_analysis": bool(advanced_analysis),
+        "context": context or None,
+        "options": options,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def request_cache_key(request, domain: str) -> str:
+    """Cache key for a TextRequest routed to `domain`."""
+    return make_cache_key(
+        request.text,
+        domain,
+        request.model_size,
+        request.advanced_analysis,
+        request.context.dict() if request.context else None,
+        query_type=request.queryType,
+        single_pass=bool(getattr(request, "single_pass", False)),
+    )
+
+
+# Measurements of the run that produced a response; a cache hit did not run anything
+PER_RUN_FIELDS = ("stage_timings", "token_usage")
+
+
+def is_cacheable(response: dict) -> bool:
+    """False for the out-of-domain answer given when the domain check failed (confidence 0.0).
+
+    That verdict is what a failed or unreadable model call returns, so caching it would
+    reject the same text for the whole TTL after a transient Ollama error.
+    """
+    return response.get("domain_confidence") != 0.0
+
+
+def replayed(response: dict) -> dict:
+    """A cached response without the timings and token counts of the run that produced it."""
+    return {**response, **{field: None for field in PER_RUN_FIELDS if field in response}}
+
+
+class LRUTier:
+    """In-memory tier with TTL plus entry-count and byte-size eviction."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, tuple[float, int, Any]]" = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at < time.time():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.time() + self.ttl, size, value)
+        self.total_bytes += size
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+
+class SQLiteTier:
+    """Optional on-disk tier; entries survive restarts and are shared by local processes."""
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        if row[1] < time.time():
+            self.delete(key)
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, encoded: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, encoded, time.time() + self.ttl),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_cache")
+            self._conn.commit()
+
+
+class AnalysisCache:
+    """Tiered cache (process memory, shared memory across workers, optional disk) with hit/miss counters."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL, db_path=CACHE_DB_PATH,
+                 shared=None):
+        self.ttl = ttl
+        self.memory = LRUTier(max_entries, max_bytes, ttl)
+        self.shared = shared if shared is not None else get_shared_cache()
+        self.disk = SQLiteTier(db_path, ttl) if db_path else None
+        self.hits = 0
+        self.shared_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            encoded = self.shared.get_bytes(key)
+            if encoded is not None:
+                self.hits += 1
+                self.shared_hits += 1
+                value = json.loads(encoded)
+                self.memory.set(key, value, len(encoded))
+                return value
+        if self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                encoded = json.dumps(value)
+                self.memory.set(key, value, len(encoded))
+                if self.shared is not None:
+                    self.shared.set_bytes(key, encoded.encode("utf-8"), self.ttl)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict):
+        encoded = json.dumps(value)
+        self.memory.set(key, value, len(encoded))
+        if self.shared is not None:
+            self.shared.set_bytes(key, encoded.encode("utf-8"), self.ttl)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, encoded)
+
+    async def clear(self):
+        """Clear this process's memory tier and the shared and disk tiers."""
+        self.memory.clear()
+        if self.shared is not None:
+            self.shared.clear()
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.clear)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self.memory),
+            "bytes": self.memory.total_bytes,
+            "disk_enabled": self.disk is not None,
+            "shared": self.shared.stats() if self.shared is not None else None,
+        }
+
+
+_cache: Optional[AnalysisCache] = None
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Return the process-wide analysis cache."""
+    global _cache
+    if _cache is None:
+        _cache = AnalysisCache()
+    return _cache
+
+
+register_collector(
+    "analysis_cache_lookups_total", "Analysis cache lookups by result", ("result",),
+    lambda: {("hit",): get_analysis_cache().hits, ("miss",): get_analysis_cache().misses}, kind=Counter,
+)
+register_collector(
+    "analysis_cache_hit_ratio", "Share of analysis cache lookups answered from the cache", (),
+    lambda: {(): get_analysis_cache().stats()["hit_ratio"]},
+)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one in-progress computation."""
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, compute: Callable[[], Awaitable[Any]]):
+        """Await the running computation for `key`, starting `compute()` if there is none."""
+        task = self._calls.get(key)
+        if task is None:
+            # Own task, so a caller that disconnects doesn't cancel the work for the others
+            task = asyncio.ensure_future(compute())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "started": self.leaders, "coalesced": self.coalesced}
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide registry of in-flight analyses."""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
+
+
+def cached_analysis(domain: str, response_model):
+    """Decorate an `analyze_text(request)` handler so repeated and concurrent identical submissions skip the model."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(request):
+            cache = get_analysis_cache()
+            key = request_cache_key(request, domain)
+            cached = await cache.get(key)
+            if cached is not None:
+                return response_model(**replayed(cached))
+
+            async def compute():
+                response = await func(request)
+                if is_cacheable(response.dict()):
+                    await cache.set(key, response.dict())
+                return response
+
+            # Identical submissions already being analyzed share that one run
+            return await get_single_flight().do(key, compute)
+        return wrapper
+    return decorator
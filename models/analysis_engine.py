@@ -0,0 +1,928 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import sys
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Shared helpers live next to this file (models/)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Start the --profile-startup timer before the heavy imports below
+from startup_profiler import add_profile_argument, startup_profiler
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, create_model
+import uvicorn
+
+from logging_utils import setup_logger, log_request, log_model_generation, log_generation_complete, log_error, log_response
+from ollama_client import generate, generate_stream, chat, get_sync_client, close_async_client, running_models
+from admission import get_admission
+from model_residency import analysis_models, get_model_name, get_residency
+from model_catalog import get_model_catalog
+from metrics import ANALYSES_IN_FLIGHT, DOMAIN_CHECK_SECONDS, GENERATION_SECONDS, render_metrics
+from combined_analysis import build_context_info, run_single_pass
+from domain_classifier import get_classifier, get_domain_gate
+from analysis_cache import (cached_analysis, get_analysis_cache, get_single_flight, is_cacheable, replayed,
+                            request_cache_key)
+from analysis_stream import error_event, get_stream_flights, response_events, to_ndjson
+from verdict_cache import get_verdict_cache
+from domain_specs import DOMAIN_SPECS
+from long_document import LONG_DOC_CHUNK_TOKENS, condense, is_long, truncate_to_tokens
+from token_budget import TokenUsage, budgeted_options, estimate_tokens
+from structured_output import (DEFAULT_DIFFICULTY, STRUCTURED_OUTPUT, IncrementalJSONParser, difficulty_from_text,
+                               parse_structured_summary, validated_fields, with_json_instructions)
+
+startup_profiler.mark("imports")
+
+# Data-driven document analysis engine.
+# Every domain is a spec in domain_specs.py; this module turns a spec into an
+# analyzer (prompts, domain check, response model) and serves all of them from
+# one process under /analyze/{domain}. The per-domain servers in
+# models/<Domain>/main.py are thin wrappers around the same analyzers, and
+# --compat re-opens their old ports from this process.
+logger = setup_logger('analysis_engine', 'analysis_engine.log')
+startup_profiler.mark("logger_setup")
+
+ENGINE_PORT = int(os.environ.get("ANALYSIS_ENGINE_PORT", "8030"))
+CORS_ORIGINS = ["http://localhost:8020"]
+
+GENERATION_OPTIONS = {
+    'num_predict': 2000,
+    'temperature': 0.8,
+    'top_p': 0.95,
+    'top_k': 50,
+    'repeat_penalty': 1.2,
+    'presence_penalty': 0.1,
+    'frequency_penalty': 0.1
+}
+
+# The domain check always runs on the small model, whatever model_size was requested
+DOMAIN_CHECK_MODEL = get_model_name("8b")
+
+# The domain check is a short generation; don't let a stuck one hold the request
+DOMAIN_CHECK_TIMEOUT = float(os.environ.get("DOMAIN_CHECK_TIMEOUT", "120"))
+
+DOMAIN_CHECK_OPTIONS = {
+    'num_predict': 100,
+    'temperature': 0.1,
+    'top_p': 0.95,
+    'top_k': 50
+}
+
+# Notes on one chunk of a long document: short, so all chunks' notes fit in one prompt
+CHUNK_NOTES_OPTIONS = {
+    'num_predict': 400,
+    'temperature': 0.3,
+    'top_p': 0.95,
+    'top_k': 50,
+    'repeat_penalty': 1.2
+}
+
+DOMAIN_CHECK_PROMPT = """<s>[INST] You are {article} {subject} domain expert. Analyze if the following text is related to {scope}. 
+        Respond with a JSON object containing two fields:
+        1. "{flag}": boolean (true/false)
+        2. "confidence": float (between 0 and 1)
+        
+        Text to analyze:
+        {text}
+        
+        Respond only with the JSON object, no other text. [/INST]"""
+
+SUMMARY_PROMPT = """<s>[INST] You are {article} {subject} domain expert using the latest Llama 3 model. Analyze the following {topic} text and provide a comprehensive analysis. 
+            The text is of type: {query_type}. 
+            {context_info}
+            Please follow these steps:
+
+1. First, identify and list all different types of {topic} content in the text
+2. Then, for each type of content:
+   - Provide a detailed overview
+   - Highlight the main {topic} points and key information
+   - Note any important {topic} details or requirements
+   - Identify underlying {topic} themes and patterns
+3. Finally, provide an overall summary that ties everything together
+4. If advanced analysis is requested, also include:
+   - Key {topic} concepts and their relationships
+   - Difficulty level assessment
+   - Prerequisites for understanding the {topic} content
+
+Text content:
+{text}
+
+Please structure your response as follows:
+1. {label} Content Types Found:
+   - [List all types of {topic} content found]
+
+2. Detailed {label} Analysis:
+   [For each content type, provide its summary]
+
+3. Overall {label} Summary:
+   [Provide a comprehensive summary that covers all {topic} content]
+
+4. Advanced {label} Analysis (if requested):
+   - Key {label} Concepts: [List main concepts]
+   - Difficulty Level: [Assess complexity]
+   - Prerequisites: [List required {topic} knowledge] [/INST]"""
+
+ROADMAP_PROMPT = """<s>[INST] You are {article} {subject} education expert using the latest Llama 3 model. Based on the following {topic} text, create a detailed learning roadmap. 
+            The text is of type: {query_type}. 
+            {context_info}
+            Please:
+
+1. First, perform a comprehensive {topic} content analysis:
+   - Identify all {topic} topics and subtopics
+   - Assess complexity levels
+   - Determine {topic} prerequisites
+   - Identify key {topic} learning objectives
+2. Then, create an advanced learning path that:
+   - Starts with foundational {topic} concepts
+   - Progresses through different {topic} content types
+   - Includes {topic} practice opportunities and assessments
+   - Incorporates all types of {topic} content
+   - Suggests additional {topic} resources
+3. Finally, provide a detailed study schedule with:
+   - Time estimates for each {topic} section
+   - Recommended {topic} study methods
+   - {label} milestone checkpoints
+   - Progress tracking suggestions
+4. Add '\n' whereever there is a line break. 
+
+Text content:
+{text}
+
+Please structure your response as follows:
+1. {label} Content Analysis:
+   [List and describe each type of {topic} content]
+
+2. {label} Learning Roadmap:
+   [Provide a detailed, step-by-step {topic} learning path]
+
+3. {label} Study Schedule:
+   [Suggest a timeline with {topic} milestones]
+
+4. Additional {label} Resources:
+   [List recommended {topic} supplementary materials] [/INST]"""
+
+CHUNK_NOTES_PROMPT = """<s>[INST] You are {article} {subject} domain expert. The text below is part {part} of {parts} of a longer {topic} document.
+Write concise notes on this part only: its main ideas, the key {topic} concepts and definitions, and any facts,
+examples or steps needed to understand it. Do not add an introduction or a conclusion.
+
+Text part:
+{text} [/INST]"""
+
+TUTOR_PROMPT = """You are a helpful and knowledgeable AI Tutor. 
+        User Request: {text}
+        
+        Please provide a helpful response or analysis."""
+
+DEFAULT_PROMPTS = {
+    "domain_check": DOMAIN_CHECK_PROMPT,
+    "summary": SUMMARY_PROMPT,
+    "roadmap": ROADMAP_PROMPT,
+    "chunk_notes": CHUNK_NOTES_PROMPT,
+    "tutor": TUTOR_PROMPT,
+}
+
+
+class Context(BaseModel):
+    subject: Optional[str] = None
+    level: Optional[str] = None
+    format: Optional[str] = None
+
+class TextRequest(BaseModel):
+    text: str
+    queryType: Optional[str] = None
+    model_size: Optional[str] = "8b"
+    advanced_analysis: Optional[bool] = False
+    single_pass: Optional[bool] = False
+    domain: Optional[str] = None
+    context: Optional[Context] = None
+
+
+def spec_models(spec: dict) -> List[str]:
+    """Ollama models an analyzer built from `spec` calls, for preloading."""
+    if spec.get("mode") == "tutor":
+        return [spec.get("model", "llama3")]
+    return list(dict.fromkeys([DOMAIN_CHECK_MODEL, *analysis_models()]))
+
+
+async def run_together(*coros):
+    """Run coroutines side by side and return their results in order.
+
+    Unlike gather, the first failure cancels the others, so a failed summary does not
+    leave the roadmap holding its model slot, and that first exception is raised as is.
+    """
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(coro) for coro in coros]
+    except BaseExceptionGroup as failures:
+        raise failures.exceptions[0] from None
+    return [task.result() for task in tasks]
+
+
+class StageTimer:
+    """Seconds spent in each analysis stage (domain check, map, generation)."""
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def stage(self, name: str):
+        """Close the stage that began at the previous call."""
+        now = time.perf_counter()
+        self.stages[name] = round(now - self._last, 3)
+        self._last = now
+
+    def report(self) -> dict:
+        return {**self.stages, "total": round(time.perf_counter() - self.started, 3)}
+
+
+class DomainAnalyzer:
+    """Domain check, summary and roadmap generation for one domain spec."""
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.id = spec["id"]
+        self.flag_field = f"{spec['flag']}_domain"
+        self.logger = setup_logger(f"{self.id}_api", f"{self.id}_api.log")
+        self.prompts = {**DEFAULT_PROMPTS, **spec.get("prompts", {})}
+
+        subject = spec["subject"]
+        self.prompt_vars = {
+            "article": "an" if subject[0].lower() in "aeiou" else "a",
+            "subject": subject,
+            "topic": spec.get("topic", subject),
+            "label": spec.get("label", subject.title()),
+            "scope": spec.get("scope", subject),
+            "flag": spec["flag"],
+        }
+
+        model_name = re.sub(r"\W", "", spec["display_name"].title()) + "AnalysisResponse"
+        self.response_model = create_model(
+            model_name,
+            summary=(str, ...),
+            roadmap=(str, ...),
+            key_concepts=(Optional[list], None),
+            difficulty_level=(Optional[str], None),
+            domain_confidence=(float, ...),
+            chunk_count=(Optional[int], None),
+            stage_timings=(Optional[dict], None),
+            token_usage=(Optional[dict], None),
+            suggested_domain=(Optional[str], None),
+            suggested_domain_score=(Optional[float], None),
+            **{self.flag_field: (bool, ...)},
+        )
+        # Repeated submissions are answered from the content-addressed cache
+        self._cached_analyze = cached_analysis(self.id, self.response_model)(self._analyze)
+
+    @contextmanager
+    def in_flight(self):
+        """Count a request in analysis_in_flight_requests while it runs."""
+        ANALYSES_IN_FLIGHT.inc(self.id)
+        try:
+            yield
+        finally:
+            ANALYSES_IN_FLIGHT.dec(self.id)
+
+    async def analyze(self, request: TextRequest):
+        """Analyze one request; repeated and concurrent identical requests share a result."""
+        with self.in_flight():
+            return await self._cached_analyze(request)
+
+    def prompt(self, name: str, **values) -> str:
+        return self.prompts[name].format(**self.prompt_vars, **values)
+
+    def build_response(self, **fields):
+        return self.response_model(**fields)
+
+    def suggest_domain(self, text: str) -> dict:
+        """The classifier's best other domain for rejected text, so the client can re-route directly."""
+        alternative = get_classifier().best_alternative(self.id, text)
+        if alternative is None:
+            return {}
+        return {"suggested_domain": alternative[0], "suggested_domain_score": alternative[1]}
+
+    def out_of_domain_response(self, confidence: float, text: str = ""):
+        subject = self.prompt_vars["subject"]
+        return self.build_response(
+            summary=f"This query appears to be outside the {subject} domain. This model is specialized in {subject}-related content only.",
+            roadmap=f"N/A - Content is not {subject}-related",
+            key_concepts=[],
+            difficulty_level="N/A",
+            domain_confidence=confidence,
+            **self.suggest_domain(text),
+            **{self.flag_field: False}
+        )
+
+    def parse_key_concepts(self, summary: str, request: TextRequest):
+        """Pull key concepts and difficulty out of an advanced-analysis summary ((None, None) otherwise)."""
+        if not request.advanced_analysis:
+            return None, None
+
+        key_concepts = []
+        difficulty_level = DEFAULT_DIFFICULTY
+        concepts_marker = f"Key {self.prompt_vars['label']} Concepts:"
+        if concepts_marker in summary:
+            concepts_section = summary.split(concepts_marker)[1].split("\n")[0]
+            key_concepts = [c.strip() for c in concepts_section.split(",")]
+
+        if "Difficulty Level:" in summary:
+            difficulty_section = summary.split("Difficulty Level:")[1].split("\n")[0]
+            difficulty_level = difficulty_from_text(difficulty_section)
+        return key_concepts, difficulty_level
+
+    def read_summary(self, text: str, request: TextRequest, fields: Optional[dict] = None):
+        """(summary, key_concepts, difficulty_level) from a summary generation.
+
+        `fields` are the validated StructuredSummary fields of a JSON-mode generation;
+        anything missing falls back to the raw text and its "Key ... Concepts:" markers.
+        """
+        if fields is not None and len(fields) < 3:
+            self.logger.warning(f"⚠️ Structured output incomplete (got {sorted(fields)}), falling back to text markers")
+        fields = fields or {}
+        summary = fields.get("summary") or text
+        key_concepts, difficulty_level = self.parse_key_concepts(summary, request)
+        if request.advanced_analysis:
+            key_concepts = fields.get("key_concepts") or key_concepts
+            difficulty_level = fields.get("difficulty_level") or difficulty_level
+        return summary, key_concepts, difficulty_level
+
+    async def budgeted_generate(self, stage: str, model_name: str, prompt: str, options: dict,
+                                document: str, advanced: bool, usage: TokenUsage, **kwargs):
+        """generate() with num_predict sized to the input; counts go into `usage`."""
+        options, prompt_tokens = budgeted_options(options, stage, prompt, estimate_tokens(document), advanced)
+        usage.plan(stage, prompt_tokens, options["num_predict"])
+        started = time.perf_counter()
+        response = await generate(model=model_name, prompt=prompt, options=options, **kwargs)
+        GENERATION_SECONDS.observe(time.perf_counter() - started, self.id, stage, model_name)
+        usage.record(stage, response)
+        return response
+
+    async def summarize_chunk(self, model_name: str, chunk: str, part: int, parts: int, usage: TokenUsage) -> str:
+        prompt = self.prompt("chunk_notes", text=chunk, part=part, parts=parts)
+        response = await self.budgeted_generate("chunk_notes", model_name, prompt, CHUNK_NOTES_OPTIONS, chunk, False, usage)
+        return response['response']
+
+    async def prepare_document(self, text: str, model_name: str, usage: TokenUsage) -> Tuple[str, dict]:
+        """The text the analysis prompts see: the document itself, or map-reduced notes of a long one."""
+        if not is_long(text):
+            return text, {}
+        document, report = await condense(
+            text, lambda chunk, part, parts: self.summarize_chunk(model_name, chunk, part, parts, usage),
+            max_parallel=get_admission().queue(model_name).bulk_limit,
+        )
+        self.logger.info(
+            f"📚 Long document ({len(text)} chars): {report['chunk_count']} chunks, "
+            f"{report['rounds']} round(s), map took {sum(report['map_seconds']):.1f}s"
+        )
+        return document, report
+
+    async def is_related(self, text: str) -> tuple[bool, float]:
+        """Use AI model to determine if the text belongs to this domain and return confidence score."""
+        try:
+            started = time.perf_counter()
+            response = await generate(
+                model=DOMAIN_CHECK_MODEL,
+                # The start of a long document is enough to judge its domain
+                prompt=self.prompt("domain_check", text=truncate_to_tokens(text, LONG_DOC_CHUNK_TOKENS)),
+                options=DOMAIN_CHECK_OPTIONS,
+                timeout=DOMAIN_CHECK_TIMEOUT
+            )
+            DOMAIN_CHECK_SECONDS.observe(time.perf_counter() - started, self.id)
+
+            try:
+                json_str = response['response'].strip()
+                if json_str.startswith('{') and json_str.endswith('}'):
+                    result = json.loads(json_str)
+                    return result.get(self.spec["flag"], False), result.get('confidence', 0.0)
+                else:
+                    if 'true' in json_str.lower():
+                        return True, 0.8
+                    elif 'false' in json_str.lower():
+                        return False, 0.2
+                    else:
+                        return False, 0.0
+            except json.JSONDecodeError:
+                response_text = response['response'].lower()
+                if any(keyword in response_text for keyword in self.spec["keywords"]):
+                    return True, 0.7
+                return False, 0.3
+
+        except HTTPException:
+            # Admission rejections (429/503) must reach the client, not read as "off-topic"
+            raise
+        except Exception as e:
+            log_error(self.logger, f"Error in {self.id} domain check: {str(e)}")
+            return False, 0.0
+
+    async def _analyze(self, request: TextRequest):
+        if self.spec.get("mode") == "tutor":
+            return await self._analyze_tutor(request)
+
+        try:
+            query_type = request.queryType or self.spec["query_type"]
+            log_request(self.logger, {
+                "text_length": len(request.text),
+                "text_preview": request.text[:100] + "...",
+                "query_type": query_type,
+                "model_size": request.model_size,
+                "advanced_analysis": request.advanced_analysis,
+                "context": request.context.dict() if request.context else None
+            })
+            model_name = get_model_name(request.model_size)
+            # Reject up front when saturated, before the domain check takes a slot
+            get_admission().check(model_name)
+            timer = StageTimer()
+            usage = TokenUsage()
+
+            single_pass_result = None
+            if request.single_pass:
+                # One combined generation replaces the domain check, summary and roadmap prompts
+                document, long_report = await self.prepare_document(request.text, model_name, usage)
+                if long_report:
+                    timer.stage("map")
+                started = time.perf_counter()
+                single_pass_result = await run_single_pass(
+                    model_name, self.prompt_vars["subject"], self.prompt_vars["scope"],
+                    document, query_type, request.context, request.advanced_analysis, usage,
+                    article=self.prompt_vars["article"]
+                )
+                GENERATION_SECONDS.observe(time.perf_counter() - started, self.id, "single_pass", model_name)
+                timer.stage("generation")
+                is_domain, confidence = single_pass_result["is_domain"], single_pass_result["confidence"]
+            else:
+                # Local classifier first; the LLM check only runs when it is unsure
+                is_domain, confidence = await get_domain_gate().check(self.id, request.text, self.is_related)
+                timer.stage("domain_check")
+            self.logger.info(f"🔍 Domain check - {self.spec['flag']}: {is_domain}, confidence: {confidence}")
+
+            if not is_domain:
+                return self.out_of_domain_response(confidence, request.text)
+
+            if single_pass_result:
+                return self.build_response(
+                    summary=single_pass_result["summary"],
+                    roadmap=single_pass_result["roadmap"],
+                    key_concepts=single_pass_result["key_concepts"],
+                    difficulty_level=single_pass_result["difficulty_level"],
+                    domain_confidence=confidence,
+                    chunk_count=long_report.get("chunk_count"),
+                    stage_timings=timer.report(),
+                    token_usage=usage.report(),
+                    **{self.flag_field: True}
+                )
+
+            self.logger.info(f"🤖 Using model: {model_name}")
+
+            try:
+                # Long documents are condensed chunk by chunk before the summary and roadmap prompts
+                document, long_report = await self.prepare_document(request.text, model_name, usage)
+                if long_report:
+                    timer.stage("map")
+
+                context_info = build_context_info(request.context)
+                summary_prompt = self.prompt("summary", query_type=query_type, context_info=context_info, text=document)
+                roadmap_prompt = self.prompt("roadmap", query_type=query_type, context_info=context_info, text=document)
+                # Advanced analyses get key concepts and difficulty as JSON fields instead of text markers
+                structured = STRUCTURED_OUTPUT and request.advanced_analysis
+                if structured:
+                    summary_prompt = with_json_instructions(summary_prompt, self.prompt_vars["label"])
+
+                log_model_generation(self.logger, model_name, "summary")
+                log_model_generation(self.logger, model_name, "roadmap")
+                # Neither prompt depends on the other's output, so run them side by side
+                summary_response, roadmap_response = await run_together(
+                    self.budgeted_generate("summary", model_name, summary_prompt, GENERATION_OPTIONS,
+                                           document, request.advanced_analysis, usage,
+                                           format="json" if structured else ""),
+                    self.budgeted_generate("roadmap", model_name, roadmap_prompt, GENERATION_OPTIONS,
+                                           document, request.advanced_analysis, usage),
+                )
+                log_generation_complete(self.logger, "summary")
+                log_generation_complete(self.logger, "roadmap")
+                timer.stage("generation")
+
+            except HTTPException:
+                raise
+            except Exception as e:
+                log_error(self.logger, f"Error during model generation: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Error during model generation: {str(e)}")
+
+            summary_text = summary_response['response']
+            fields = parse_structured_summary(summary_text) if structured else None
+            summary, key_concepts, difficulty_level = self.read_summary(summary_text, request, fields)
+            self.logger.info(f"⏱️ Stage timings: {timer.report()}")
+            self.logger.info(f"🔢 Token usage: {usage.report()}")
+            return self.build_response(
+                summary=summary,
+                roadmap=roadmap_response['response'],
+                key_concepts=key_concepts,
+                difficulty_level=difficulty_level,
+                domain_confidence=confidence,
+                chunk_count=long_report.get("chunk_count"),
+                stage_timings=timer.report(),
+                token_usage=usage.report(),
+                **{self.flag_field: True}
+            )
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            log_error(self.logger, f"Error in analyze_text: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def analyze_stream(self, request: TextRequest):
+        """Yield analysis events; identical concurrent requests follow one shared stream."""
+        key = request_cache_key(request, self.id)
+        with self.in_flight():
+            async for event in get_stream_flights().subscribe(key, lambda: self._stream_events(request)):
+                yield event
+
+    async def _stream_events(self, request: TextRequest):
+        """Yield analysis events (see analysis_stream.py) as soon as each part is available.
+
+        The summary is streamed token by token while the roadmap generates alongside it;
+        roadmap tokens are buffered until the summary ends, then streamed live.
+        Cached results, single-pass and tutor analyses are replayed as whole events.
+        """
+        try:
+            cache = get_analysis_cache()
+            cache_key = request_cache_key(request, self.id)
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                cached = replayed(cached)
+            elif request.single_pass or self.spec.get("mode") == "tutor":
+                cached = (await self._analyze(request)).dict()
+                if is_cacheable(cached):
+                    await cache.set(cache_key, cached)
+            if cached is not None:
+                for event in response_events(cached):
+                    yield event
+                return
+
+            query_type = request.queryType or self.spec["query_type"]
+            log_request(self.logger, {
+                "text_length": len(request.text),
+                "text_preview": request.text[:100] + "...",
+                "query_type": query_type,
+                "model_size": request.model_size,
+                "advanced_analysis": request.advanced_analysis,
+                "streaming": True,
+                "context": request.context.dict() if request.context else None
+            })
+            model_name = get_model_name(request.model_size)
+            get_admission().check(model_name)
+            timer = StageTimer()
+            usage = TokenUsage()
+
+            is_domain, confidence = await get_domain_gate().check(self.id, request.text, self.is_related)
+            timer.stage("domain_check")
+            self.logger.info(f"🔍 Domain check - {self.spec['flag']}: {is_domain}, confidence: {confidence}")
+            if not is_domain:
+                response = self.out_of_domain_response(confidence, request.text).dict()
+                if is_cacheable(response):
+                    await cache.set(cache_key, response)
+                for event in response_events(response):
+                    yield event
+                return
+            yield {"type": "verdict", self.flag_field: True, "domain_confidence": confidence}
+
+            document, long_report = await self.prepare_document(request.text, model_name, usage)
+            if long_report:
+                timer.stage("map")
+                yield {"type": "chunks", **long_report}
+
+            context_info = build_context_info(request.context)
+            summary_prompt = self.prompt("summary", query_type=query_type, context_info=context_info, text=document)
+            roadmap_prompt = self.prompt("roadmap", query_type=query_type, context_info=context_info, text=document)
+            structured = STRUCTURED_OUTPUT and request.advanced_analysis
+            if structured:
+                summary_prompt = with_json_instructions(summary_prompt, self.prompt_vars["label"])
+            document_tokens = estimate_tokens(document)
+            summary_options, summary_tokens = budgeted_options(
+                GENERATION_OPTIONS, "summary", summary_prompt, document_tokens, request.advanced_analysis)
+            roadmap_options, roadmap_tokens = budgeted_options(
+                GENERATION_OPTIONS, "roadmap", roadmap_prompt, document_tokens, request.advanced_analysis)
+            usage.plan("summary", summary_tokens, summary_options["num_predict"])
+            usage.plan("roadmap", roadmap_tokens, roadmap_options["num_predict"])
+            log_model_generation(self.logger, model_name, "summary")
+            log_model_generation(self.logger, model_name, "roadmap")
+
+            roadmap_chunks: asyncio.Queue = asyncio.Queue()
+
+            async def generate_roadmap():
+                try:
+                    started = time.perf_counter()
+                    async for chunk in generate_stream(model=model_name, prompt=roadmap_prompt, options=roadmap_options):
+                        if chunk.get('done'):
+                            usage.record("roadmap", chunk)
+                            GENERATION_SECONDS.observe(time.perf_counter() - started, self.id, "roadmap", model_name)
+                        await roadmap_chunks.put(chunk.get('response', ''))
+                finally:
+                    await roadmap_chunks.put(None)
+
+            roadmap_task = asyncio.create_task(generate_roadmap())
+            try:
+                summary_parts = []
+                # In JSON mode only the characters of the "summary" string are streamed
+                parser = IncrementalJSONParser() if structured else None
+                started = time.perf_counter()
+                async for chunk in generate_stream(model=model_name, prompt=summary_prompt, options=summary_options,
+                                                   format="json" if structured else ""):
+                    if chunk.get('done'):
+                        usage.record("summary", chunk)
+                        GENERATION_SECONDS.observe(time.perf_counter() - started, self.id, "summary", model_name)
+                    text = chunk.get('response', '')
+                    if not text:
+                        continue
+                    summary_parts.append(text)
+                    if parser is None:
+                        yield {"type": "summary", "text": text}
+                        continue
+                    for kind, key, value in parser.feed(text):
+                        if kind == "delta" and key == "summary":
+                            yield {"type": "summary", "text": value}
+                fields = validated_fields(parser.finish()) if parser else None
+                if parser and not fields.get("summary"):
+                    # Nothing usable came out of JSON mode: show the raw output instead
+                    yield {"type": "summary", "text": "".join(summary_parts)}
+                log_generation_complete(self.logger, "summary")
+
+                roadmap_parts = []
+                while (text := await roadmap_chunks.get()) is not None:
+                    if text:
+                        roadmap_parts.append(text)
+                        yield {"type": "roadmap", "text": text}
+                await roadmap_task
+                log_generation_complete(self.logger, "roadmap")
+                timer.stage("generation")
+            finally:
+                roadmap_task.cancel()
+
+            summary, key_concepts, difficulty_level = self.read_summary("".join(summary_parts), request, fields)
+            yield {"type": "key_concepts", "key_concepts": key_concepts, "difficulty_level": difficulty_level}
+
+            response = self.build_response(
+                summary=summary,
+                roadmap="".join(roadmap_parts),
+                key_concepts=key_concepts,
+                difficulty_level=difficulty_level,
+                domain_confidence=confidence,
+                chunk_count=long_report.get("chunk_count"),
+                stage_timings=timer.report(),
+                token_usage=usage.report(),
+                **{self.flag_field: True}
+            ).dict()
+            self.logger.info(f"🔢 Token usage: {response['token_usage']}")
+            await cache.set(cache_key, response)
+            yield {"type": "done", "response": response}
+
+        except Exception as e:
+            event = error_event(e)
+            log_error(self.logger, f"Error in analyze_stream: {event['error']}")
+            yield event
+
+    async def _analyze_tutor(self, request: TextRequest):
+        """Single-prompt analysis for the general tutor (no domain gate)."""
+        try:
+            log_request(self.logger, {
+                "text_length": len(request.text),
+                "query_type": request.queryType or self.spec["query_type"]
+            })
+
+            response = await chat(
+                model=self.spec.get("model", "llama3"),
+                messages=[{'role': 'user', 'content': self.prompt("tutor", text=request.text)}]
+            )
+
+            api_response = self.build_response(
+                summary=response['message']['content'],
+                roadmap="Let me know if you have any other questions!",
+                key_concepts=[],
+                difficulty_level="General",
+                domain_confidence=1.0,
+                **{self.flag_field: False}
+            )
+            log_response(self.logger, api_response.dict())
+            return api_response
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            log_error(self.logger, f"Error in analyze_text: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+_analyzers: Dict[str, DomainAnalyzer] = {}
+
+
+def get_analyzer(domain_id: str) -> DomainAnalyzer:
+    """Return the analyzer for `domain_id`, building it on first use (KeyError if unknown)."""
+    if domain_id not in _analyzers:
+        _analyzers[domain_id] = DomainAnalyzer(DOMAIN_SPECS[domain_id])
+    return _analyzers[domain_id]
+
+
+def _create_app(title: str, models: List[str]) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        get_residency().start_preload(models)
+        get_model_catalog().start()
+        yield
+        await get_model_catalog().stop()
+        await close_async_client()
+
+    app = FastAPI(title=title, lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.get("/models")
+    async def list_models(if_none_match: Optional[str] = Header(None)):
+        """List available models and their status (from the catalog snapshot, with ETag)."""
+        return await get_model_catalog().response(if_none_match)
+
+    @app.get("/cache/stats")
+    async def cache_stats():
+        """Hit/miss counters for the /analyze response cache, the domain verdict cache and request coalescing,
+        plus the age of the /models snapshot."""
+        return {
+            **get_analysis_cache().stats(),
+            "domain_verdicts": get_verdict_cache().stats(),
+            "coalescing": {"analyses": get_single_flight().stats(), "streams": get_stream_flights().stats()},
+            "model_catalog": get_model_catalog().stats(),
+        }
+
+    @app.get("/queue/stats")
+    async def queue_stats():
+        """Per-model slots in use, waiting requests and rejections from admission control."""
+        return get_admission().stats()
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        """Prometheus metrics: queue wait, domain check and generation latency, TTFT, tokens/sec, caches."""
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/models/residency")
+    async def model_residency():
+        """Load state and keep_alive of each model, plus what Ollama reports as loaded."""
+        return {"models": get_residency().state(), "ollama_loaded": await running_models()}
+
+    return app
+
+
+def create_domain_app(domain_id: str) -> FastAPI:
+    """Single-domain app with the original server's routes (/, /models, /analyze)."""
+    analyzer = get_analyzer(domain_id)
+    display_name = analyzer.spec["display_name"]
+    title = f"{display_name} API" if analyzer.spec.get("mode") == "tutor" else f"{display_name} Document Analysis API"
+    app = _create_app(title, spec_models(analyzer.spec))
+
+    @app.get("/")
+    async def root():
+        return {"message": f"{title} is running"}
+
+    @app.post("/analyze", response_model=analyzer.response_model)
+    async def analyze_text(request: TextRequest):
+        return await analyzer.analyze(request)
+
+    @app.post("/analyze/stream")
+    async def analyze_text_stream(request: TextRequest):
+        """Same analysis as /analyze, streamed as NDJSON events."""
+        return StreamingResponse(to_ndjson(analyzer.analyze_stream(request)), media_type="application/x-ndjson")
+
+    return app
+
+
+def create_engine_app() -> FastAPI:
+    """One app serving every domain spec under /analyze/{domain}."""
+    app = _create_app(
+        "Document Analysis Engine", list(dict.fromkeys(m for spec in DOMAIN_SPECS.values() for m in spec_models(spec)))
+    )
+
+    @app.get("/")
+    async def root():
+        return {"message": "Document Analysis Engine is running", "domains": len(DOMAIN_SPECS)}
+
+    @app.get("/domains")
+    async def list_domains():
+        return [
+            {"id": spec["id"], "display_name": spec["display_name"], "port": spec["port"]}
+            for spec in DOMAIN_SPECS.values()
+        ]
+
+    def resolve(domain: str) -> DomainAnalyzer:
+        domain_id = domain.lower().replace(" ", "_").replace("-", "_")
+        if domain_id not in DOMAIN_SPECS:
+            raise HTTPException(status_code=404, detail=f"Unknown analysis domain '{domain}'")
+        return get_analyzer(domain_id)
+
+    @app.post("/analyze/{domain}")
+    async def analyze_domain(domain: str, request: TextRequest):
+        return await resolve(domain).analyze(request)
+
+    @app.post("/analyze/{domain}/stream")
+    async def analyze_domain_stream(domain: str, request: TextRequest):
+        """Same analysis as /analyze/{domain}, streamed as NDJSON events."""
+        return StreamingResponse(to_ndjson(resolve(domain).analyze_stream(request)), media_type="application/x-ndjson")
+
+    return app
+
+
+def check_llama_models():
+    try:
+        models = get_sync_client().list()
+        llama_models = [m for m in models['models'] if m['name'].startswith('llama3')]
+        if not llama_models:
+            print("Warning: No Llama 3 models found. Please pull a model using: ollama pull llama3:8b")
+    except Exception as e:
+        print(f"Error checking models: {e}")
+
+
+def run_domain_server(app: FastAPI, domain_id: str):
+    """Run one domain on its own port (what `python models/<Domain>/main.py` does)."""
+    startup_profiler.mark("app_construction")
+    parser = argparse.ArgumentParser(description=f"{DOMAIN_SPECS[domain_id]['display_name']} analysis server")
+    add_profile_argument(parser)
+    args, _ = parser.parse_known_args()
+    startup_profiler.finish(args.profile_startup)
+
+    check_llama_models()
+    uvicorn.run(app, host="0.0.0.0", port=DOMAIN_SPECS[domain_id]["port"])
+
+
+class _ListenerServer(uvicorn.Server):
+    """Compatibility listener on the engine's loop; the main server owns signal handling."""
+
+    def install_signal_handlers(self):
+        pass
+
+
+def _port_is_free(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(("0.0.0.0", port))
+            return True
+        except OSError:
+            return False
+
+
+async def serve_engine(port: int = ENGINE_PORT, compat: bool = False):
+    """Serve every domain from this process, optionally also on the legacy per-domain ports."""
+    main_server = uvicorn.Server(uvicorn.Config(create_engine_app(), host="0.0.0.0", port=port))
+
+    listeners = []
+    if compat:
+        for spec in DOMAIN_SPECS.values():
+            if not _port_is_free(spec["port"]):
+                logger.warning(f"⚠️ Port {spec['port']} is busy, skipping compatibility listener for {spec['id']}")
+                continue
+            config = uvicorn.Config(create_domain_app(spec["id"]), host="0.0.0.0", port=spec["port"], log_level="warning")
+            listeners.append(_ListenerServer(config))
+        logger.info(f"🔌 Compatibility listeners on {len(listeners)} legacy ports")
+
+    async def serve_main():
+        try:
+            await main_server.serve()
+        finally:
+            for listener in listeners:
+                listener.should_exit = True
+
+    await asyncio.gather(serve_main(), *(listener.serve() for listener in listeners))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve every analysis domain from one process.")
+    parser.add_argument("--port", type=int, default=ENGINE_PORT)
+    parser.add_argument("--compat", action="store_true",
+                        help="also listen on each domain's legacy port (8000-8024)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    if startup_profiler.enabled:
+        # Build everything serve_engine() and the first requests would build, then report
+        create_engine_app()
+        if args.compat:
+            for domain_id in DOMAIN_SPECS:
+                create_domain_app(domain_id)
+        startup_profiler.mark("app_construction")
+        for domain_id in DOMAIN_SPECS:
+            get_analyzer(domain_id)
+        startup_profiler.mark("analyzers")
+        get_classifier()
+        startup_profiler.mark("domain_classifier")
+        startup_profiler.finish(args.profile_startup)
+
+    check_llama_models()
+    logger.info(f"🚀 Starting Document Analysis Engine with {len(DOMAIN_SPECS)} domains on port {args.port}")
+    asyncio.run(serve_engine(args.port, args.compat))
@@ -0,0 +1,136 @@
+import asyncio
+import json
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException
+
+# Event stream for the streaming /analyze variants, sent as NDJSON (one JSON object
+# per line, like /api/chat). A full analysis is emitted in this order:
+#   {"type": "verdict", "is_<flag>_domain": true, "domain_confidence": 0.93}
+#                                             (rejections add "suggested_domain" and its score)
+#   {"type": "chunks", "chunk_count": 12, ...}  (long documents only, after map-reduce)
+#   {"type": "summary", "text": "..."}        (one per generated chunk)
+#   {"type": "roadmap", "text": "..."}        (one per generated chunk)
+#   {"type": "key_concepts", "key_concepts": [...], "difficulty_level": "..."}
+#   {"type": "done", "response": {...}}       (the same body /analyze returns)
+# Failures end the stream with {"type": "error", "error": "..."}; HTTP errors such as
+# admission rejections also carry "status_code" and, when known, "retry_after".
+
+
+def verdict_event(response: dict) -> dict:
+    """The verdict part of an analysis response (its is_*_domain flag and confidence)."""
+    flags = {k: v for k, v in response.items() if k.startswith("is_") and k.endswith("_domain")}
+    event = {"type": "verdict", **flags, "domain_confidence": response.get("domain_confidence")}
+    if response.get("suggested_domain"):
+        event["suggested_domain"] = response["suggested_domain"]
+        event["suggested_domain_score"] = response.get("suggested_domain_score")
+    return event
+
+
+def error_event(error: Exception) -> dict:
+    """The final event of a failed stream."""
+    if not isinstance(error, HTTPException):
+        return {"type": "error", "error": str(error)}
+    event = {"type": "error", "error": error.detail, "status_code": error.status_code}
+    retry_after = (error.headers or {}).get("Retry-After")
+    if retry_after is not None:
+        event["retry_after"] = int(retry_after)
+    return event
+
+
+def response_events(response: dict) -> Iterator[dict]:
+    """Replay a finished (e.g. cached) analysis response as stream events."""
+    yield verdict_event(response)
+    if response.get("summary"):
+        yield {"type": "summary", "text": response["summary"]}
+    if response.get("roadmap"):
+        yield {"type": "roadmap", "text": response["roadmap"]}
+    yield {
+        "type": "key_concepts",
+        "key_concepts": response.get("key_concepts"),
+        "difficulty_level": response.get("difficulty_level"),
+    }
+    yield {"type": "done", "response": response}
+
+
+class EventBroadcast:
+    """Runs one event stream in its own task; any number of subscribers follow it from the start."""
+
+    def __init__(self, events: AsyncIterator[dict]):
+        self.events: List[dict] = []
+        self.finished = False
+        self._changed = asyncio.Condition()
+        self.task = asyncio.ensure_future(self._pump(events))
+
+    async def _pump(self, events: AsyncIterator[dict]):
+        try:
+            async for event in events:
+                async with self._changed:
+                    self.events.append(event)
+                    self._changed.notify_all()
+        except Exception as e:
+            async with self._changed:
+                self.events.append(error_event(e))
+        finally:
+            async with self._changed:
+                self.finished = True
+                self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[dict]:
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < len(self.events) or self.finished)
+                batch = self.events[position:]
+                finished = self.finished
+            for event in batch:
+                yield event
+            position += len(batch)
+            if finished and position == len(self.events):
+                return
+
+
+class StreamFlights:
+    """Shares one in-progress event stream between concurrent requests with the same key."""
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._broadcasts: Dict[str, EventBroadcast] = {}
+
+    async def subscribe(self, key: str, start: Callable[[], AsyncIterator[dict]]) -> AsyncIterator[dict]:
+        """Follow the stream for `key`, starting it with `start()` if none is running."""
+        broadcast = self._broadcasts.get(key)
+        if broadcast is None:
+            broadcast = EventBroadcast(start())
+            self._broadcasts[key] = broadcast
+            broadcast.task.add_done_callback(lambda _: self._finish(key, broadcast))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        async for event in broadcast.subscribe():
+            yield event
+
+    def _finish(self, key: str, broadcast: EventBroadcast):
+        if self._broadcasts.get(key) is broadcast:
+            del self._broadcasts[key]
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._broadcasts), "started": self.leaders, "coalesced": self.coalesced}
+
+
+_stream_flights: Optional[StreamFlights] = None
+
+
+def get_stream_flights() -> StreamFlights:
+    """Return the process-wide registry of in-flight analysis streams."""
+    global _stream_flights
+    if _stream_flights is None:
+        _stream_flights = StreamFlights()
+    return _stream_flights
+
+
+async def to_ndjson(events: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """Encode events as NDJSON lines for a StreamingResponse."""
+    async for event in events:
+        yield json.dumps(event) + "\n"
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+# Server-side tutor chat sessions (POST /api/chat with a session_id).
+# Without a session the client sends the whole conversation every turn and
+# Ollama prefills all of it again, so turn N costs O(N) prompt tokens. A session
+# keeps the conversation and the token context Ollama returned after the last
+# reply. The next turn sends only the new message with that context through
+# /api/generate (/api/chat returns no context), and Ollama prefills just the new
+# tokens, because the start of the prompt matches what its runner has cached.
+#
+# Sessions live in this process only. A session that was evicted, or that a
+# multi-worker gateway routed to another worker, is rebuilt from the history the
+# client sends. Idle sessions expire after CHAT_SESSION_IDLE_TTL seconds. When
+# the store holds more than CHAT_SESSION_MAX_BYTES (token contexts plus message
+# text) or more than CHAT_SESSION_MAX_SESSIONS sessions, the least recently used
+# ones are dropped.
+CHAT_SESSION_IDLE_TTL = float(os.environ.get("CHAT_SESSION_IDLE_TTL", "1800"))
+CHAT_SESSION_MAX_BYTES = int(os.environ.get("CHAT_SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+CHAT_SESSION_MAX_SESSIONS = int(os.environ.get("CHAT_SESSION_MAX_SESSIONS", "2000"))
+
+# Python object overhead per stored message, on top of its text
+_MESSAGE_OVERHEAD = 200
+
+
+class ChatSession:
+    """One conversation: its messages and Ollama's token context after the last reply."""
+
+    def __init__(self, session_id: str, model: str, system_prompt: str):
+        self.session_id = session_id
+        self.model = model
+        self.system_prompt = system_prompt
+        self.history: List[Dict[str, str]] = []
+        # Token ids as int32 rather than a list of Python ints (4 bytes each instead of ~36)
+        self.context = array("i")
+        self.last_used = time.monotonic()
+        self.turns = 0
+        self.lock = asyncio.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        text = sum(len(m["content"]) + _MESSAGE_OVERHEAD for m in self.history)
+        return self.context.itemsize * len(self.context) + text
+
+    def matches(self, model: str, system_prompt: str) -> bool:
+        return self.model == model and self.system_prompt == system_prompt
+
+    def new_messages(self, messages: List[Dict[str, str]]) -> Optional[List[Dict[str, str]]]:
+        """The messages after this session's history, or None if `messages` does not continue it."""
+        if not self.context or len(messages) <= len(self.history) or messages[:len(self.history)] != self.history:
+            return None
+        return messages[len(self.history):]
+
+    def reset(self):
+        self.history = []
+        self.context = array("i")
+
+    def record_turn(self, messages: List[Dict[str, str]], reply: str, context: Optional[Sequence[int]]):
+        """Store the conversation after a finished reply, with the context Ollama returned for it."""
+        self.history = [*messages, {"role": "assistant", "content": reply}]
+        self.context = array("i", context or ())
+        self.turns += 1
+
+
+def to_prompt(messages: List[Dict[str, str]]) -> str:
+    """Messages as one generate prompt: a lone user message as is, several as a transcript."""
+    if len(messages) == 1 and messages[0]["role"] == "user":
+        return messages[0]["content"]
+    return "\n\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in messages)
+
+
+class ChatSessionStore:
+    """Sessions by id, in least recently used order."""
+
+    def __init__(self, idle_ttl: float = CHAT_SESSION_IDLE_TTL, max_bytes: int = CHAT_SESSION_MAX_BYTES,
+                 max_sessions: int = CHAT_SESSION_MAX_SESSIONS):
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self.created = 0
+        self.resumed = 0
+        self.rebuilt = 0
+        self.expired = 0
+        self.evicted = 0
+        self.prompt_tokens_reused = 0
+
+    def _expire(self, now: float):
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if now - session.last_used <= self.idle_ttl or session.lock.locked():
+                break
+            del self.sessions[session.session_id]
+            self.expired += 1
+
+    def _enforce_limits(self, keep: str):
+        """Drop least recently used sessions (never `keep` or one mid-turn) until within the limits."""
+        total = sum(s.nbytes for s in self.sessions.values())
+        for session in list(self.sessions.values()):
+            if total <= self.max_bytes and len(self.sessions) <= self.max_sessions:
+                break
+            if session.session_id == keep or session.lock.locked():
+                continue
+            total -= session.nbytes
+            del self.sessions[session.session_id]
+            self.evicted += 1
+
+    def open(self, session_id: Optional[str], model: str, system_prompt: str) -> ChatSession:
+        """The live session `session_id` for this tutor, or a new one under a new id.
+
+        Ids are only ever issued here, so a client cannot pick (or guess) another client's session.
+        """
+        now = time.monotonic()
+        self._expire(now)
+        session = self.sessions.get(session_id) if session_id else None
+        if session is None or not session.matches(model, system_prompt):
+            if session_id:
+                # Expired, evicted, held by another worker, or the tutor changed
+                self.rebuilt += 1
+            session = ChatSession(uuid.uuid4().hex, model, system_prompt)
+            self.sessions[session.session_id] = session
+            self.created += 1
+        self.sessions.move_to_end(session.session_id)
+        session.last_used = now
+        return session
+
+    def begin_turn(self, session: ChatSession, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """The messages to prefill for this turn: only the new ones if the session can be resumed, else all."""
+        new = session.new_messages(messages)
+        if new is not None:
+            self.resumed += 1
+            self.prompt_tokens_reused += len(session.context)
+            return new
+        if session.turns:
+            # The client's history no longer matches ours (edited, or a turn that failed midway)
+            self.rebuilt += 1
+        session.reset()
+        return messages
+
+    def finish_turn(self, session: ChatSession, messages: List[Dict[str, str]], reply: str,
+                    context: Optional[Sequence[int]]):
+        session.record_turn(messages, reply, context)
+        session.last_used = time.monotonic()
+        if session.session_id in self.sessions:
+            self.sessions.move_to_end(session.session_id)
+            self._enforce_limits(keep=session.session_id)
+
+    def discard(self, session_id: str) -> bool:
+        return self.sessions.pop(session_id, None) is not None
+
+    def stats(self) -> dict:
+        self._expire(time.monotonic())
+        return {
+            "sessions": len(self.sessions),
+            "bytes": sum(s.nbytes for s in self.sessions.values()),
+            "max_bytes": self.max_bytes,
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "created": self.created,
+            "resumed": self.resumed,
+            "rebuilt": self.rebuilt,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "prompt_tokens_reused": self.prompt_tokens_reused,
+        }
+
+
+_store: Optional[ChatSessionStore] = None
+
+
+def get_chat_sessions() -> ChatSessionStore:
+    """Return the process-wide chat session store."""
+    global _store
+    if _store is None:
+        _store = ChatSessionStore()
+    return _store
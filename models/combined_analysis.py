@@ -0,0 +1,120 @@
+import re
+
+from ollama_client import generate
+from structured_output import difficulty_from_text
+from token_budget import TokenUsage, budgeted_options, estimate_tokens
+
+# Single-pass analysis: one generation returns the domain verdict, summary,
+# roadmap, key concepts and difficulty as labelled sections, so the document
+# is prefilled once instead of three times (domain check, summary, roadmap).
+SECTIONS = ("DOMAIN CHECK", "SUMMARY", "ROADMAP", "KEY CONCEPTS", "DIFFICULTY")
+
+_SECTION_RE = re.compile(r"^\s*#{2,}\s*(" + "|".join(SECTIONS) + r")\s*:?\s*$", re.M | re.I)
+
+
+def build_context_info(context) -> str:
+    """Render the optional request context the same way the per-prompt analyzers do."""
+    if not context:
+        return ""
+    return f"""
+    Context Information:
+    - Subject: {context.subject or 'Not specified'}
+    - Level: {context.level or 'Not specified'}
+    - Format: {context.format or 'Not specified'}
+    """
+
+
+def build_combined_prompt(domain: str, scope: str, text: str, query_type: str, context=None,
+                          article: str = "a", advanced: bool = False) -> str:
+    """Build one prompt that asks for every analysis section at once.
+
+    Key concepts and difficulty are only asked for in an advanced analysis, as in the per-prompt path.
+    """
+    advanced_sections = f"""
+### KEY CONCEPTS
+[Comma-separated list of the main {domain} concepts]
+
+### DIFFICULTY
+[One of: Beginner, Intermediate, Advanced]
+""" if advanced else ""
+    return f"""<s>[INST] You are {article} {domain} domain expert and educator using the latest Llama 3 model.
+The text is of type: {query_type}.
+{build_context_info(context)}
+First decide whether the text is related to {scope}. Then analyze it and answer
+using exactly these section headers, in this order:
+
+### DOMAIN CHECK
+related: yes or no; confidence: a number between 0 and 1
+
+### SUMMARY
+[Content types found, a detailed analysis of each, and an overall {domain} summary]
+
+### ROADMAP
+[A step-by-step {domain} learning path, a study schedule with milestones, and additional resources]
+{advanced_sections}
+If the text is not related, write only the DOMAIN CHECK section.
+
+Text content:
+{text} [/INST]"""
+
+
+def parse_combined_response(response_text: str) -> dict:
+    """Split a combined generation into its sections and parse the domain verdict."""
+    sections = {}
+    matches = list(_SECTION_RE.finditer(response_text))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(response_text)
+        sections[match.group(1).upper()] = response_text[match.end():end].strip()
+
+    if "DOMAIN CHECK" in sections:
+        verdict = sections["DOMAIN CHECK"].lower()
+        is_domain = bool(re.search(r"related\s*:\s*(yes|true)", verdict))
+        confidence_match = re.search(r"confidence\s*:\s*([01](?:\.\d+)?)", verdict)
+        if confidence_match:
+            confidence = float(confidence_match.group(1))
+        else:
+            confidence = 0.8 if is_domain else 0.2
+    else:
+        # No verdict section: trust the analysis if the model produced one
+        is_domain, confidence = bool(sections.get("SUMMARY")), 0.5
+
+    key_concepts = [c.strip(" -*\n") for c in sections.get("KEY CONCEPTS", "").split(",")]
+
+    return {
+        "is_domain": is_domain,
+        "confidence": confidence,
+        # Fall back to the raw text if the model ignored the section headers
+        "summary": sections.get("SUMMARY") or response_text.strip(),
+        "roadmap": sections.get("ROADMAP", ""),
+        "key_concepts": [c for c in key_concepts if c],
+        "difficulty_level": difficulty_from_text(sections.get("DIFFICULTY", "")),
+    }
+
+
+SINGLE_PASS_OPTIONS = {
+    'num_predict': 3000,
+    'temperature': 0.8,
+    'top_p': 0.95,
+    'top_k': 50,
+    'repeat_penalty': 1.2,
+    'presence_penalty': 0.1,
+    'frequency_penalty': 0.1
+}
+
+
+async def run_single_pass(model_name: str, domain: str, scope: str, text: str, query_type: str, context=None,
+                          advanced: bool = False, usage: TokenUsage = None, article: str = "a") -> dict:
+    """Run the combined prompt once and return the parsed sections.
+
+    Without `advanced`, key_concepts and difficulty_level are None, matching the per-prompt response.
+    """
+    prompt = build_combined_prompt(domain, scope, text, query_type, context, article, advanced)
+    options, prompt_tokens = budgeted_options(SINGLE_PASS_OPTIONS, "single_pass", prompt, estimate_tokens(text), advanced)
+    response = await generate(model=model_name, prompt=prompt, options=options)
+    if usage is not None:
+        usage.plan("single_pass", prompt_tokens, options["num_predict"])
+        usage.record("single_pass", response)
+    result = parse_combined_response(response['response'])
+    if not advanced:
+        result["key_concepts"] = result["difficulty_level"] = None
+    return result
@@ -0,0 +1,184 @@
+import os
+import re
+import zlib
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Container, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from domain_specs import DOMAIN_SPECS
+from verdict_cache import cached_llm_check
+
+# Fast local domain classifier used to gate /analyze requests.
+# Each domain is described by the vocabulary in its spec (domain_specs.py).
+# Text and vocabularies are turned into hashed unigram+bigram TF-IDF vectors,
+# and every domain is scored with a single matrix multiply, so the gate costs microseconds instead of a
+# full LLM round-trip. The LLM check only runs when the classifier is unsure.
+
+def _vocabularies() -> Dict[str, List[str]]:
+    return {domain_id: spec["vocabulary"] for domain_id, spec in DOMAIN_SPECS.items() if spec["vocabulary"]}
+
+
+DOMAIN_VOCABULARIES: Dict[str, List[str]] = _vocabularies()
+
+N_FEATURES = 2 ** 14
+
+# Gate thresholds (cosine-similarity space); tune via env without a redeploy
+MIN_EVIDENCE = float(os.environ.get("DOMAIN_GATE_MIN_EVIDENCE", "0.05"))
+ACCEPT_RATIO = float(os.environ.get("DOMAIN_GATE_ACCEPT_RATIO", "0.75"))
+REJECT_RATIO = float(os.environ.get("DOMAIN_GATE_REJECT_RATIO", "0.2"))
+STRONG_SCORE = 0.15
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _features(tokens: List[str]) -> List[int]:
+    """Hash unigrams and bigrams into feature buckets (crc32 is stable across processes)."""
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return [zlib.crc32(g.encode("utf-8")) % N_FEATURES for g in grams]
+
+
+class DomainClassifier:
+    """Scores text against every domain vocabulary in one matrix multiply."""
+
+    def __init__(self, vocabularies: Dict[str, List[str]]):
+        self.domains = list(vocabularies)
+        self.index = {domain: i for i, domain in enumerate(self.domains)}
+
+        counts = np.zeros((len(self.domains), N_FEATURES), dtype=np.float32)
+        for i, domain in enumerate(self.domains):
+            for term in vocabularies[domain]:
+                for feature in _features(_tokenize(term)):
+                    counts[i, feature] += 1.0
+
+        # IDF over the domain "documents": terms shared by many domains weigh less
+        df = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1.0 + len(self.domains)) / (1.0 + df)) + 1.0).astype(np.float32)
+
+        weights = np.log1p(counts) * self.idf
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        self.matrix = weights / np.maximum(norms, 1e-9)
+
+    def vectorize(self, text: str) -> np.ndarray:
+        vector = np.zeros(N_FEATURES, dtype=np.float32)
+        features = _features(_tokenize(text))
+        if features:
+            np.add.at(vector, features, 1.0)
+        vector = np.log1p(vector) * self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def scores(self, text: str) -> np.ndarray:
+        """Cosine similarity between the text and every domain."""
+        return self.matrix @ self.vectorize(text)
+
+    def rank(self, text: str) -> List[Tuple[str, float]]:
+        scores = self.scores(text)
+        order = np.argsort(-scores)
+        return [(self.domains[i], float(scores[i])) for i in order]
+
+    def best_alternative(self, domain_id: str, text: str,
+                         candidates: Optional[Container[str]] = None) -> Optional[Tuple[str, float]]:
+        """The best-scoring domain other than `domain_id` (among `candidates`), or None without evidence."""
+        for other, score in self.rank(text):
+            if score < MIN_EVIDENCE:
+                return None
+            if other != domain_id and (candidates is None or other in candidates):
+                return other, round(score, 3)
+        return None
+
+    def verdict(self, domain_id: str, text: str) -> Optional[Tuple[bool, float]]:
+        """Return (is_domain, confidence), or None when the classifier is not sure."""
+        if domain_id not in self.index:
+            return None
+        scores = self.scores(text)
+        best = float(scores.max())
+        if best < MIN_EVIDENCE:
+            return None
+
+        score = float(scores[self.index[domain_id]])
+        ratio = score / best
+        if ratio >= ACCEPT_RATIO:
+            return True, round(0.5 + 0.5 * min(1.0, score / STRONG_SCORE), 3)
+        if ratio <= REJECT_RATIO:
+            return False, round(0.5 * ratio, 3)
+        return None
+
+
+_classifier: Optional[DomainClassifier] = None
+
+
+def get_classifier() -> DomainClassifier:
+    """Build the shared classifier on first use."""
+    global _classifier
+    if _classifier is None:
+        _classifier = DomainClassifier(DOMAIN_VOCABULARIES)
+    return _classifier
+
+
+def reset_classifier():
+    """Re-read the vocabularies from DOMAIN_SPECS (after a hot reload); the classifier is rebuilt on next use."""
+    global DOMAIN_VOCABULARIES, _classifier
+    DOMAIN_VOCABULARIES = _vocabularies()
+    _classifier = None
+
+
+LLMCheck = Callable[[str], Awaitable[Tuple[bool, float]]]
+
+
+class DomainGate(ABC):
+    """Decides whether a text belongs to a domain before any generation runs."""
+
+    @abstractmethod
+    async def check(self, domain_id: str, text: str, llm_check: LLMCheck) -> Tuple[bool, float]:
+        """(in domain, confidence) for `text`; `llm_check` asks the model when the gate needs it."""
+
+
+class LLMGate(DomainGate):
+    """Always asks the model (the original behaviour), reusing cached verdicts."""
+
+    async def check(self, domain_id, text, llm_check):
+        return await cached_llm_check(domain_id, text, llm_check)
+
+
+class ClassifierGate(DomainGate):
+    """Uses the local classifier and only asks the model when it is uncertain."""
+
+    def __init__(self, llm_fallback: bool = True):
+        self.llm_fallback = llm_fallback
+
+    async def check(self, domain_id, text, llm_check):
+        verdict = get_classifier().verdict(domain_id, text)
+        if verdict is not None:
+            return verdict
+        if self.llm_fallback:
+            return await cached_llm_check(domain_id, text, llm_check)
+        # Without a model to ask, give the user the benefit of the doubt
+        return True, 0.5
+
+
+DOMAIN_GATES = {
+    "llm": LLMGate,
+    "classifier": ClassifierGate,
+    "classifier_only": lambda: ClassifierGate(llm_fallback=False),
+}
+
+_domain_gate: Optional[DomainGate] = None
+
+
+def get_domain_gate() -> DomainGate:
+    """Return the gate selected by DOMAIN_GATE (classifier, classifier_only or llm)."""
+    global _domain_gate
+    if _domain_gate is None:
+        _domain_gate = DOMAIN_GATES[os.environ.get("DOMAIN_GATE", "classifier")]()
+    return _domain_gate
+
+
+def set_domain_gate(gate: DomainGate):
+    """Plug in a custom gate (e.g. a trained model) for this process."""
+    global _domain_gate
+    _domain_gate = gate
@@ -0,0 +1,163 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+import httpx
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from domain_specs import DOMAIN_SPECS
+
+# Streaming reverse proxy from the gateway to remote domain servers.
+# This replaces the Node hop (Model Backend/main-router.mjs) in front of the
+# per-domain analysis servers. One pooled keep-alive httpx client is shared by
+# every request. Request bodies are streamed upstream as they arrive, and
+# upstream response bytes are relayed as received, without being decoded or
+# re-encoded. The router's chat shape (tutor_id + messages[].parts[].text) is
+# translated into the /analyze request it used to send.
+#
+# Where each domain lives: DOMAIN_SERVICE_URLS ("biology=http://10.0.0.5:8008,...")
+# overrides the default DOMAIN_SERVICE_HOST plus the port from domain_specs.py.
+DOMAIN_SERVICE_HOST = os.environ.get("DOMAIN_SERVICE_HOST", "http://localhost").rstrip("/")
+DOMAIN_SERVICE_URLS = os.environ.get("DOMAIN_SERVICE_URLS", "")
+DOMAIN_PROXY_MAX_CONNECTIONS = int(os.environ.get("DOMAIN_PROXY_MAX_CONNECTIONS", "100"))
+DOMAIN_PROXY_MAX_KEEPALIVE = int(os.environ.get("DOMAIN_PROXY_MAX_KEEPALIVE", "20"))
+DOMAIN_PROXY_CONNECT_TIMEOUT = float(os.environ.get("DOMAIN_PROXY_CONNECT_TIMEOUT", "5"))
+# Same 10 minutes the Node router allowed for an analysis
+DOMAIN_PROXY_READ_TIMEOUT = float(os.environ.get("DOMAIN_PROXY_READ_TIMEOUT", "600"))
+
+# Response headers worth relaying; hop-by-hop and length headers are left to our server
+FORWARDED_RESPONSE_HEADERS = ("content-type", "retry-after", "etag", "cache-control")
+
+_NAME_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_domain(name: str) -> str:
+    """'UI-UX Design', 'art & style', 'Data Science' -> 'ui_ux_design', 'art_style', 'data_science'."""
+    return _NAME_RE.sub("_", name.lower()).strip("_")
+
+
+def parse_service_urls(spec: str) -> Dict[str, str]:
+    """Parse "domain=url,domain=url" into a dict keyed by normalized domain."""
+    urls = {}
+    for item in spec.split(","):
+        if "=" in item:
+            domain, url = item.split("=", 1)
+            urls[normalize_domain(domain)] = url.strip().rstrip("/")
+    return urls
+
+
+class ChatPart(BaseModel):
+    text: str = Field(min_length=1)
+
+
+class RouterChatMessage(BaseModel):
+    role: str = Field(pattern="^(user|model)$")
+    parts: List[ChatPart] = Field(min_length=1)
+
+
+class RouterChatRequest(BaseModel):
+    """The body main-router.mjs accepted on /api/chat."""
+
+    tutor_id: str = Field(min_length=1)
+    messages: List[RouterChatMessage] = Field(min_length=1)
+
+
+def chat_to_analysis(request: RouterChatRequest) -> dict:
+    """The /analyze request main-router.mjs built from a chat: the last message's text, advanced analysis."""
+    domain = request.tutor_id.lower()
+    return {
+        "text": "\n".join(part.text for part in request.messages[-1].parts),
+        "queryType": domain,
+        "model_size": "8b",
+        "advanced_analysis": True,
+        "domain": request.tutor_id,
+        "context": {"subject": domain, "level": "intermediate", "format": "chat"},
+    }
+
+
+async def relay(response: httpx.Response):
+    """Yield the upstream body as received, then return the connection to the pool.
+
+    A background task would not run when the client disconnects mid-stream; this
+    finally does, so an abandoned stream cannot keep its upstream connection.
+    """
+    try:
+        async for chunk in response.aiter_raw():
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+class DomainProxy:
+    """Forwards requests to domain servers over pooled keep-alive connections."""
+
+    def __init__(self, service_urls: Optional[Dict[str, str]] = None):
+        self.service_urls = {
+            domain_id: f"{DOMAIN_SERVICE_HOST}:{spec['port']}" for domain_id, spec in DOMAIN_SPECS.items()
+        }
+        self.service_urls.update(service_urls if service_urls is not None else parse_service_urls(DOMAIN_SERVICE_URLS))
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(DOMAIN_PROXY_READ_TIMEOUT, connect=DOMAIN_PROXY_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=DOMAIN_PROXY_MAX_CONNECTIONS,
+                max_keepalive_connections=DOMAIN_PROXY_MAX_KEEPALIVE,
+            ),
+        )
+
+    def service_url(self, domain: str) -> str:
+        url = self.service_urls.get(normalize_domain(domain))
+        if url is None:
+            raise HTTPException(status_code=400, detail={
+                "error": "Invalid tutor_id (domain)",
+                "available_domains": sorted(self.service_urls),
+            })
+        return url
+
+    async def forward(self, domain: str, path: str, content, headers: Optional[Dict[str, str]] = None,
+                      method: str = "POST") -> StreamingResponse:
+        """Send one request to `domain`'s server and relay the response body as it arrives.
+
+        `content` may be bytes or an async iterator of bytes (e.g. the incoming request stream).
+        """
+        upstream = self.client.build_request(
+            method, f"{self.service_url(domain)}/{path.lstrip('/')}", content=content,
+            headers={"content-type": "application/json", **(headers or {})},
+        )
+        try:
+            response = await self.client.send(upstream, stream=True)
+        except httpx.TimeoutException as e:
+            raise HTTPException(status_code=504, detail=f"Domain service '{domain}' timed out: {e}")
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=502, detail=f"No response received from domain service '{domain}': {e}")
+        relayed = {k: v for k, v in response.headers.items() if k.lower() in FORWARDED_RESPONSE_HEADERS}
+        return StreamingResponse(relay(response), status_code=response.status_code, headers=relayed)
+
+    async def chat(self, request: RouterChatRequest) -> StreamingResponse:
+        """Handle a main-router style chat by proxying the equivalent /analyze request."""
+        body = json.dumps(chat_to_analysis(request)).encode("utf-8")
+        return await self.forward(request.tutor_id, "/analyze", body)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+_proxy: Optional[DomainProxy] = None
+
+
+def get_domain_proxy() -> DomainProxy:
+    """Return the process-wide domain proxy, creating its connection pool on first use."""
+    global _proxy
+    if _proxy is None:
+        _proxy = DomainProxy()
+    return _proxy
+
+
+async def close_domain_proxy():
+    """Close the proxy's upstream connections (call on app shutdown)."""
+    global _proxy
+    if _proxy is not None:
+        await _proxy.close()
+        _proxy = None
@@ -0,0 +1,442 @@
+# Declarative specs for every document-analysis domain.
+#
+# The analysis engine (analysis_engine.py) builds prompts, response models and
+# routes from these entries, so adding a domain means adding a spec here
+# instead of copying another 300-line server.
+#
+#   id            route / registry id (/analyze/{id})
+#   display_name  human readable name, used in API titles
+#   subject       noun used in the prompts ("a biology domain expert")
+#   topic         adjective for the content, defaults to subject ("historical text")
+#   label         capitalised form used in section headers, defaults to subject.title()
+#   scope         what "related to the domain" means for the domain check
+#   flag          response field prefix; responses carry "<flag>_domain"
+#   query_type    default TextRequest.queryType
+#   port          port of the standalone server / compatibility listener
+#   keywords      fallback words when the LLM domain check is not valid JSON
+#   vocabulary    terms for the local domain classifier
+#   mode          "expert" (default) or "tutor" for the general single-prompt analyzer
+#   prompts       optional overrides for the domain_check / summary / roadmap templates
+
+DOMAIN_SPECS = {
+    "art_style": {
+        "id": "art_style",
+        "display_name": "Art & Style",
+        "subject": "art and style",
+        "label": "Art & Style",
+        "scope": "art, design, fashion, aesthetics, or artistic expression",
+        "flag": "is_art",
+        "query_type": "art-style",
+        "port": 8016,
+        "keywords": ["art", "design", "style", "aesthetic"],
+        "vocabulary": [
+            "art", "artist", "artwork", "painting", "drawing", "sketch", "sculpture", "design",
+            "style", "fashion", "aesthetic", "aesthetics", "color theory", "composition", "canvas",
+            "brush", "portrait", "impressionism", "renaissance art", "abstract art", "gallery",
+            "illustration", "texture", "palette", "perspective drawing", "watercolor",
+            "oil painting", "visual art",
+        ],
+    },
+    "biology": {
+        "id": "biology",
+        "display_name": "Biology",
+        "subject": "biology",
+        "scope": "biology or biological concepts",
+        "flag": "is_biology",
+        "query_type": "biology",
+        "port": 8008,
+        "keywords": ["biology", "biological", "organism", "cell"],
+        "vocabulary": [
+            "biology", "biological", "cell", "cells", "organism", "dna", "rna", "gene", "genes",
+            "genetics", "protein", "enzyme", "evolution", "natural selection", "species",
+            "ecosystem", "photosynthesis", "mitosis", "meiosis", "chromosome", "bacteria", "virus",
+            "membrane", "tissue", "organ", "metabolism", "cellular respiration", "mutation",
+            "anatomy", "physiology", "microbiology",
+        ],
+    },
+    "blockchain": {
+        "id": "blockchain",
+        "display_name": "Blockchain",
+        "subject": "blockchain",
+        "scope": "blockchain technology, cryptocurrencies, distributed ledgers, or smart contracts",
+        "flag": "is_blockchain",
+        "query_type": "blockchain",
+        "port": 8020,
+        "keywords": ["blockchain", "crypto", "bitcoin", "ethereum"],
+        "vocabulary": [
+            "blockchain", "cryptocurrency", "crypto", "bitcoin", "ethereum", "smart contract",
+            "smart contracts", "ledger", "distributed ledger", "consensus", "proof of work",
+            "proof of stake", "mining", "wallet", "token", "nft", "defi", "solidity", "hash",
+            "decentralized", "node", "transaction", "block", "web3", "dapp", "gas fee",
+        ],
+    },
+    "business": {
+        "id": "business",
+        "display_name": "Business",
+        "subject": "business",
+        "scope": "business concepts, strategy, management, or operations",
+        "flag": "is_business",
+        "query_type": "business",
+        "port": 8010,
+        "keywords": ["business", "company", "strategy", "management"],
+        "vocabulary": [
+            "business", "company", "strategy", "management", "revenue", "profit", "customer",
+            "market", "competition", "business model", "stakeholder", "operations", "entrepreneur",
+            "entrepreneurship", "startup", "organization", "leadership", "swot", "supply chain",
+            "growth", "sales", "corporate", "enterprise", "value proposition", "business plan",
+        ],
+    },
+    "chemistry": {
+        "id": "chemistry",
+        "display_name": "Chemistry",
+        "subject": "chemistry",
+        "scope": "chemistry or chemical concepts",
+        "flag": "is_chemistry",
+        "query_type": "chemistry",
+        "port": 8007,
+        "keywords": ["chemistry", "chemical", "molecule", "reaction"],
+        "vocabulary": [
+            "chemistry", "chemical", "molecule", "molecules", "atom", "atoms", "reaction",
+            "chemical reaction", "compound", "element", "periodic table", "bond", "covalent bond",
+            "ionic bond", "acid", "base", "ph", "oxidation", "reduction", "stoichiometry", "mole",
+            "solution", "catalyst", "organic chemistry", "electron", "valence", "equilibrium",
+            "titration",
+        ],
+    },
+    "cybersecurity": {
+        "id": "cybersecurity",
+        "display_name": "Cybersecurity",
+        "subject": "cybersecurity",
+        "scope": "cybersecurity, information security, network security, or digital protection",
+        "flag": "is_cybersecurity",
+        "query_type": "cybersecurity",
+        "port": 8019,
+        "keywords": ["security", "cyber", "hack", "protect"],
+        "vocabulary": [
+            "cybersecurity", "security", "information security", "network security", "malware",
+            "phishing", "encryption", "firewall", "vulnerability", "exploit", "attack", "threat",
+            "penetration testing", "intrusion", "authentication", "ransomware", "cve", "xss",
+            "sql injection", "zero day", "access control", "incident response", "siem", "hacker",
+        ],
+    },
+    "data_science": {
+        "id": "data_science",
+        "display_name": "Data Science",
+        "subject": "data science",
+        "scope": "data science, machine learning, statistics, data analysis, or artificial intelligence",
+        "flag": "is_data_science",
+        "query_type": "data-science",
+        "port": 8021,
+        "keywords": ["data", "machine learning", "statistics", "analysis"],
+        "vocabulary": [
+            "data science", "data", "dataset", "machine learning", "statistics", "statistical",
+            "regression", "classification", "clustering", "neural network", "deep learning",
+            "model training", "feature engineering", "pandas", "numpy", "visualization",
+            "data analysis", "prediction", "artificial intelligence", "ai", "overfitting",
+            "cross validation", "accuracy", "big data",
+        ],
+    },
+    "devops": {
+        "id": "devops",
+        "display_name": "DevOps",
+        "subject": "DevOps",
+        "label": "DevOps",
+        "scope": "DevOps practices, tools, methodologies, or infrastructure",
+        "flag": "is_devops",
+        "query_type": "devops",
+        "port": 8018,
+        "keywords": ["devops", "ci/cd", "infrastructure", "deployment"],
+        "vocabulary": [
+            "devops", "ci", "cd", "ci cd", "continuous integration", "continuous delivery",
+            "continuous deployment", "pipeline", "docker", "container", "containers", "kubernetes",
+            "infrastructure", "infrastructure as code", "terraform", "ansible", "jenkins",
+            "deployment", "monitoring", "observability", "cloud", "aws", "microservices", "sre",
+            "helm", "orchestration",
+        ],
+    },
+    "finance": {
+        "id": "finance",
+        "display_name": "Finance",
+        "subject": "finance",
+        "scope": "finance, economics, investments, banking, or financial markets",
+        "flag": "is_finance",
+        "query_type": "finance",
+        "port": 8000,
+        "keywords": ["finance", "investment", "banking", "market"],
+        "vocabulary": [
+            "finance", "financial", "economics", "investment", "investments", "investing",
+            "banking", "bank", "market", "financial markets", "stock", "stocks", "bond", "bonds",
+            "interest rate", "inflation", "portfolio", "asset", "assets", "liability", "equity",
+            "dividend", "accounting", "budget", "cash flow", "valuation", "risk",
+            "return on investment", "loan", "credit",
+        ],
+    },
+    "geography": {
+        "id": "geography",
+        "display_name": "Geography",
+        "subject": "geography",
+        "topic": "geographical",
+        "label": "Geographical",
+        "scope": "geography or geographical concepts",
+        "flag": "is_geography",
+        "query_type": "geography",
+        "port": 8004,
+        "keywords": ["geography", "geographical", "location"],
+        "vocabulary": [
+            "geography", "geographical", "map", "maps", "continent", "country", "countries",
+            "region", "climate", "landform", "mountain", "river", "ocean", "population",
+            "latitude", "longitude", "terrain", "plate tectonics", "erosion", "urbanization",
+            "migration", "biome", "topography", "physical geography", "human geography",
+        ],
+    },
+    "history": {
+        "id": "history",
+        "display_name": "History",
+        "subject": "history",
+        "topic": "historical",
+        "label": "Historical",
+        "scope": "history or historical concepts",
+        "flag": "is_history",
+        "query_type": "history",
+        "port": 8002,
+        "keywords": ["history", "historical"],
+        "vocabulary": [
+            "history", "historical", "war", "empire", "revolution", "ancient", "medieval",
+            "century", "civilization", "dynasty", "king", "queen", "colonial", "colonialism",
+            "world war", "independence", "treaty", "archaeology", "historian", "era", "monarchy",
+            "industrial revolution", "cold war", "civil war", "renaissance",
+        ],
+    },
+    "language_communication": {
+        "id": "language_communication",
+        "display_name": "Language & Communication",
+        "subject": "language and communication",
+        "label": "Language and Communication",
+        "scope": "language learning, communication skills, or linguistic concepts",
+        "flag": "is_language",
+        "query_type": "language-communication",
+        "port": 8013,
+        "keywords": ["language", "communication", "linguistic", "grammar"],
+        "vocabulary": [
+            "language", "communication", "grammar", "vocabulary", "linguistics", "linguistic",
+            "pronunciation", "speaking", "writing", "listening", "reading", "public speaking",
+            "conversation", "sentence", "verb", "noun", "tense", "syntax", "fluency", "rhetoric",
+            "presentation", "essay", "second language", "language learning",
+            "communication skills",
+        ],
+    },
+    "legal": {
+        "id": "legal",
+        "display_name": "Legal",
+        "subject": "legal",
+        "scope": "legal concepts, laws, or legal procedures",
+        "flag": "is_legal",
+        "query_type": "legal",
+        "port": 8009,
+        "keywords": ["legal", "law", "contract", "jurisdiction"],
+        "vocabulary": [
+            "legal", "law", "laws", "court", "contract", "contracts", "statute", "regulation",
+            "rights", "liability", "lawsuit", "plaintiff", "defendant", "attorney", "lawyer",
+            "judge", "jurisdiction", "constitution", "legislation", "compliance", "tort",
+            "criminal law", "civil law", "intellectual property", "legal procedure", "precedent",
+        ],
+    },
+    "marketing": {
+        "id": "marketing",
+        "display_name": "Marketing",
+        "subject": "marketing",
+        "scope": "marketing concepts, strategies, or marketing operations",
+        "flag": "is_marketing",
+        "query_type": "marketing",
+        "port": 8011,
+        "keywords": ["marketing", "advertising", "brand", "campaign"],
+        "vocabulary": [
+            "marketing", "brand", "branding", "advertising", "campaign", "seo", "social media",
+            "content marketing", "customer", "audience", "target audience", "segmentation",
+            "positioning", "conversion", "funnel", "marketing strategy", "digital marketing",
+            "engagement", "promotion", "market research", "email marketing", "influencer", "ctr",
+            "customer acquisition",
+        ],
+    },
+    "mathematics": {
+        "id": "mathematics",
+        "display_name": "Mathematics",
+        "subject": "mathematics",
+        "scope": "mathematics, mathematical concepts, equations, or mathematical reasoning",
+        "flag": "is_mathematics",
+        "query_type": "mathematics",
+        "port": 8001,
+        "keywords": ["math", "mathematics", "equation", "formula"],
+        "vocabulary": [
+            "mathematics", "math", "mathematical", "equation", "equations", "algebra", "calculus",
+            "geometry", "theorem", "proof", "function", "derivative", "integral", "matrix",
+            "vector", "probability", "number theory", "polynomial", "limit", "trigonometry",
+            "linear algebra", "differential equation", "set theory", "prime", "formula",
+        ],
+    },
+    "mental_health": {
+        "id": "mental_health",
+        "display_name": "Mental Health",
+        "subject": "mental health",
+        "scope": "mental health, psychology, emotional well-being, or mental wellness",
+        "flag": "is_mental_health",
+        "query_type": "mental-health",
+        "port": 8023,
+        "keywords": ["mental", "psychology", "emotional", "wellness"],
+        "vocabulary": [
+            "mental health", "anxiety", "depression", "stress", "wellbeing", "well being",
+            "wellness", "emotional", "therapy", "therapist", "counseling", "mindfulness",
+            "self care", "burnout", "trauma", "coping", "panic", "mood", "mental wellness",
+            "emotional well being", "resilience", "meditation", "psychiatric", "support",
+        ],
+    },
+    "music": {
+        "id": "music",
+        "display_name": "Music",
+        "subject": "music",
+        "scope": "music theory, composition, performance, or music history",
+        "flag": "is_music",
+        "query_type": "music",
+        "port": 8015,
+        "keywords": ["music", "melody", "rhythm", "harmony"],
+        "vocabulary": [
+            "music", "musical", "melody", "harmony", "rhythm", "chord", "chords", "scale", "tempo",
+            "composition", "composer", "instrument", "guitar", "piano", "song", "songwriting",
+            "music theory", "notation", "orchestra", "genre", "beat", "performance", "pitch",
+            "key signature", "music history",
+        ],
+    },
+    "philosophy_ethics": {
+        "id": "philosophy_ethics",
+        "display_name": "Philosophy & Ethics",
+        "subject": "philosophy and ethics",
+        "label": "Philosophy & Ethics",
+        "scope": "philosophical concepts, ethical theories, moral reasoning, or philosophical inquiry",
+        "flag": "is_philosophy",
+        "query_type": "philosophy-ethics",
+        "port": 8017,
+        "keywords": ["philosophy", "ethics", "moral", "ethical"],
+        "vocabulary": [
+            "philosophy", "philosophical", "ethics", "ethical", "moral", "morality", "virtue",
+            "utilitarianism", "deontology", "kant", "plato", "aristotle", "socrates",
+            "metaphysics", "epistemology", "existentialism", "logic", "argument", "free will",
+            "justice", "consciousness", "moral reasoning", "ethical theory", "ontology",
+        ],
+    },
+    "physics": {
+        "id": "physics",
+        "display_name": "Physics",
+        "subject": "physics",
+        "scope": "physics or physical concepts",
+        "flag": "is_physics",
+        "query_type": "physics",
+        "port": 8006,
+        "keywords": ["physics", "physical", "force", "energy"],
+        "vocabulary": [
+            "physics", "physical", "force", "energy", "mass", "velocity", "acceleration",
+            "momentum", "gravity", "newton", "motion", "quantum", "quantum mechanics",
+            "relativity", "thermodynamics", "electromagnetism", "wave", "particle",
+            "kinetic energy", "potential energy", "friction", "optics", "electric field",
+            "magnetic field", "newton's laws",
+        ],
+    },
+    "product_management": {
+        "id": "product_management",
+        "display_name": "Product Management",
+        "subject": "product management",
+        "scope": "product management, product development, or product strategy",
+        "flag": "is_product",
+        "query_type": "product-management",
+        "port": 8014,
+        "keywords": ["product", "management", "strategy", "development"],
+        "vocabulary": [
+            "product management", "product", "product manager", "roadmap", "product roadmap",
+            "backlog", "user story", "user stories", "mvp", "prioritization", "stakeholder",
+            "requirements", "product strategy", "product development", "sprint", "agile", "scrum",
+            "kpi", "okr", "feature", "launch", "product market fit", "customer discovery",
+            "go to market",
+        ],
+    },
+    "productivity": {
+        "id": "productivity",
+        "display_name": "Productivity",
+        "subject": "productivity",
+        "scope": "productivity, time management, efficiency, work optimization, or personal development",
+        "flag": "is_productivity",
+        "query_type": "productivity",
+        "port": 8022,
+        "keywords": ["productivity", "efficiency", "time management", "optimization"],
+        "vocabulary": [
+            "productivity", "productive", "time management", "efficiency", "focus", "habit",
+            "habits", "goal", "goals", "planning", "schedule", "procrastination", "pomodoro",
+            "to do list", "prioritize", "workflow", "deep work", "personal development", "routine",
+            "deadline", "task management", "getting things done", "work optimization",
+        ],
+    },
+    "programming": {
+        "id": "programming",
+        "display_name": "Programming",
+        "subject": "programming",
+        "scope": "programming or software development concepts",
+        "flag": "is_programming",
+        "query_type": "programming",
+        "port": 8003,
+        "keywords": ["programming", "code", "software"],
+        "vocabulary": [
+            "programming", "code", "coding", "software", "software development", "function",
+            "variable", "loop", "class", "object", "algorithm", "data structure", "python", "java",
+            "javascript", "compiler", "debugging", "bug", "api", "library", "framework",
+            "recursion", "array", "object oriented", "syntax", "git",
+        ],
+    },
+    "psychology": {
+        "id": "psychology",
+        "display_name": "Psychology",
+        "subject": "psychology",
+        "topic": "psychological",
+        "label": "Psychological",
+        "scope": "psychology or psychological concepts",
+        "flag": "is_psychology",
+        "query_type": "psychology",
+        "port": 8005,
+        "keywords": ["psychology", "psychological", "behavior"],
+        "vocabulary": [
+            "psychology", "psychological", "behavior", "behaviour", "cognition", "cognitive",
+            "emotion", "personality", "perception", "memory", "learning", "motivation",
+            "conditioning", "freud", "developmental psychology", "social psychology",
+            "cognitive psychology", "neuroscience", "brain", "mind", "experiment", "bias",
+            "attachment",
+        ],
+    },
+    "ui_ux_design": {
+        "id": "ui_ux_design",
+        "display_name": "UI-UX Design",
+        "subject": "UI-UX design",
+        "label": "UI-UX Design",
+        "scope": "user interface design, user experience, or design principles",
+        "flag": "is_uiux",
+        "query_type": "ui-ux",
+        "port": 8012,
+        "keywords": ["ui", "ux", "interface", "design"],
+        "vocabulary": [
+            "ui", "ux", "user interface", "user experience", "design", "usability", "wireframe",
+            "wireframes", "prototype", "prototyping", "figma", "user research", "persona",
+            "accessibility", "layout", "typography", "interaction design",
+            "information architecture", "design system", "user testing", "visual hierarchy",
+            "user flow", "design principles",
+        ],
+    },
+    "general": {
+        "id": "general",
+        "display_name": "General AI Tutor",
+        "subject": "general",
+        "mode": "tutor",
+        # The original general server reported its flag under this name
+        "flag": "is_finance",
+        "query_type": "general",
+        "port": 8024,
+        "model": "llama3",
+        "keywords": [],
+        "vocabulary": [],
+    },
+}
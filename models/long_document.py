@@ -0,0 +1,109 @@
+import asyncio
+import os
+import re
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+from token_budget import estimate_tokens
+
+# Map-reduce for long documents.
+# A document longer than LONG_DOC_THRESHOLD_TOKENS is split into chunks of about
+# LONG_DOC_CHUNK_TOKENS, each chunk is condensed into notes in parallel (every
+# call still goes through admission control), and the joined notes replace the
+# document in the summary/roadmap prompts. If the notes are still too long, they
+# are condensed again, up to LONG_DOC_MAX_ROUNDS times.
+#
+# A document only has as many chunks in flight as the caller allows (the model's
+# bulk slots). Queueing every chunk at once would leave the last ones waiting
+# behind the first until admission rejects them, failing the whole document.
+LONG_DOC_THRESHOLD_TOKENS = int(os.environ.get("LONG_DOC_THRESHOLD_TOKENS", "3000"))
+LONG_DOC_CHUNK_TOKENS = int(os.environ.get("LONG_DOC_CHUNK_TOKENS", "1500"))
+LONG_DOC_MAX_ROUNDS = int(os.environ.get("LONG_DOC_MAX_ROUNDS", "3"))
+
+# Roughly 4 characters per token for English text; only used to pick cut points
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+# (chunk text, part number, number of parts) -> notes for that chunk
+ChunkSummarizer = Callable[[str, int, int], Awaitable[str]]
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` to about `max_tokens`, at a word boundary."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+
+def is_long(text: str) -> bool:
+    return estimate_tokens(text) > LONG_DOC_THRESHOLD_TOKENS
+
+
+def _pieces(text: str, max_tokens: int) -> List[str]:
+    """Break text into pieces no longer than max_tokens: paragraphs, then sentences, then words."""
+    pieces = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_RE.split(paragraph):
+            while estimate_tokens(sentence) > max_tokens:
+                head = truncate_to_tokens(sentence, max_tokens)
+                pieces.append(head)
+                sentence = sentence[len(head):].strip()
+            if sentence:
+                pieces.append(sentence)
+    return pieces
+
+
+def split_into_chunks(text: str, max_tokens: int = LONG_DOC_CHUNK_TOKENS) -> List[str]:
+    """Pack paragraphs (or sentences of long paragraphs) greedily into chunks of about max_tokens."""
+    chunks, current, current_tokens = [], [], 0
+    for piece in _pieces(text, max_tokens):
+        tokens = estimate_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+async def condense(text: str, summarize_chunk: ChunkSummarizer, max_parallel: int = 1) -> Tuple[str, dict]:
+    """Map-reduce `text` into notes short enough for one prompt, summarizing up to `max_parallel` chunks at once.
+
+    Returns the notes and a report with the chunk count of the first round,
+    the number of rounds and the seconds spent per round.
+    """
+    report = {"chunk_count": 0, "rounds": 0, "map_seconds": []}
+    limit = asyncio.Semaphore(max(1, max_parallel))
+
+    async def summarize(chunk: str, part: int, parts: int) -> str:
+        async with limit:
+            return await summarize_chunk(chunk, part, parts)
+
+    while is_long(text) and report["rounds"] < LONG_DOC_MAX_ROUNDS:
+        chunks = split_into_chunks(text)
+        if not report["chunk_count"]:
+            report["chunk_count"] = len(chunks)
+        started = time.perf_counter()
+        notes = await asyncio.gather(*(
+            summarize(chunk, part, len(chunks)) for part, chunk in enumerate(chunks, start=1)
+        ))
+        report["map_seconds"].append(round(time.perf_counter() - started, 3))
+        report["rounds"] += 1
+        text = "\n\n".join(f"Part {part} notes:\n{note.strip()}" for part, note in enumerate(notes, start=1))
+    if is_long(text):
+        # Notes that will not shrink any further are cut rather than overflowing the context
+        text = truncate_to_tokens(text, LONG_DOC_THRESHOLD_TOKENS)
+        report["truncated"] = True
+    return text, report
@@ -0,0 +1,176 @@
+import bisect
+import math
+import os
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Prometheus text-format metrics for the gateway and the analyzers (GET /metrics).
+# Written against the exposition format directly rather than pulling in
+# prometheus_client. Updates take no locks: every observation happens on the
+# event loop thread, so a metric update is a dict lookup plus a few list
+# increments. Values that other modules already track (cache hits, admission
+# queues) are read at scrape time through callback gauges instead of being
+# counted twice.
+#
+# The registry is per process. Under a multi-worker gateway (main.py --workers,
+# which sets ADMISSION_WORKERS) a scrape reaches whichever worker accepts it, so
+# every series gets a worker="<pid>" label: each worker's counters stay
+# monotonic as separate series instead of jumping between workers' totals. A
+# scrape still only sees one worker; for complete metrics run a single worker.
+LabelValues = Tuple[str, ...]
+
+# Latency buckets in seconds, from a cache hit to a long 70b generation
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60, 120, 300, 600)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120, 200)
+
+# Labels added to every series of this process
+CONSTANT_LABELS: Dict[str, str] = (
+    {"worker": str(os.getpid())} if int(os.environ.get("ADMISSION_WORKERS", "1")) > 1 else {}
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*CONSTANT_LABELS.items(), *zip(names, values))]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Exposition lines for this metric's series."""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    """A total that only goes up; `collect` reads it from elsewhere at scrape time instead."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 collect: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, help_text, labels)
+        self.values: Dict[LabelValues, float] = {}
+        self.collect = collect
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self) -> List[str]:
+        if self.collect is not None:
+            self.values = dict(self.collect())
+        return [f"{self.name}{_format_labels(self.labels, k)} {_format_value(v)}" for k, v in self.values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value: float, *label_values: str):
+        self.values[label_values] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (non-cumulative, last is +Inf), sum, count]
+        self.series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for label_values, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                labels = _format_labels((*self.labels, "le"), (*label_values, _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+QUEUE_WAIT = REGISTRY.register(Histogram(
+    "admission_queue_wait_seconds", "Time a request waited for an Ollama slot", ("model", "priority")))
+DOMAIN_CHECK_SECONDS = REGISTRY.register(Histogram(
+    "domain_check_seconds", "Latency of the LLM domain check", ("domain",)))
+GENERATION_SECONDS = REGISTRY.register(Histogram(
+    "generation_seconds", "Latency of one analysis generation stage", ("domain", "stage", "model")))
+TIME_TO_FIRST_TOKEN = REGISTRY.register(Histogram(
+    "ollama_time_to_first_token_seconds", "Time from sending a streaming request to its first chunk",
+    ("method", "model")))
+TOKENS_PER_SECOND = REGISTRY.register(Histogram(
+    "ollama_tokens_per_second", "Completion tokens per second reported by Ollama (eval_count / eval_duration)",
+    ("model",), buckets=TOKENS_PER_SECOND_BUCKETS))
+OLLAMA_REQUESTS = REGISTRY.register(Counter(
+    "ollama_requests_total", "Ollama calls by method, model and outcome", ("method", "model", "outcome")))
+OLLAMA_IN_FLIGHT = REGISTRY.register(Gauge(
+    "ollama_in_flight_requests", "Ollama calls holding a slot, per model", ("model",)))
+ANALYSES_IN_FLIGHT = REGISTRY.register(Gauge(
+    "analysis_in_flight_requests", "Analyses (plain and streaming) running, per domain", ("domain",)))
+
+
+def register_collector(name: str, help_text: str, labels: Sequence[str],
+                       collect: Callable[[], Dict[LabelValues, float]], kind: type = Gauge) -> Counter:
+    """Export a value owned by another module (a Gauge or Counter) read at scrape time."""
+    return REGISTRY.register(kind(name, help_text, labels, collect=collect))
+
+
+def record_token_rate(model: str, response: dict):
+    """Observe tokens/sec from a finished Ollama response (or the final chunk of a stream)."""
+    eval_count, eval_duration = response.get("eval_count"), response.get("eval_duration")
+    if eval_count and eval_duration:
+        TOKENS_PER_SECOND.observe(eval_count / (eval_duration / 1e9), model)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
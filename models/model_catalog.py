@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+from ollama_client import list_models
+
+# In-memory snapshot of Ollama's model list for the /models endpoints.
+# Dashboards poll /models, and asking Ollama each time costs a round trip per
+# hit. Instead the list is fetched every MODEL_CATALOG_REFRESH seconds in the
+# background and kept as ready-to-send JSON bytes with an ETag, so a request is a
+# header comparison plus a memory copy, and clients that send If-None-Match get
+# 304 Not Modified. A failed refresh keeps serving the last good snapshot.
+MODEL_CATALOG_REFRESH = float(os.environ.get("MODEL_CATALOG_REFRESH", "30"))
+
+logger = logging.getLogger("model_catalog")
+
+
+class ModelCatalog:
+    """Latest /models response body, refreshed by a background task."""
+
+    def __init__(self, refresh_interval: float = MODEL_CATALOG_REFRESH):
+        self.refresh_interval = refresh_interval
+        self.body: Optional[bytes] = None
+        self.etag: Optional[str] = None
+        self.fetched_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.refreshes = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self):
+        """Fetch the model list from Ollama and replace the snapshot."""
+        async with self._lock:
+            try:
+                models = await list_models()
+            except Exception as e:
+                self.error = str(e)
+                logger.warning(f"⚠️ Model catalog refresh failed, keeping the last snapshot: {e}")
+                return
+            body = json.dumps({"models": models}, default=str, sort_keys=True).encode("utf-8")
+            self.body = body
+            self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+            self.fetched_at = time.time()
+            self.error = None
+            self.refreshes += 1
+
+    async def _refresh_loop(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """Start the background refresh (call from an app startup hook)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def response(self, if_none_match: Optional[str] = None) -> Response:
+        """The /models response: 304 if the client's ETag is current, else the cached JSON."""
+        if self.body is None:
+            # Nothing fetched yet (first request raced the startup refresh, or Ollama was down)
+            await self.refresh()
+            if self.body is None:
+                raise HTTPException(status_code=500, detail=self.error or "Model list unavailable")
+        headers = {"ETag": self.etag, "Cache-Control": f"max-age={int(self.refresh_interval)}"}
+        if if_none_match and self.etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            "etag": self.etag,
+            "age_seconds": round(time.time() - self.fetched_at, 1) if self.fetched_at else None,
+            "refreshes": self.refreshes,
+            "error": self.error,
+        }
+
+
+_catalog: Optional[ModelCatalog] = None
+
+
+def get_model_catalog() -> ModelCatalog:
+    """Return the process-wide model catalog."""
+    global _catalog
+    if _catalog is None:
+        _catalog = ModelCatalog()
+    return _catalog
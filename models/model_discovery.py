@@ -0,0 +1,308 @@
+import ast
+import asyncio
+import importlib.util
+import itertools
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Container, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from analysis_stream import response_events
+
+# Lightweight discovery of tutors and analysis services for the gateway.
+# Module sources are parsed with `ast` instead of being imported, so reading
+# MODEL_CONFIG and noticing an `analyze_text` costs a file read per module.
+# Analysis modules (which build FastAPI apps, loggers, ...) are only imported
+# when their first request arrives, or ahead of time by warm_up().
+ANALYSIS_WARMUP_WORKERS = int(os.environ.get("ANALYSIS_WARMUP_WORKERS", "4"))
+
+# Hot reload: ModelsWatcher polls the module files (a stat per file) and the
+# gateway rebuilds its registry when one is added, changed or removed.
+# Unchanged services keep their LazyAnalysisService (and imported module);
+# changed ones get a new versioned module, so requests already running keep
+# the old code until they finish. Versions that leave the registry are dropped
+# from sys.modules (prune_service_modules).
+#
+# The per-domain shims are thin wrappers around analysis_engine.py and the
+# specs in domain_specs.py, so an edit to either of those rebuilds every
+# service: the specs are swapped in place (the gateway's proxy and classifier
+# share the dict), an edited engine is imported as a fresh module, and the
+# shims are re-imported so they build new analyzers. The new engine is executed
+# under a private module name on a worker thread and only becomes
+# sys.modules["analysis_engine"] in apply_engine_sources, on the event loop.
+#
+# Other helper modules in models/ (ollama_client.py, admission.py, ...) are
+# imported once per process and are not reloaded: the watcher only notices them
+# being added or removed, and edits to them need a restart.
+MODELS_HOT_RELOAD = os.environ.get("MODELS_HOT_RELOAD", "1") == "1"
+MODELS_RELOAD_INTERVAL = float(os.environ.get("MODELS_RELOAD_INTERVAL", "2"))
+# models/ files every analysis service is built from
+ENGINE_SOURCES = ("domain_specs.py", "analysis_engine.py")
+
+logger = logging.getLogger("model_discovery")
+
+
+class ModuleMetadata:
+    """What the gateway needs to know about a models/ module without executing it."""
+
+    def __init__(self, name: str, path: str, model_config: Optional[dict], has_analyze_text: bool,
+                 mtime_ns: int = 0):
+        self.name = name
+        self.path = path
+        self.model_config = model_config
+        self.has_analyze_text = has_analyze_text
+        self.mtime_ns = mtime_ns
+
+
+def read_metadata(name: str, path: str) -> ModuleMetadata:
+    """Parse `path` and pull out a literal MODEL_CONFIG and whether analyze_text is defined."""
+    mtime_ns = os.stat(path).st_mtime_ns
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    model_config = None
+    has_analyze_text = False
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == "analyze_text":
+            has_analyze_text = True
+        elif isinstance(node, ast.Assign):
+            targets = [t.id for t in node.targets if isinstance(t, ast.Name)]
+            if "analyze_text" in targets:
+                has_analyze_text = True
+            if "MODEL_CONFIG" in targets:
+                model_config = ast.literal_eval(node.value)
+    return ModuleMetadata(name, path, model_config, has_analyze_text, mtime_ns)
+
+
+def module_paths(models_dir: str) -> Iterator[Tuple[str, str]]:
+    """(name, path) of models/*.py and models/<Domain>/main.py, in a stable order."""
+    for entry in sorted(os.listdir(models_dir)):
+        entry_path = os.path.join(models_dir, entry)
+        if os.path.isdir(entry_path):
+            main_py = os.path.join(entry_path, "main.py")
+            if os.path.exists(main_py):
+                yield entry, main_py
+        elif entry.endswith(".py") and entry != "__init__.py":
+            yield entry[:-3], entry_path
+
+
+def discover_modules(models_dir: str, previous: Optional[Dict[str, ModuleMetadata]] = None,
+                     errors: Optional[Dict[str, str]] = None) -> List[ModuleMetadata]:
+    """Metadata for models/*.py and models/<Domain>/main.py, in a stable order.
+
+    A file that cannot be parsed (syntax error, non-literal MODEL_CONFIG, removed mid-scan) is
+    logged and skipped, or keeps its entry from `previous` (path -> metadata) if it had one.
+    Its error is recorded in `errors` under the module name.
+    """
+    modules = []
+    for name, path in module_paths(models_dir):
+        try:
+            modules.append(read_metadata(name, path))
+        except (OSError, SyntaxError, ValueError) as e:
+            last_good = (previous or {}).get(path)
+            if errors is not None:
+                errors[name] = str(e)
+            if last_good is not None:
+                logger.warning(f"⚠️ Could not read {path}, keeping its last good version: {e}")
+                modules.append(last_good)
+            else:
+                logger.warning(f"⚠️ Skipping {path}, it could not be read: {e}")
+    return modules
+
+
+def _stamps(paths) -> Dict[str, Tuple[int, int]]:
+    stamps = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        stamps[path] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+def engine_stamps(models_dir: str) -> Dict[str, Tuple[int, int]]:
+    """path -> (mtime_ns, size) of the ENGINE_SOURCES."""
+    return _stamps(os.path.join(models_dir, name) for name in ENGINE_SOURCES)
+
+
+def source_stamps(models_dir: str, helpers: Container[str] = ()) -> Dict[str, Optional[Tuple[int, int]]]:
+    """path -> (mtime_ns, size) for every module file and engine source, to notice additions, edits and removals.
+
+    Paths in `helpers` (modules that are not reloaded) map to None: only their addition or removal shows.
+    """
+    stamps = _stamps(path for _, path in module_paths(models_dir) if path not in helpers)
+    stamps.update((path, None) for _, path in module_paths(models_dir) if path in helpers)
+    return {**stamps, **engine_stamps(models_dir)}
+
+
+def _exec_file(module_name: str, path: str, keep: bool = False):
+    """Execute `path` as a new module registered as `module_name`, which must not be a name other code imports.
+
+    It is registered while it runs, as an import would (pydantic resolves annotations through
+    sys.modules), and removed afterwards unless `keep` is set.
+    """
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    if not keep:
+        del sys.modules[module_name]
+    return module
+
+
+_engine_versions = itertools.count(1)
+
+
+def load_engine_sources(models_dir: str, changed: List[str]) -> dict:
+    """Execute the current domain_specs.py (and analysis_engine.py if it is in `changed` and already imported).
+
+    Safe to run on a worker thread: nothing other code imports is replaced yet; pass the result to
+    apply_engine_sources on the event loop. Raises if either file is broken.
+    """
+    specs = _exec_file("domain_specs_reload", os.path.join(models_dir, "domain_specs.py")).DOMAIN_SPECS
+    engine = None
+    if "analysis_engine.py" in changed and "analysis_engine" in sys.modules:
+        engine = _exec_file(f"analysis_engine_reload{next(_engine_versions)}",
+                            os.path.join(models_dir, "analysis_engine.py"), keep=True)
+    return {"specs": specs, "engine": engine}
+
+
+def apply_engine_sources(loaded: dict):
+    """Swap in what load_engine_sources read, so services imported from now on build fresh analyzers.
+
+    Call on the event loop thread: the module swap is one assignment that imports on other threads see whole.
+    """
+    import domain_specs
+    domain_specs.DOMAIN_SPECS.clear()
+    domain_specs.DOMAIN_SPECS.update(loaded["specs"])
+    if "domain_classifier" in sys.modules:
+        sys.modules["domain_classifier"].reset_classifier()
+    if loaded["engine"] is not None:
+        previous = sys.modules.get("analysis_engine")
+        sys.modules["analysis_engine"] = loaded["engine"]
+        if previous is not None and previous.__name__ != "analysis_engine":
+            # An earlier reload's private name; services built on it hold their own references
+            sys.modules.pop(previous.__name__, None)
+    elif "analysis_engine" in sys.modules:
+        # Same engine code: drop its analyzers so they are rebuilt from the new specs
+        sys.modules["analysis_engine"]._analyzers.clear()
+
+
+class LazyAnalysisService:
+    """Async callable that imports its module's analyze_text on first use."""
+
+    def __init__(self, analysis_id: str, path: str, mtime_ns: int = 0, version: int = 0):
+        self.analysis_id = analysis_id
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.version = version
+        self._function: Optional[Callable] = None
+        self._stream_function: Optional[Callable] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._function is not None
+
+    @property
+    def module_name(self) -> str:
+        # Reloaded versions get their own module so the previous one stays intact
+        return f"analysis_service_{self.analysis_id}" + (f"_v{self.version}" if self.version else "")
+
+    def load(self) -> Callable:
+        """Import the module (once, thread-safe) and return its analyze_text."""
+        if self._function is None:
+            with self._lock:
+                if self._function is None:
+                    # Load by file path: models/general.py would shadow models/general/main.py
+                    module_name = self.module_name
+                    spec = importlib.util.spec_from_file_location(module_name, self.path)
+                    module = importlib.util.module_from_spec(spec)
+                    sys.modules[module_name] = module
+                    spec.loader.exec_module(module)
+                    self._stream_function = getattr(module, "analyze_stream", None)
+                    self._function = module.analyze_text
+        return self._function
+
+    async def __call__(self, request):
+        function = self._function or await asyncio.to_thread(self.load)
+        return await function(request)
+
+    async def stream(self, request):
+        """Yield analysis events; modules without analyze_stream have their result replayed."""
+        function = self._function or await asyncio.to_thread(self.load)
+        if self._stream_function is not None:
+            async for event in self._stream_function(request):
+                yield event
+        else:
+            for event in response_events((await function(request)).dict()):
+                yield event
+
+
+def prune_service_modules(services: Iterable[LazyAnalysisService]):
+    """Drop the sys.modules entries of service versions that are no longer in the registry.
+
+    Requests still running on an old version keep their own reference to its functions.
+    """
+    live = {service.module_name for service in services}
+    for name in [name for name in sys.modules if name.startswith("analysis_service_") and name not in live]:
+        del sys.modules[name]
+
+
+def warm_up(services, workers: int = ANALYSIS_WARMUP_WORKERS, on_error=None):
+    """Import every service on a thread pool in the background; returns the executor."""
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis-warmup")
+
+    def load(service):
+        try:
+            service.load()
+        except Exception as e:
+            if on_error:
+                on_error(service, e)
+
+    for service in services:
+        executor.submit(load, service)
+    executor.shutdown(wait=False)
+    return executor
+
+
+class ModelsWatcher:
+    """Polls the models/ module files and awaits `on_change()` when any is added, edited or removed."""
+
+    def __init__(self, models_dir: str, on_change: Callable[[], Awaitable[None]],
+                 interval: float = MODELS_RELOAD_INTERVAL, helpers: Callable[[], Container[str]] = frozenset):
+        self.models_dir = models_dir
+        self.on_change = on_change
+        self.interval = interval
+        # Paths of the helper modules (not reloaded, so their edits are ignored)
+        self.helpers = helpers
+        self._stamps = source_stamps(models_dir, helpers())
+        self._task: Optional[asyncio.Task] = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            stamps = await asyncio.to_thread(source_stamps, self.models_dir, self.helpers())
+            if stamps != self._stamps:
+                self._stamps = stamps
+                await self.on_change()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional
+
+# Model residency: which models Ollama should keep in memory, and for how long.
+# Every model a service can use (MODEL_CONFIG tutors, get_model_name analyzers) is
+# loaded at startup with an empty prompt, so the first request does not pay the
+# load. After that each call sends a keep_alive that grows with the model's recent
+# traffic: busy models stay resident for up to RESIDENCY_MAX_KEEP_ALIVE, idle ones
+# fall back to RESIDENCY_MIN_KEEP_ALIVE (Ollama's own 5 minute default) and free
+# the memory. Requests that pass their own keep_alive are left alone.
+#
+# Models are tracked by their full tag ("llama3" is "llama3:latest"), and tags
+# that Ollama reports with the same digest ("llama3:latest" and "llama3:8b" when
+# both point at the same weights) are preloaded once.
+RESIDENCY_PRELOAD = os.environ.get("RESIDENCY_PRELOAD", "1") == "1"
+# Analyzer model sizes to preload, as passed to get_model_name ("8b", "70b", ...)
+RESIDENCY_MODEL_SIZES = [s.strip() for s in os.environ.get("RESIDENCY_MODEL_SIZES", "8b").split(",") if s.strip()]
+RESIDENCY_WINDOW = float(os.environ.get("RESIDENCY_WINDOW", "900"))
+RESIDENCY_MIN_KEEP_ALIVE = float(os.environ.get("RESIDENCY_MIN_KEEP_ALIVE", "300"))
+RESIDENCY_MAX_KEEP_ALIVE = float(os.environ.get("RESIDENCY_MAX_KEEP_ALIVE", "3600"))
+# How long a preloaded model stays resident if no request comes in
+RESIDENCY_PRELOAD_KEEP_ALIVE = float(os.environ.get("RESIDENCY_PRELOAD_KEEP_ALIVE", "1800"))
+# Requests per window at which a model gets the full RESIDENCY_MAX_KEEP_ALIVE
+RESIDENCY_HOT_REQUESTS = int(os.environ.get("RESIDENCY_HOT_REQUESTS", "20"))
+
+logger = logging.getLogger("model_residency")
+
+
+def get_model_name(size: str) -> str:
+    """Get the appropriate Llama 3 model name based on size."""
+    return f"llama3:{size}"
+
+
+def normalize_model_name(model: str) -> str:
+    """The full tag of a model name, as Ollama lists it ("llama3" -> "llama3:latest")."""
+    if ":" in model.rsplit("/", 1)[-1]:
+        return model
+    return f"{model}:latest"
+
+
+class ModelResidency:
+    """Load and traffic state of one model."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.status = "cold"
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.active = 0
+        self.last_used: Optional[float] = None
+        self.keep_alive = RESIDENCY_MIN_KEEP_ALIVE
+        self.requests: Deque[float] = deque()
+
+    def recent_requests(self, now: float) -> int:
+        while self.requests and now - self.requests[0] > RESIDENCY_WINDOW:
+            self.requests.popleft()
+        return len(self.requests)
+
+    def next_keep_alive(self, now: float) -> float:
+        """Scale keep_alive linearly from the minimum to the maximum with recent traffic."""
+        heat = min(1.0, self.recent_requests(now) / RESIDENCY_HOT_REQUESTS)
+        return round(RESIDENCY_MIN_KEEP_ALIVE + heat * (RESIDENCY_MAX_KEEP_ALIVE - RESIDENCY_MIN_KEEP_ALIVE))
+
+    def state(self, now: float) -> dict:
+        # Ollama starts the keep_alive timer when a request finishes
+        expires_in = None
+        status = self.status
+        if self.active:
+            status = "in_use"
+        elif self.status == "resident" and self.last_used is not None:
+            expires_in = round(self.last_used + self.keep_alive - now)
+            if expires_in <= 0:
+                status, expires_in = "expired", None
+        return {
+            "status": status,
+            "keep_alive": self.keep_alive,
+            "expires_in": expires_in,
+            "requests_in_window": self.recent_requests(now),
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+
+class ResidencyManager:
+    """Preloads models and picks a keep_alive for every Ollama call."""
+
+    def __init__(self):
+        self.models: Dict[str, ModelResidency] = {}
+
+    def _model(self, model: str) -> ModelResidency:
+        model = normalize_model_name(model)
+        if model not in self.models:
+            self.models[model] = ModelResidency(model)
+        return self.models[model]
+
+    def begin(self, model: str, keep_alive: Optional[float] = None) -> float:
+        """Count a request for `model` and return the keep_alive to send with it."""
+        entry = self._model(model)
+        now = time.monotonic()
+        if keep_alive is None:
+            entry.requests.append(now)
+            keep_alive = entry.next_keep_alive(now)
+        entry.keep_alive = keep_alive
+        entry.active += 1
+        return keep_alive
+
+    def end(self, model: str, ok: bool = True):
+        entry = self._model(model)
+        entry.active -= 1
+        entry.last_used = time.monotonic()
+        if ok:
+            entry.status, entry.error = "resident", None
+
+    async def _digests(self) -> Dict[str, str]:
+        """Full tag -> digest of the models Ollama has pulled ({} if it cannot be listed)."""
+        from ollama_client import list_models
+        try:
+            listed = (await list_models()).get("models", [])
+        except Exception as e:
+            logger.warning(f"⚠️ Could not list models, preloading every tag: {e}")
+            return {}
+        return {normalize_model_name(m["name"]): m.get("digest") or m["name"] for m in listed if m.get("name")}
+
+    async def preload(self, models: Iterable[str]):
+        """Load each model into Ollama's memory with an empty prompt, all in parallel."""
+        # Imported here because ollama_client itself reports to this manager
+        from ollama_client import generate
+
+        # Tags that name the same weights share one load
+        digests = await self._digests()
+        groups: Dict[str, List[str]] = {}
+        for model in dict.fromkeys(normalize_model_name(m) for m in models):
+            groups.setdefault(digests.get(model, model), []).append(model)
+
+        async def load(model: str, aliases: List[str]):
+            entries = [self._model(m) for m in (model, *aliases)]
+            for entry in entries:
+                entry.status = "loading"
+            started = time.perf_counter()
+            try:
+                await generate(model=model, prompt="", keep_alive=RESIDENCY_PRELOAD_KEEP_ALIVE)
+                load_seconds = round(time.perf_counter() - started, 3)
+                for entry in entries[1:]:
+                    entry.keep_alive, entry.last_used = RESIDENCY_PRELOAD_KEEP_ALIVE, time.monotonic()
+                for entry in entries:
+                    entry.load_seconds = load_seconds
+                    entry.status, entry.error = "resident", None
+                logger.info(f"🔥 Preloaded {model} in {load_seconds}s" + (f" (also {', '.join(aliases)})" if aliases else ""))
+            except Exception as e:
+                for entry in entries:
+                    entry.status, entry.error = "failed", str(e)
+                logger.warning(f"⚠️ Could not preload {model}: {e}")
+
+        await asyncio.gather(*(load(tags[0], tags[1:]) for tags in groups.values()))
+
+    def start_preload(self, models: Iterable[str]) -> Optional[asyncio.Task]:
+        """Preload in the background (when RESIDENCY_PRELOAD is on) so startup is not held up."""
+        models = list(models)
+        if not RESIDENCY_PRELOAD or not models:
+            return None
+        for model in models:
+            self._model(model)
+        return asyncio.ensure_future(self.preload(models))
+
+    def state(self) -> Dict[str, dict]:
+        now = time.monotonic()
+        return {model: entry.state(now) for model, entry in sorted(self.models.items())}
+
+
+def analysis_models() -> List[str]:
+    """The analyzer models (get_model_name for each RESIDENCY_MODEL_SIZES entry)."""
+    return [get_model_name(size) for size in RESIDENCY_MODEL_SIZES]
+
+
+_residency: Optional[ResidencyManager] = None
+
+
+def get_residency() -> ResidencyManager:
+    """Return the process-wide residency manager."""
+    global _residency
+    if _residency is None:
+        _residency = ResidencyManager()
+    return _residency
@@ -0,0 +1,212 @@
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+import ollama
+
+from admission import BULK, INTERACTIVE, get_admission
+from model_residency import get_residency
+from token_budget import OLLAMA_NUM_CTX
+from metrics import OLLAMA_IN_FLIGHT, OLLAMA_REQUESTS, TIME_TO_FIRST_TOKEN, record_token_rate
+
+# Shared async Ollama client for the gateway and every domain server.
+# Using the async client keeps the uvicorn event loop free while a
+# generation is running, so health checks and other requests still get served.
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST")
+
+# Every generation holds a slot on its model from the admission controller
+# (admission.py): per-model limits (OLLAMA_MAX_PARALLEL, OLLAMA_MODEL_CONCURRENCY),
+# interactive-before-bulk ordering and 429/503 when saturated. It also gets a
+# keep_alive from the residency manager (model_residency.py) unless the caller set one,
+# and the same num_ctx (OLLAMA_NUM_CTX): Ollama reloads a model whenever a request
+# asks for a different context size, so every call (preload, domain check,
+# analysis, chat) must agree on it.
+
+# HTTP transport: one pooled keep-alive connection set per process. Connections
+# are reused across domains and requests instead of a TCP setup per call, and
+# max_connections caps how many sockets this process ever opens to Ollama.
+OLLAMA_MAX_CONNECTIONS = int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "40"))
+OLLAMA_MAX_KEEPALIVE = int(os.environ.get("OLLAMA_MAX_KEEPALIVE", "16"))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.environ.get("OLLAMA_KEEPALIVE_EXPIRY", "60"))
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "5"))
+# Longest gap between two chunks of a response (a whole non-streaming generation counts as one gap)
+OLLAMA_READ_TIMEOUT = float(os.environ.get("OLLAMA_READ_TIMEOUT", "600"))
+# Needs the optional `h2` package; only useful when Ollama sits behind a TLS proxy that speaks HTTP/2
+OLLAMA_HTTP2 = os.environ.get("OLLAMA_HTTP2", "0") == "1"
+
+# Retries with jittered exponential backoff when a connection fails or is reset
+OLLAMA_RETRIES = int(os.environ.get("OLLAMA_RETRIES", "2"))
+OLLAMA_RETRY_BACKOFF = float(os.environ.get("OLLAMA_RETRY_BACKOFF", "0.25"))
+RETRYABLE_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.RemoteProtocolError,
+    httpx.ReadError,
+    httpx.WriteError,
+)
+
+logger = logging.getLogger("ollama_client")
+
+_async_client: Optional[ollama.AsyncClient] = None
+
+
+def _http2_enabled() -> bool:
+    if not OLLAMA_HTTP2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("⚠️ OLLAMA_HTTP2=1 but the 'h2' package is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
+def client_options() -> dict:
+    """httpx options (pool limits, timeouts, HTTP/2) shared by the async and sync clients."""
+    return {
+        "host": OLLAMA_HOST,
+        "timeout": httpx.Timeout(OLLAMA_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=OLLAMA_MAX_KEEPALIVE,
+            keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY,
+        ),
+        "http2": _http2_enabled(),
+    }
+
+
+def get_async_client() -> ollama.AsyncClient:
+    """Return the process-wide async Ollama client, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        _async_client = ollama.AsyncClient(**client_options())
+    return _async_client
+
+
+def get_sync_client() -> ollama.Client:
+    """A blocking client with the same settings, for startup checks outside the event loop."""
+    return ollama.Client(**client_options())
+
+
+def _backoff(attempt: int) -> float:
+    """Full jitter: a random wait up to OLLAMA_RETRY_BACKOFF * 2**attempt seconds."""
+    return random.uniform(0, OLLAMA_RETRY_BACKOFF * (2 ** attempt))
+
+
+async def _call(method: str, timeout: Optional[float] = None, **kwargs):
+    """Call an AsyncClient method, retrying connection failures and applying an optional overall timeout."""
+    for attempt in range(OLLAMA_RETRIES + 1):
+        try:
+            call = getattr(get_async_client(), method)(**kwargs)
+            return await (asyncio.wait_for(call, timeout) if timeout else call)
+        except RETRYABLE_ERRORS as e:
+            if attempt == OLLAMA_RETRIES:
+                raise
+            logger.warning(f"⚠️ Ollama {method} failed ({type(e).__name__}), retrying ({attempt + 1}/{OLLAMA_RETRIES})")
+            await asyncio.sleep(_backoff(attempt))
+
+
+async def _stream(method: str, **kwargs):
+    """Stream an AsyncClient method; a failed connection is retried only before the first chunk."""
+    for attempt in range(OLLAMA_RETRIES + 1):
+        started = False
+        try:
+            async for chunk in await getattr(get_async_client(), method)(stream=True, **kwargs):
+                started = True
+                yield chunk
+            return
+        except RETRYABLE_ERRORS as e:
+            if started or attempt == OLLAMA_RETRIES:
+                raise
+            logger.warning(f"⚠️ Ollama {method} stream failed ({type(e).__name__}), retrying ({attempt + 1}/{OLLAMA_RETRIES})")
+            await asyncio.sleep(_backoff(attempt))
+
+
+@asynccontextmanager
+async def _model_slot(method: str, kwargs: dict, priority: int):
+    """Hold an admission slot on the model and fill in its keep_alive and num_ctx (modifies kwargs)."""
+    model = kwargs.get("model", "")
+    kwargs["options"] = {"num_ctx": OLLAMA_NUM_CTX, **(kwargs.get("options") or {})}
+    async with get_admission().slot(model, priority):
+        residency = get_residency()
+        kwargs["keep_alive"] = residency.begin(model, kwargs.get("keep_alive"))
+        OLLAMA_IN_FLIGHT.inc(model)
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            OLLAMA_IN_FLIGHT.dec(model)
+            OLLAMA_REQUESTS.inc(method, model, "ok" if ok else "error")
+            residency.end(model, ok)
+
+
+async def _timed_stream(method: str, kwargs: dict):
+    """_stream() that records time to first token and the final chunk's tokens/sec."""
+    model = kwargs.get("model", "")
+    started = time.perf_counter()
+    first = True
+    async for chunk in _stream(method, **kwargs):
+        if first:
+            TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started, method, model)
+            first = False
+        if chunk.get("done"):
+            record_token_rate(model, chunk)
+        yield chunk
+
+
+async def generate(timeout: Optional[float] = None, priority: int = BULK, **kwargs):
+    """Run one non-streaming generation once its model has a free slot."""
+    async with _model_slot("generate", kwargs, priority):
+        response = await _call("generate", timeout=timeout, **kwargs)
+    record_token_rate(kwargs.get("model", ""), response)
+    return response
+
+
+async def generate_stream(priority: int = BULK, **kwargs):
+    """Stream one generation chunk by chunk, holding a slot until the stream ends."""
+    async with _model_slot("generate", kwargs, priority):
+        async for chunk in _timed_stream("generate", kwargs):
+            yield chunk
+
+
+async def chat(timeout: Optional[float] = None, priority: int = BULK, **kwargs):
+    """Run one non-streaming chat completion once its model has a free slot."""
+    async with _model_slot("chat", kwargs, priority):
+        response = await _call("chat", timeout=timeout, **kwargs)
+    record_token_rate(kwargs.get("model", ""), response)
+    return response
+
+
+async def chat_stream(priority: int = INTERACTIVE, **kwargs):
+    """Stream one chat completion without blocking the event loop between tokens."""
+    async with _model_slot("chat", kwargs, priority):
+        async for chunk in _timed_stream("chat", kwargs):
+            yield chunk
+
+
+async def list_models():
+    """List the models Ollama has pulled (no generation slot needed)."""
+    return await _call("list")
+
+
+async def running_models() -> Optional[list]:
+    """Models Ollama currently holds in memory (/api/ps), or None if this Ollama has no such endpoint."""
+    try:
+        response = await get_async_client()._client.get("/api/ps")
+        response.raise_for_status()
+        return response.json().get("models", [])
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def close_async_client():
+    """Close the shared client's HTTP connections (call on app shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client._client.aclose()
+        _async_client = None
@@ -0,0 +1,178 @@
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Optional
+
+# Cache segment shared by every gateway worker process.
+# The gateway's workers are separate processes, so each would otherwise have
+# its own in-memory analysis cache. Instead they all map the same file (in
+# /dev/shm when available, i.e. RAM) as a fixed table of SHARED_CACHE_SLOTS
+# slots of SHARED_CACHE_SLOT_BYTES each. A key can only live in one of
+# SHARED_CACHE_PROBES neighbouring slots.
+#
+# Reads take no lock. Every slot starts with a sequence number that a writer
+# makes odd before changing the slot and even again afterwards. A reader copies
+# the slot and keeps the copy only if the sequence number was even and the same
+# before and after. Writers lock just their slot's byte range with fcntl, so
+# writes from different workers to different slots never wait on each other.
+# Values larger than a slot are not shared; they stay in the per-process tiers.
+SHARED_CACHE_PATH = os.environ.get("SHARED_CACHE_PATH", "")
+SHARED_CACHE_SLOTS = int(os.environ.get("SHARED_CACHE_SLOTS", "2048"))
+SHARED_CACHE_SLOT_BYTES = int(os.environ.get("SHARED_CACHE_SLOT_BYTES", str(32 * 1024)))
+SHARED_CACHE_PROBES = 4
+
+_MAGIC = b"SPCACHE1"
+# magic, slot count, slot size
+_SEGMENT_HEADER = struct.Struct("<8sII")
+_SEGMENT_HEADER_BYTES = 64
+# sequence, key digest, expires_at, value length
+_SLOT_HEADER = struct.Struct("<Q32sdI")
+_SEQUENCE = struct.Struct("<Q")
+_READ_RETRIES = 8
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=32).digest()
+
+
+def create_segment(path: str = "", slots: int = SHARED_CACHE_SLOTS, slot_bytes: int = SHARED_CACHE_SLOT_BYTES) -> str:
+    """Create an empty segment file (the parent process does this before starting workers)."""
+    if not path:
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        fd, path = tempfile.mkstemp(prefix="analysis-cache-", suffix=".seg", dir=directory)
+        os.close(fd)
+    with open(path, "wb") as f:
+        f.write(_SEGMENT_HEADER.pack(_MAGIC, slots, slot_bytes))
+        # Sparse: pages only take memory once a slot is written
+        f.truncate(_SEGMENT_HEADER_BYTES + slots * slot_bytes)
+    return path
+
+
+class SharedCache:
+    """Fixed-slot key/value table in a memory-mapped file, shared between processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.slots, self.slot_bytes = _SEGMENT_HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a shared cache segment")
+        self.max_value_bytes = self.slot_bytes - _SLOT_HEADER.size
+        self.torn_reads = 0
+
+    def _offset(self, slot: int) -> int:
+        return _SEGMENT_HEADER_BYTES + slot * self.slot_bytes
+
+    def _candidates(self, digest: bytes):
+        first = int.from_bytes(digest[:8], "little") % self.slots
+        return [(first + i) % self.slots for i in range(SHARED_CACHE_PROBES)]
+
+    def _read_slot(self, slot: int, digest: bytes) -> Optional[bytes]:
+        """The value in `slot` if it holds `digest` and has not expired (no locks; retries torn reads)."""
+        offset = self._offset(slot)
+        for _ in range(_READ_RETRIES):
+            sequence, slot_digest, expires_at, length = _SLOT_HEADER.unpack_from(self._map, offset)
+            if sequence & 1:
+                self.torn_reads += 1
+                continue
+            if slot_digest != digest or expires_at < time.time() or length > self.max_value_bytes:
+                value = None
+            else:
+                start = offset + _SLOT_HEADER.size
+                value = self._map[start:start + length]
+            if _SEQUENCE.unpack_from(self._map, offset)[0] == sequence:
+                return value
+            self.torn_reads += 1
+        return None
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        digest = _digest(key)
+        for slot in self._candidates(digest):
+            value = self._read_slot(slot, digest)
+            if value is not None:
+                return value
+        return None
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.get_bytes(key)
+        return json.loads(value) if value is not None else None
+
+    def _pick_slot(self, digest: bytes) -> int:
+        """The slot already holding `digest`, else an empty or expired one, else the one expiring first."""
+        now = time.time()
+        best, best_expiry = None, None
+        for slot in self._candidates(digest):
+            _, slot_digest, expires_at, _ = _SLOT_HEADER.unpack_from(self._map, self._offset(slot))
+            if slot_digest == digest:
+                return slot
+            if expires_at < now:
+                expires_at = 0.0
+            if best is None or expires_at < best_expiry:
+                best, best_expiry = slot, expires_at
+        return best
+
+    def set_bytes(self, key: str, value: bytes, ttl: float) -> bool:
+        """Store `value` for `ttl` seconds; False if it does not fit in a slot."""
+        if len(value) > self.max_value_bytes:
+            return False
+        digest = _digest(key)
+        slot = self._pick_slot(digest)
+        offset = self._offset(slot)
+        fcntl.lockf(self._file, fcntl.LOCK_EX, self.slot_bytes, offset, os.SEEK_SET)
+        try:
+            sequence = _SEQUENCE.unpack_from(self._map, offset)[0]
+            _SEQUENCE.pack_into(self._map, offset, sequence + 1)
+            start = offset + _SLOT_HEADER.size
+            self._map[start:start + len(value)] = value
+            _SLOT_HEADER.pack_into(self._map, offset, sequence + 1, digest, time.time() + ttl, len(value))
+            _SEQUENCE.pack_into(self._map, offset, sequence + 2)
+        finally:
+            fcntl.lockf(self._file, fcntl.LOCK_UN, self.slot_bytes, offset, os.SEEK_SET)
+        return True
+
+    def set(self, key: str, value: Any, ttl: float) -> bool:
+        return self.set_bytes(key, json.dumps(value).encode("utf-8"), ttl)
+
+    def clear(self):
+        for slot in range(self.slots):
+            offset = self._offset(slot)
+            _, slot_digest, _, _ = _SLOT_HEADER.unpack_from(self._map, offset)
+            if slot_digest != bytes(32):
+                fcntl.lockf(self._file, fcntl.LOCK_EX, self.slot_bytes, offset, os.SEEK_SET)
+                try:
+                    sequence = _SEQUENCE.unpack_from(self._map, offset)[0]
+                    _SLOT_HEADER.pack_into(self._map, offset, sequence + 1, bytes(32), 0.0, 0)
+                    _SEQUENCE.pack_into(self._map, offset, sequence + 2)
+                finally:
+                    fcntl.lockf(self._file, fcntl.LOCK_UN, self.slot_bytes, offset, os.SEEK_SET)
+
+    def stats(self) -> dict:
+        now = time.time()
+        used = 0
+        for slot in range(self.slots):
+            _, slot_digest, expires_at, _ = _SLOT_HEADER.unpack_from(self._map, self._offset(slot))
+            if slot_digest != bytes(32) and expires_at >= now:
+                used += 1
+        return {"path": self.path, "slots": self.slots, "slot_bytes": self.slot_bytes, "used_slots": used,
+                "torn_reads": self.torn_reads}
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+_shared_cache: Optional[SharedCache] = None
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """The segment named by SHARED_CACHE_PATH (set for multi-worker gateways), or None."""
+    global _shared_cache
+    if _shared_cache is None and SHARED_CACHE_PATH and os.path.exists(SHARED_CACHE_PATH):
+        _shared_cache = SharedCache(SHARED_CACHE_PATH)
+    return _shared_cache
@@ -8,38 +8,17 @@ const __dirname = path.dirname(__filename);
 
 const modelsPath = __dirname;
 
-const domainPorts = {
-    'Finance': 8000,
-    'Mathematics': 8001,
-    'Programming': 8003,
-    'Psychology': 8005,
-    'Physics': 8006,
-    'Chemistry': 8007,
-    'Biology': 8008,
-    'Legal': 8009,
-    'Marketing': 8011,
-    'UI-UX_Design': 8012,
-    'Product_Management': 8014,
-    'Music': 8015,
-    'Art_Style': 8016,
-    'Philosophy_Ethics': 8017,
-    'Cybersecurity': 8019,
-    'Data_Science': 8021,
-    'Productivity': 8022,
-    'Mental_Health': 8023,
-    'general': 8024 // Assuming a port for the general model
-};
+// Every domain (Finance, Mathematics, ..., general) is served by one Python
+// process. '--compat' keeps the legacy per-domain ports (8000-8024) reachable.
+const enginePath = path.join(modelsPath, 'analysis_engine.py');
 
-function startApi(domain, port) {
-    const domainPath = path.join(modelsPath, domain);
-    const apiPath = path.join(domainPath, 'main.py');
-
-    if (!fs.existsSync(apiPath)) {
-        console.error(`API file not found for ${domain} at ${apiPath}`);
+function startEngine() {
+    if (!fs.existsSync(enginePath)) {
+        console.error(`Analysis engine not found at ${enginePath}`);
         return null;
     }
 
-    console.log(`Starting ${domain} API at ${apiPath} on port ${port}`);
+    console.log(`Starting Document Analysis Engine at ${enginePath}`);
 
     const pythonExecutable = path.join(modelsPath, '.venv', 'Scripts', 'python.exe');
 
@@ -48,8 +27,8 @@ function startApi(domain, port) {
         return null;
     }
 
-    const api = spawn(pythonExecutable, [apiPath], {
-        cwd: domainPath,
+    const api = spawn(pythonExecutable, [enginePath, '--compat'], {
+        cwd: modelsPath,
         stdio: 'pipe',
         env: {
             ...process.env,
@@ -58,37 +37,29 @@ function startApi(domain, port) {
     });
 
     api.stdout.on('data', (data) => {
-        console.log(`[${domain}] ${data.toString().trim()}`);
+        console.log(`[engine] ${data.toString().trim()}`);
     });
 
     api.stderr.on('data', (data) => {
-        console.error(`[${domain}] Error: ${data.toString().trim()}`);
+        console.error(`[engine] Error: ${data.toString().trim()}`);
     });
 
     api.on('close', (code) => {
-        console.log(`[${domain}] API stopped with code ${code}`);
+        console.log(`[engine] API stopped with code ${code}`);
     });
 
     return api;
 }
 
-console.log('Starting all Python APIs...');
-const apis = new Map();
-
-Object.entries(domainPorts).forEach(([domain, port]) => {
-    const apiProcess = startApi(domain, port);
-    if (apiProcess) {
-        apis.set(domain, apiProcess);
-    }
-});
+console.log('Starting the analysis engine...');
+const engine = startEngine();
 
 process.on('SIGINT', () => {
-    console.log('\nShutting down APIs...');
-    apis.forEach((api, domain) => {
-        console.log(`Stopping ${domain} API...`);
-        api.kill();
-    });
+    console.log('\nShutting down the analysis engine...');
+    if (engine) {
+        engine.kill();
+    }
     process.exit(0);
 });
 
-console.log('\nAll APIs started. Press Ctrl+C to stop all APIs.');
+console.log('\nAnalysis engine started. Press Ctrl+C to stop it.');
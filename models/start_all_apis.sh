@@ -1,38 +1,17 @@
 #!/bin/bash
 
-# Function to start an API
-start_api() {
-    local dir=$1
-    local port=$2
-    echo "Checking contents of $dir:"
-    ls -l "$dir"
-    if [ -f "$dir/main.py" ]; then
-        echo "Starting $dir API on port $port..."
-        python3 "$dir/main.py" &
-    else
-        echo "Skipping $dir API - main.py not found"
-    fi
-}
+# All domains are served by one analysis engine process (models/analysis_engine.py).
+# --compat also opens each domain's legacy port (Finance 8000, Mathematics 8001, ...)
+# so existing clients such as the Node router keep working.
+cd "$(dirname "$0")"
 
-# Start all APIs
-start_api "Finance" 8000
-start_api "Mathematics" 8001
-start_api "Programming" 8003
-start_api "Psychology" 8005
-start_api "Physics" 8006
-start_api "Chemistry" 8007
-start_api "Biology" 8008
-start_api "Legal" 8009
-start_api "Marketing" 8011
-start_api "UI-UX_Design" 8012
-start_api "Product_Management" 8014
-start_api "Music" 8015
-start_api "Art_Style" 8016
-start_api "Philosophy_Ethics" 8017
-start_api "Cybersecurity" 8019
-start_api "Data_Science" 8021
-start_api "Productivity" 8022
-start_api "Mental_Health" 8023
+if [ -f "analysis_engine.py" ]; then
+    echo "Starting Document Analysis Engine on port ${ANALYSIS_ENGINE_PORT:-8030}..."
+    python3 analysis_engine.py --compat &
+else
+    echo "analysis_engine.py not found"
+    exit 1
+fi
 
-echo "All APIs have been started. You can check their status using 'ps aux | grep python'"
-echo "To stop all APIs, use 'pkill -f main.py'" 
\ No newline at end of file
+echo "Analysis engine started. You can check its status using 'ps aux | grep analysis_engine'"
+echo "To stop it, use 'pkill -f analysis_engine.py'"
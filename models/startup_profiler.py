@@ -0,0 +1,133 @@
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+import warnings
+from typing import Dict, List, Optional
+
+# Startup-time profiling for the gateway, the analysis engine and the domain servers.
+# Run any of them with --profile-startup (or --profile-startup PATH) to get a JSON
+# breakdown of where startup time goes: named phases (imports, logger setup, app
+# construction, model discovery) and per-module import times. The report goes to
+# stderr (stdout carries the log) or to PATH, and the process exits instead of serving.
+# Warnings are silenced while profiling so that `2>report.json` is valid JSON.
+#
+# Stdlib only, and imported before FastAPI/ollama so their imports are measured.
+# That is too early for argparse, so the flag only switches profiling on here;
+# each entry point parses PATH with add_profile_argument and passes it to finish().
+PROFILE_FLAG = "--profile-startup"
+
+
+def _profiling_requested() -> bool:
+    return any(arg == PROFILE_FLAG or arg.startswith(PROFILE_FLAG + "=") for arg in sys.argv[1:])
+
+
+def add_profile_argument(parser: argparse.ArgumentParser):
+    """Add --profile-startup [PATH] to an entry point's parser."""
+    parser.add_argument(PROFILE_FLAG, nargs="?", const="-", metavar="PATH",
+                        help="write a JSON startup timing report to stderr (or to PATH) and exit")
+
+
+class _ImportTimer:
+    """Meta path finder that times the execution of every module imported on the main thread."""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self.profiler = profiler
+        self._stack: List[list] = []
+
+    def find_spec(self, fullname, path, target=None):
+        if threading.current_thread() is not threading.main_thread():
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                # Builtin/frozen loaders are shared classes; only wrap per-module loader instances
+                loader = spec.loader
+                if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+                    loader.exec_module = self._timed(fullname, loader.exec_module)
+                return spec
+        return None
+
+    def _timed(self, fullname, exec_module):
+        def timed_exec_module(module):
+            # [name, start, time spent importing children]
+            frame = [fullname, time.perf_counter(), 0.0]
+            self._stack.append(frame)
+            try:
+                exec_module(module)
+            finally:
+                self._stack.pop()
+                cumulative = time.perf_counter() - frame[1]
+                if self._stack:
+                    self._stack[-1][2] += cumulative
+                self.profiler.modules[fullname] = (cumulative, cumulative - frame[2])
+        return timed_exec_module
+
+
+class StartupProfiler:
+    """Records named startup phases and per-module import times when --profile-startup is given."""
+
+    def __init__(self):
+        self.enabled = _profiling_requested()
+        self.started_at = time.perf_counter()
+        self._last_mark = self.started_at
+        self.phases: List[Dict[str, float]] = []
+        self.modules: Dict[str, tuple] = {}
+        self._import_timer = None
+        if self.enabled:
+            # Import-time warnings (deprecations, pydantic field names) would share stderr with the report
+            warnings.simplefilter("ignore")
+            self._import_timer = _ImportTimer(self)
+            sys.meta_path.insert(0, self._import_timer)
+
+    def mark(self, phase: str):
+        """Close the phase that started at the previous mark (or at profiler start)."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append({"name": phase, "seconds": round(now - self._last_mark, 6)})
+        self._last_mark = now
+
+    def report(self, top: int = 50) -> dict:
+        modules = sorted(self.modules.items(), key=lambda item: item[1][0], reverse=True)
+        packages: Dict[str, float] = {}
+        for name, (_, self_time) in self.modules.items():
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0.0) + self_time
+        return {
+            "target": sys.argv[0],
+            "python": platform.python_version(),
+            "total_seconds": round(time.perf_counter() - self.started_at, 6),
+            "phases": self.phases,
+            "modules_imported": len(self.modules),
+            "packages": {
+                name: round(seconds, 6)
+                for name, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)
+            },
+            "modules": [
+                {"module": name, "cumulative_seconds": round(cumulative, 6), "self_seconds": round(self_time, 6)}
+                for name, (cumulative, self_time) in modules[:top]
+            ],
+        }
+
+    def finish(self, output: Optional[str] = None):
+        """If profiling, write the JSON report to `output` ('-' or None for stderr) and exit instead of serving."""
+        if not self.enabled:
+            return
+        if self._import_timer in sys.meta_path:
+            sys.meta_path.remove(self._import_timer)
+        encoded = json.dumps(self.report(), indent=2)
+        if output in (None, "-"):
+            sys.stderr.write(encoded + "\n")
+            sys.stderr.flush()
+        else:
+            with open(output, "w", encoding="utf-8") as f:
+                f.write(encoded + "\n")
+        sys.exit(0)
+
+
+startup_profiler = StartupProfiler()
@@ -0,0 +1,239 @@
+import json
+import os
+import re
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+# Structured output for advanced analyses.
+# Instead of asking for "Key <Label> Concepts: a, b, c" inside free text and
+# splitting on that marker, the summary generation runs in Ollama's JSON mode
+# (format="json") and is asked to match the StructuredSummary schema. The output
+# is parsed incrementally, so the summary can be streamed while it generates and
+# each field is validated as soon as it is complete. Malformed or truncated
+# output falls back to whatever fields were recovered, then to the old marker
+# parsing of the text; it never triggers a second generation.
+STRUCTURED_OUTPUT = os.environ.get("STRUCTURED_OUTPUT", "1") == "1"
+
+DIFFICULTY_LEVELS = ("Beginner", "Intermediate", "Advanced")
+# Reported when the model did not rate the content (or rated it outside DIFFICULTY_LEVELS)
+DEFAULT_DIFFICULTY = "Intermediate"
+
+
+class StructuredSummary(BaseModel):
+    """The part of AnalysisResponse produced by the summary generation."""
+
+    summary: str
+    key_concepts: List[str]
+    difficulty_level: Literal["Beginner", "Intermediate", "Advanced"]
+
+
+_FIELD_ADAPTERS = {name: TypeAdapter(field.annotation) for name, field in StructuredSummary.model_fields.items()}
+
+STRUCTURED_SUMMARY_INSTRUCTIONS = """
+
+Return your answer as one JSON object matching this JSON schema:
+{schema}
+Put your complete analysis, structured as described above, in "summary" as text.
+List the main {label} concepts in "key_concepts" and rate the content in "difficulty_level"."""
+
+
+def with_json_instructions(prompt: str, label: str) -> str:
+    """Add the StructuredSummary schema to a prompt, inside its [INST] block when it has one."""
+    instructions = STRUCTURED_SUMMARY_INSTRUCTIONS.format(
+        schema=json.dumps(StructuredSummary.model_json_schema()), label=label
+    )
+    if prompt.rstrip().endswith("[/INST]"):
+        return prompt.rstrip()[:-len("[/INST]")].rstrip() + instructions + " [/INST]"
+    return prompt + instructions
+
+
+def validate_field(name: str, value: Any) -> Optional[Any]:
+    """Validate one StructuredSummary field, coercing near misses; None if unusable."""
+    if name == "key_concepts" and isinstance(value, str):
+        value = [c.strip(" -*") for c in value.split(",") if c.strip(" -*")]
+    if name == "key_concepts" and isinstance(value, list):
+        value = [str(c).strip() for c in value if str(c).strip()]
+    if name == "difficulty_level" and isinstance(value, str):
+        match = re.search("|".join(DIFFICULTY_LEVELS), value, re.I)
+        value = match.group(0).title() if match else value
+    try:
+        return _FIELD_ADAPTERS[name].validate_python(value)
+    except (KeyError, ValidationError):
+        return None
+
+
+def difficulty_from_text(text: str) -> str:
+    """The difficulty level named in free text, or DEFAULT_DIFFICULTY."""
+    return validate_field("difficulty_level", text) or DEFAULT_DIFFICULTY
+
+
+class IncrementalJSONParser:
+    """Parses a top-level JSON object as it streams in.
+
+    feed() returns ("delta", key, text) events while a string value is being
+    generated and ("field", key, value) events when a value is complete.
+    Nested arrays/objects are collected and decoded when they close.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.partial: Dict[str, str] = {}
+        self.complete = False
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._token: List[str] = []
+        self._escape: Optional[str] = None
+        self._surrogate = ""
+        self._depth = 0
+        self._raw_in_string = False
+        self._raw_escape = False
+
+    def feed(self, text: str) -> List[Tuple[str, str, Any]]:
+        events = []
+        for ch in text:
+            self._step(ch, events)
+        return events
+
+    def finish(self) -> Dict[str, Any]:
+        """Fields parsed so far, plus the text of a string value cut off mid-way."""
+        if self._state == "raw" and self._depth == 0:
+            self._finish_raw([])
+        fields = dict(self.fields)
+        for key, text in self.partial.items():
+            fields.setdefault(key, text)
+        return fields
+
+    def _string_char(self, ch: str) -> Tuple[str, bool]:
+        """Consume one character of a JSON string body: (decoded text, string ended)."""
+        if self._escape is not None:
+            self._escape += ch
+            if self._escape[0] == "u" and len(self._escape) < 5:
+                return "", False
+            try:
+                decoded = json.loads('"\\' + self._escape + '"')
+            except json.JSONDecodeError:
+                decoded = ""
+            self._escape = None
+            if "\ud800" <= decoded <= "\udbff":
+                self._surrogate = decoded
+                return "", False
+            if self._surrogate:
+                decoded = (self._surrogate + decoded).encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+                self._surrogate = ""
+            return decoded, False
+        if ch == "\\":
+            self._escape = ""
+            return "", False
+        if ch == '"':
+            return "", True
+        return ch, False
+
+    def _step(self, ch: str, events: list):
+        state = self._state
+        if state == "start":
+            if ch == "{":
+                self._state = "key_or_end"
+        elif state == "key_or_end":
+            if ch == '"':
+                self._token = []
+                self._state = "key"
+            elif ch == "}":
+                self._state, self.complete = "done", True
+        elif state == "key":
+            text, ended = self._string_char(ch)
+            if ended:
+                self._key = "".join(self._token)
+                self._state = "colon"
+            else:
+                self._token.append(text)
+        elif state == "colon":
+            if ch == ":":
+                self._state = "value"
+        elif state == "value":
+            if ch.isspace():
+                return
+            if ch == '"':
+                self.partial[self._key] = ""
+                self._state = "string"
+            else:
+                self._token = [ch]
+                self._depth = 1 if ch in "[{" else 0
+                self._raw_in_string = self._raw_escape = False
+                self._state = "raw"
+        elif state == "string":
+            text, ended = self._string_char(ch)
+            if text:
+                self.partial[self._key] += text
+                events.append(("delta", self._key, text))
+            if ended:
+                self._set_field(self.partial.pop(self._key), events)
+                self._state = "after_value"
+        elif state == "raw":
+            self._raw_step(ch, events)
+        elif state == "after_value":
+            if ch == ",":
+                self._state = "key_or_end"
+            elif ch == "}":
+                self._state, self.complete = "done", True
+
+    def _raw_step(self, ch: str, events: list):
+        if self._raw_in_string:
+            self._token.append(ch)
+            if self._raw_escape:
+                self._raw_escape = False
+            elif ch == "\\":
+                self._raw_escape = True
+            elif ch == '"':
+                self._raw_in_string = False
+            return
+        if self._depth == 0 and (ch in ",}" or ch.isspace()):
+            # End of a number/true/false/null; the delimiter belongs to the object
+            self._finish_raw(events)
+            self._state = "after_value"
+            self._step(ch, events)
+            return
+        self._token.append(ch)
+        if ch == '"':
+            self._raw_in_string = True
+        elif ch in "[{":
+            self._depth += 1
+        elif ch in "]}":
+            self._depth -= 1
+            if self._depth == 0:
+                self._finish_raw(events)
+                self._state = "after_value"
+
+    def _finish_raw(self, events: list):
+        try:
+            self._set_field(json.loads("".join(self._token)), events)
+        except json.JSONDecodeError:
+            pass
+
+    def _set_field(self, value: Any, events: list):
+        self.fields[self._key] = value
+        events.append(("field", self._key, value))
+
+
+def parse_structured_summary(text: str) -> Dict[str, Any]:
+    """Validated StructuredSummary fields from a complete (or truncated) JSON-mode generation."""
+    try:
+        fields = json.loads(text)
+    except json.JSONDecodeError:
+        fields = None
+    if not isinstance(fields, dict):
+        parser = IncrementalJSONParser()
+        parser.feed(text)
+        fields = parser.finish()
+    return validated_fields(fields)
+
+
+def validated_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the StructuredSummary fields that validate."""
+    valid = {}
+    for name in StructuredSummary.model_fields:
+        if name in fields:
+            value = validate_field(name, fields[name])
+            if value is not None:
+                valid[name] = value
+    return valid
@@ -0,0 +1,88 @@
+import os
+import re
+from typing import Dict, Tuple
+
+# Token accounting for analyzer prompts.
+# Prompt size is estimated locally (no tokenizer download, microseconds per
+# prompt), the completion budget (num_predict) grows with the size of the
+# document instead of being a flat 2000, and it is capped so prompt + completion
+# fit in the context window. Actual counts reported by Ollama (prompt_eval_count,
+# eval_count) are collected per stage for the response metadata and the logs.
+# ollama_client sends OLLAMA_NUM_CTX as num_ctx on every call.
+OLLAMA_NUM_CTX = int(os.environ.get("OLLAMA_NUM_CTX", "8192"))
+CONTEXT_MARGIN = 64
+# Completion tokens allowed per document token, before clamping to the stage's range
+COMPLETION_RATIO = float(os.environ.get("COMPLETION_RATIO", "0.5"))
+# Advanced analysis asks for concepts, difficulty and prerequisites on top
+ADVANCED_ANALYSIS_FACTOR = 1.25
+MIN_NUM_PREDICT = 64
+
+# stage -> (min, max) num_predict
+COMPLETION_BUDGETS: Dict[str, Tuple[int, int]] = {
+    "summary": (400, 2000),
+    "roadmap": (400, 2000),
+    "single_pass": (800, 3000),
+    "chunk_notes": (150, 400),
+}
+
+# Words and numbers, single punctuation marks, and runs of newlines
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate Llama 3 token count: common words are one token, long words split every ~6 letters."""
+    count = 0
+    for piece in _TOKEN_RE.findall(text):
+        count += 1 + (len(piece) - 1) // 6 if piece[0].isalpha() else 1
+    return count
+
+
+def completion_budget(stage: str, document_tokens: int, prompt_tokens: int, advanced: bool = False) -> int:
+    """num_predict for one generation, scaled by input size and capped by the context window."""
+    low, high = COMPLETION_BUDGETS[stage]
+    budget = low + COMPLETION_RATIO * document_tokens
+    if advanced:
+        budget *= ADVANCED_ANALYSIS_FACTOR
+    budget = min(int(budget), high)
+    return max(MIN_NUM_PREDICT, min(budget, OLLAMA_NUM_CTX - prompt_tokens - CONTEXT_MARGIN))
+
+
+def budgeted_options(options: dict, stage: str, prompt: str, document_tokens: int,
+                     advanced: bool = False) -> Tuple[dict, int]:
+    """Copy of `options` with num_predict set for this prompt; also returns the prompt estimate."""
+    prompt_tokens = estimate_tokens(prompt)
+    num_predict = completion_budget(stage, document_tokens, prompt_tokens, advanced)
+    return {**options, "num_predict": num_predict}, prompt_tokens
+
+
+class TokenUsage:
+    """Estimated and actual token counts per stage of one analysis."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, int]] = {}
+
+    def _stage(self, stage: str) -> Dict[str, int]:
+        return self.stages.setdefault(
+            stage, {"calls": 0, "estimated_prompt_tokens": 0, "num_predict": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        )
+
+    def plan(self, stage: str, estimated_prompt_tokens: int, num_predict: int):
+        entry = self._stage(stage)
+        entry["calls"] += 1
+        entry["estimated_prompt_tokens"] += estimated_prompt_tokens
+        entry["num_predict"] += num_predict
+
+    def record(self, stage: str, response: dict):
+        """Add Ollama's counts from a finished response (or the final chunk of a stream)."""
+        entry = self._stage(stage)
+        entry["prompt_tokens"] += response.get("prompt_eval_count") or 0
+        entry["completion_tokens"] += response.get("eval_count") or 0
+
+    def report(self) -> dict:
+        return {
+            **self.stages,
+            "total": {
+                "prompt_tokens": sum(s["prompt_tokens"] for s in self.stages.values()),
+                "completion_tokens": sum(s["completion_tokens"] for s in self.stages.values()),
+            },
+        }
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from metrics import Counter, register_collector
+
+# Cache of domain-check verdicts, separate from the full analysis cache.
+# Whether a text belongs to a domain depends only on the text and the domain,
+# not on model size or context, and near-duplicate submissions (the same notes
+# with a typo fixed) should reuse the verdict. Texts are fingerprinted with a
+# 64-bit SimHash and looked up by Hamming distance.
+VERDICT_CACHE_MAX_ENTRIES = int(os.environ.get("VERDICT_CACHE_MAX_ENTRIES", "4096"))
+VERDICT_MAX_DISTANCE = int(os.environ.get("VERDICT_MAX_DISTANCE", "7"))
+
+# Split fingerprints into 8 bands of 8 bits: two fingerprints within 7 bits of
+# each other must share at least one band exactly, so lookups only compare
+# against the few entries in matching bands.
+_BANDS = 8
+_BAND_BITS = 64 // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over the words and word bigrams of the normalized text."""
+    words = _WORD_RE.findall(text.lower())
+    shingles = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not shingles:
+        return 0
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles],
+        dtype=np.uint64,
+    )
+    # Bit i of every hash, as a (n_shingles, 64) 0/1 matrix
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    fingerprint = np.packbits(votes > 0, bitorder="little").view(np.uint64)[0]
+    return int(fingerprint)
+
+
+def _bands(fingerprint: int):
+    return [(i, (fingerprint >> (i * _BAND_BITS)) & _BAND_MASK) for i in range(_BANDS)]
+
+
+class VerdictCache:
+    """Bounded LRU of (domain, SimHash) -> (is_domain, confidence) with near-duplicate lookup."""
+
+    def __init__(self, max_entries: int = VERDICT_CACHE_MAX_ENTRIES, max_distance: int = VERDICT_MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = min(max_distance, _BANDS - 1)
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[bool, float]]" = OrderedDict()
+        self._band_index: Dict[Tuple[str, int, int], Set[int]] = {}
+
+    def get(self, domain: str, fingerprint: int) -> Optional[Tuple[bool, float]]:
+        key = (domain, fingerprint)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        for band, value in _bands(fingerprint):
+            for candidate in self._band_index.get((domain, band, value), ()):
+                if bin(candidate ^ fingerprint).count("1") <= self.max_distance:
+                    self._entries.move_to_end((domain, candidate))
+                    self.hits += 1
+                    self.near_hits += 1
+                    return self._entries[(domain, candidate)]
+
+        self.misses += 1
+        return None
+
+    def set(self, domain: str, fingerprint: int, verdict: Tuple[bool, float]):
+        key = (domain, fingerprint)
+        if key not in self._entries:
+            for band, value in _bands(fingerprint):
+                self._band_index.setdefault((domain, band, value), set()).add(fingerprint)
+        self._entries[key] = verdict
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "near_duplicate_hits": self.near_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+        }
+
+    def _evict(self, key: Tuple[str, int]):
+        domain, fingerprint = key
+        del self._entries[key]
+        for band, value in _bands(fingerprint):
+            bucket = self._band_index.get((domain, band, value))
+            if bucket is not None:
+                bucket.discard(fingerprint)
+                if not bucket:
+                    del self._band_index[(domain, band, value)]
+
+
+_verdict_cache: Optional[VerdictCache] = None
+
+
+def get_verdict_cache() -> VerdictCache:
+    """Return the process-wide domain verdict cache."""
+    global _verdict_cache
+    if _verdict_cache is None:
+        _verdict_cache = VerdictCache()
+    return _verdict_cache
+
+
+register_collector(
+    "verdict_cache_lookups_total", "Domain verdict cache lookups by result", ("result",),
+    lambda: {
+        ("hit",): get_verdict_cache().hits - get_verdict_cache().near_hits,
+        ("near_duplicate_hit",): get_verdict_cache().near_hits,
+        ("miss",): get_verdict_cache().misses,
+    },
+    kind=Counter,
+)
+
+
+async def cached_llm_check(domain: str, text: str,
+                           llm_check: Callable[[str], Awaitable[Tuple[bool, float]]]) -> Tuple[bool, float]:
+    """Run `llm_check` unless a verdict for this (or a near-duplicate) text is cached."""
+    cache = get_verdict_cache()
+    fingerprint = simhash(text)
+    verdict = cache.get(domain, fingerprint)
+    if verdict is None:
+        verdict = tuple(await llm_check(text))
+        # (False, 0.0) is what the checks return when the model call failed
+        if verdict != (False, 0.0):
+            cache.set(domain, fingerprint, verdict)
+    return verdict
@@ -12,13 +12,16 @@ export const getTutors = async (): Promise<TutorProfile[]> => {
     return res.json();
 };
 
-export const streamLocalChat = async (messages: any[], tutorId: string) => {
+// Pass sessionId ('' to start one) to keep the conversation on the server; reuse the returned
+// sessionId next turn so only the new message is sent through the model again.
+export const streamLocalChat = async (messages: any[], tutorId: string, sessionId?: string) => {
     const response = await apiFetch('/api/chat', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
             messages,
-            tutor_id: tutorId
+            tutor_id: tutorId,
+            session_id: sessionId
         })
     });
     
@@ -28,6 +31,7 @@ export const streamLocalChat = async (messages: any[], tutorId: string) => {
     const reader = response.body.getReader();
     const decoder = new TextDecoder();
     return {
+        sessionId: response.headers.get('X-Chat-Session'),
         async *[Symbol.asyncIterator]() {
             let buffer = '';
             while (true) {
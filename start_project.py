@@ -94,24 +94,15 @@ def start_node_router():
     start_process(f"node \"{NODE_ROUTER_PATH}\"", cwd=ROOT_DIR, shell=True) # Quotes for paths with spaces
 
 def start_domain_models():
-    log(f"Scanning {MODELS_DIR} for domain services...", "info")
-    if not os.path.exists(MODELS_DIR):
-        log("Models directory not found!", "error")
+    engine_py = os.path.join(MODELS_DIR, "analysis_engine.py")
+    if not os.path.exists(engine_py):
+        log("Analysis engine not found!", "error")
         return
 
-    count = 0
-    for item in os.listdir(MODELS_DIR):
-        item_path = os.path.join(MODELS_DIR, item)
-        if os.path.isdir(item_path):
-            main_py = os.path.join(item_path, "main.py")
-            if os.path.exists(main_py):
-                domain_name = item
-                log(f"Starting Domain: {domain_name}", "info")
-                start_process(f"{sys.executable} \"{main_py}\"", cwd=ROOT_DIR, shell=True)
-                count += 1
-                time.sleep(0.5) # Stagger starts slightly
-    
-    log(f"Started {count} domain services.", "success")
+    # One process serves every domain spec; --compat keeps the old per-domain ports reachable
+    log("Starting Document Analysis Engine (all domains)...", "info")
+    start_process(f"{sys.executable} \"{engine_py}\" --compat", cwd=ROOT_DIR, shell=True)
+    log("Started domain analysis engine.", "success")
 
 def start_frontend():
     log("Starting Frontend...", "info")
@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+
+from admission import BULK, INTERACTIVE, AdmissionController, AdmissionRejected
+from analysis_engine import run_together
+
+MODEL = "llama3:8b"
+
+
+def controller(limit=2, reserve=1, max_queue=8, max_wait=5.0):
+    return AdmissionController(default_limit=limit, model_limits={}, max_queue=max_queue, max_wait=max_wait,
+                               reserve=reserve)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_bulk_cannot_take_the_interactive_reserve():
+    async def run():
+        admission = controller(limit=2, reserve=1)
+        await admission.acquire(MODEL, BULK)
+        waiter = asyncio.ensure_future(admission.acquire(MODEL, BULK))
+        await settle()
+        assert not waiter.done()
+        assert admission.queue(MODEL).stats()["waiting"] == 1
+        waiter.cancel()
+
+    asyncio.run(run())
+
+
+def test_interactive_uses_the_reserve_while_bulk_waits():
+    async def run():
+        admission = controller(limit=2, reserve=1)
+        await admission.acquire(MODEL, BULK)
+        bulk_waiter = asyncio.ensure_future(admission.acquire(MODEL, BULK))
+        await settle()
+        # A queued bulk request must not hold back an interactive one that has a free slot
+        await asyncio.wait_for(admission.acquire(MODEL, INTERACTIVE), 0.5)
+        assert admission.queue(MODEL).active == 2
+        assert not bulk_waiter.done()
+        bulk_waiter.cancel()
+
+    asyncio.run(run())
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    async def run():
+        admission = controller(limit=1, reserve=0)
+        await admission.acquire(MODEL, BULK)
+        order = []
+
+        async def request(name, priority):
+            await admission.acquire(MODEL, priority)
+            order.append(name)
+            admission.queue(MODEL).release(0.0)
+
+        tasks = [asyncio.ensure_future(request("bulk-1", BULK))]
+        await settle()
+        tasks.append(asyncio.ensure_future(request("bulk-2", BULK)))
+        await settle()
+        tasks.append(asyncio.ensure_future(request("chat", INTERACTIVE)))
+        await settle()
+        admission.queue(MODEL).release(0.0)
+        await asyncio.gather(*tasks)
+        assert order == ["chat", "bulk-1", "bulk-2"]
+
+    asyncio.run(run())
+
+
+def test_new_request_does_not_jump_a_queued_one_of_the_same_priority():
+    async def run():
+        admission = controller(limit=1, reserve=0)
+        await admission.acquire(MODEL, INTERACTIVE)
+        first = asyncio.ensure_future(admission.acquire(MODEL, INTERACTIVE))
+        await settle()
+        assert not admission.queue(MODEL).has_room(INTERACTIVE)
+        admission.queue(MODEL).release(0.0)
+        await asyncio.wait_for(first, 0.5)
+        assert admission.queue(MODEL).active == 1
+
+    asyncio.run(run())
+
+
+def test_full_queue_is_rejected_with_429():
+    async def run():
+        admission = controller(limit=1, reserve=0, max_queue=1)
+        await admission.acquire(MODEL, BULK)
+        waiter = asyncio.ensure_future(admission.acquire(MODEL, BULK))
+        await settle()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire(MODEL, BULK)
+        assert rejected.value.status_code == 429
+        assert int(rejected.value.headers["Retry-After"]) >= 1
+        waiter.cancel()
+
+    asyncio.run(run())
+
+
+def test_wait_timeout_is_rejected_with_503():
+    async def run():
+        admission = controller(limit=1, reserve=0, max_wait=0.05)
+        await admission.acquire(MODEL, BULK)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire(MODEL, BULK)
+        assert rejected.value.status_code == 503
+        assert admission.stats()["rejected"]["wait_timeout"] == 1
+        assert admission.queued == 0
+
+    asyncio.run(run())
+
+
+def test_slot_is_released_when_the_block_exits():
+    async def run():
+        admission = controller(limit=1, reserve=0)
+        with pytest.raises(RuntimeError):
+            async with admission.slot(MODEL, INTERACTIVE):
+                raise RuntimeError("generation failed")
+        assert admission.queue(MODEL).active == 0
+
+    asyncio.run(run())
+
+
+def test_failed_generation_cancels_its_sibling_and_frees_both_slots():
+    async def run():
+        admission = controller(limit=2, reserve=0)
+
+        async def summary():
+            async with admission.slot(MODEL, INTERACTIVE):
+                await asyncio.sleep(0)
+                raise RuntimeError("summary failed")
+
+        async def roadmap():
+            async with admission.slot(MODEL, INTERACTIVE):
+                await asyncio.sleep(60)
+
+        with pytest.raises(RuntimeError, match="summary failed"):
+            await asyncio.wait_for(run_together(summary(), roadmap()), 1.0)
+        assert admission.queue(MODEL).active == 0
+
+    asyncio.run(run())
+
+
+def test_workers_split_the_per_model_limit():
+    admission = AdmissionController(default_limit=4, model_limits={"llama3:70b": 1}, workers=2, reserve=0)
+    assert admission.queue(MODEL).limit == 2
+    # Never below one slot, even when the limit is smaller than the worker count
+    assert admission.queue("llama3:70b").limit == 1
+
+
+def test_worker_share_keeps_the_interactive_reserve(caplog):
+    admission = AdmissionController(default_limit=8, model_limits={"llama3:70b": 4}, workers=4, reserve=1)
+    assert admission.queue(MODEL).limit == 2
+    assert not caplog.records
+
+    queue = admission.queue("llama3:70b")
+    assert queue.limit == 2
+    assert queue.capacity(BULK) < queue.capacity(INTERACTIVE)
+    assert "8 in total" in caplog.text
@@ -0,0 +1,131 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+import analysis_cache
+from analysis_cache import AnalysisCache, SingleFlight, cached_analysis
+
+
+class Response(BaseModel):
+    summary: str
+    domain_confidence: float
+    stage_timings: Optional[dict] = None
+    token_usage: Optional[dict] = None
+
+
+def request(text="photosynthesis"):
+    return SimpleNamespace(text=text, model_size="small", advanced_analysis=False, context=None,
+                           queryType=None, single_pass=False)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = AnalysisCache(max_entries=16, max_bytes=1 << 20, ttl=60, db_path="")
+    monkeypatch.setattr(analysis_cache, "_cache", cache)
+    monkeypatch.setattr(analysis_cache, "_single_flight", None)
+    return cache
+
+
+def test_cache_hit_drops_the_measurements_of_the_original_run(cache):
+    calls = []
+
+    @cached_analysis("biology", Response)
+    async def analyze(req):
+        calls.append(req.text)
+        return Response(summary="cells", domain_confidence=0.9, stage_timings={"generation": 1.5},
+                        token_usage={"prompt_tokens": 120})
+
+    async def run():
+        first = await analyze(request())
+        second = await analyze(request())
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert len(calls) == 1
+    assert first.stage_timings == {"generation": 1.5}
+    assert second.summary == "cells"
+    assert second.stage_timings is None and second.token_usage is None
+
+
+def test_failed_domain_check_is_not_cached(cache):
+    calls = []
+
+    @cached_analysis("biology", Response)
+    async def analyze(req):
+        calls.append(req.text)
+        # Out-of-domain answer with the (False, 0.0) verdict of a failed model call
+        return Response(summary="outside the Biology domain", domain_confidence=0.0)
+
+    async def run():
+        await analyze(request())
+        await analyze(request())
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", compute) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "started": 1, "coalesced": 4}
+
+
+def test_single_flight_survives_a_cancelled_caller():
+    flight = SingleFlight()
+
+    async def run():
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return "result"
+
+        first = asyncio.ensure_future(flight.do("key", compute))
+        second = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0)
+        # The caller that started the work disconnects; the other still gets the result
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await second == "result"
+        assert first.cancelled()
+
+    asyncio.run(run())
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_single_flight_shares_failures_and_retries_afterwards():
+    flight = SingleFlight()
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        await asyncio.sleep(0)
+        if len(attempts) == 1:
+            raise RuntimeError("ollama down")
+        return "result"
+
+    async def run():
+        results = await asyncio.gather(flight.do("key", compute), flight.do("key", compute),
+                                       return_exceptions=True)
+        assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+        # The failed call is not remembered
+        assert await flight.do("key", compute) == "result"
+
+    asyncio.run(run())
+    assert len(attempts) == 2
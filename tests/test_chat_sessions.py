@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from chat_sessions import ChatSessionStore, to_prompt
+
+MODEL = "llama3:8b"
+SYSTEM = "You are a biology tutor."
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def assistant(text):
+    return {"role": "assistant", "content": text}
+
+
+def test_second_turn_prefills_only_the_new_message():
+    store = ChatSessionStore()
+    session = store.open("", MODEL, SYSTEM)
+    first = [user("What is mitosis?")]
+    assert store.begin_turn(session, first) == first
+    store.finish_turn(session, first, "Cell division.", context=[1, 2, 3, 4])
+
+    second = first + [assistant("Cell division."), user("And meiosis?")]
+    resumed = store.open(session.session_id, MODEL, SYSTEM)
+    assert resumed is session
+    assert store.begin_turn(resumed, second) == [user("And meiosis?")]
+    assert list(resumed.context) == [1, 2, 3, 4]
+    assert store.stats()["prompt_tokens_reused"] == 4
+
+
+def test_edited_history_rebuilds_the_session():
+    store = ChatSessionStore()
+    session = store.open("", MODEL, SYSTEM)
+    first = [user("What is mitosis?")]
+    store.begin_turn(session, first)
+    store.finish_turn(session, first, "Cell division.", context=[1, 2])
+
+    edited = [user("What is osmosis?"), assistant("Cell division."), user("Why?")]
+    assert store.begin_turn(session, edited) == edited
+    assert len(session.context) == 0
+    assert store.stats()["rebuilt"] == 1
+
+
+def test_unknown_ids_and_tutor_changes_get_a_new_server_issued_session():
+    store = ChatSessionStore()
+    session = store.open("", MODEL, SYSTEM)
+    assert store.open("made-up-id", MODEL, SYSTEM).session_id not in ("made-up-id", session.session_id)
+    assert store.open(session.session_id, MODEL, "You are a maths tutor.") is not session
+
+
+def test_idle_sessions_expire():
+    store = ChatSessionStore(idle_ttl=0.01)
+    session = store.open("", MODEL, SYSTEM)
+    time.sleep(0.02)
+    assert store.open(session.session_id, MODEL, SYSTEM) is not session
+    assert store.stats()["expired"] == 1
+
+
+def test_memory_cap_evicts_least_recently_used_but_not_sessions_mid_turn():
+    store = ChatSessionStore(max_bytes=3000)
+    sessions = [store.open("", MODEL, SYSTEM) for _ in range(3)]
+
+    async def hold_turn():
+        async with sessions[0].lock:
+            for session in sessions[1:]:
+                store.finish_turn(session, [user("x" * 500)], "y" * 500, context=range(100))
+
+    asyncio.run(hold_turn())
+    remaining = set(store.sessions)
+    # The oldest session was mid-turn, so the next least recently used one went instead
+    assert sessions[0].session_id in remaining
+    assert sessions[1].session_id not in remaining
+    assert sessions[2].session_id in remaining
+    assert store.stats()["evicted"] == 1
+
+
+def test_context_is_stored_compactly():
+    store = ChatSessionStore()
+    session = store.open("", MODEL, SYSTEM)
+    store.finish_turn(session, [user("hi")], "hello", context=list(range(1000)))
+    assert session.context.itemsize == 4
+    assert session.nbytes < 1000 * 8
+
+
+def test_prompt_for_several_messages_is_a_transcript():
+    assert to_prompt([user("hi")]) == "hi"
+    assert to_prompt([user("hi"), assistant("hello"), user("bye")]) == "User: hi\n\nAssistant: hello\n\nUser: bye"
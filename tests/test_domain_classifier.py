@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+import domain_classifier
+import verdict_cache
+from domain_classifier import ClassifierGate, DomainClassifier
+
+VOCABULARIES = {
+    "math": ["algebra", "calculus", "derivative", "integral", "matrix", "polynomial equation"],
+    "music": ["melody", "harmony", "chord progression", "rhythm", "tempo", "scale"],
+}
+
+
+@pytest.fixture
+def classifier(monkeypatch):
+    classifier = DomainClassifier(VOCABULARIES)
+    monkeypatch.setattr(domain_classifier, "_classifier", classifier)
+    monkeypatch.setattr(verdict_cache, "_verdict_cache", None)
+    return classifier
+
+
+def test_accepts_text_from_its_own_vocabulary(classifier):
+    is_domain, confidence = classifier.verdict("math", "take the derivative and the integral of this polynomial equation")
+    assert is_domain
+    assert 0.5 < confidence <= 1.0
+
+
+def test_rejects_text_from_another_domain(classifier):
+    is_domain, confidence = classifier.verdict("math", "the melody follows a chord progression at a slow tempo")
+    assert not is_domain
+    assert confidence <= 0.5 * domain_classifier.REJECT_RATIO
+
+
+def test_no_verdict_without_evidence(classifier):
+    assert classifier.verdict("math", "what did you have for breakfast today") is None
+    assert classifier.verdict("unknown", "derivative") is None
+
+
+def test_no_verdict_between_the_ratios(classifier, monkeypatch):
+    # Mixed text: the weaker domain scores somewhere between the two ratios
+    text = "the derivative of the melody and its harmony"
+    (_, best), (weaker, score) = classifier.rank(text)
+    ratio = score / best
+    assert 0.0 < ratio < 1.0
+    monkeypatch.setattr(domain_classifier, "ACCEPT_RATIO", ratio + 0.01)
+    monkeypatch.setattr(domain_classifier, "REJECT_RATIO", ratio - 0.01)
+    assert classifier.verdict(weaker, text) is None
+
+
+def test_min_evidence_threshold(classifier, monkeypatch):
+    text = "derivative"
+    assert classifier.verdict("math", text) is not None
+    monkeypatch.setattr(domain_classifier, "MIN_EVIDENCE", 1.01)
+    assert classifier.verdict("math", text) is None
+
+
+def test_gate_only_asks_the_model_when_unsure(classifier):
+    calls = []
+
+    async def llm_check(text):
+        calls.append(text)
+        return True, 0.9
+
+    async def run():
+        gate = ClassifierGate()
+        assert (await gate.check("math", "the integral of a matrix", llm_check))[0]
+        assert calls == []
+        assert await gate.check("math", "what did you have for breakfast today", llm_check) == (True, 0.9)
+        assert len(calls) == 1
+        assert await ClassifierGate(llm_fallback=False).check("math", "good morning", llm_check) == (True, 0.5)
+        assert len(calls) == 1
+
+    asyncio.run(run())
+
+
+def test_best_alternative_suggests_the_other_domain(classifier):
+    domain, score = classifier.best_alternative("math", "a chord progression with a steady rhythm")
+    assert domain == "music"
+    assert score >= domain_classifier.MIN_EVIDENCE
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from domain_proxy import DomainProxy, RouterChatRequest, chat_to_analysis, normalize_domain, parse_service_urls, relay
+
+
+class ChunkStream(httpx.AsyncByteStream):
+    """Upstream body that yields `chunks` and records whether it was closed."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def aclose(self):
+        self.closed = True
+
+
+def proxy_for(handler) -> DomainProxy:
+    proxy = DomainProxy(service_urls={"biology": "http://biology.test"})
+    proxy.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return proxy
+
+
+async def body_of(response) -> list:
+    return [chunk async for chunk in response.body_iterator]
+
+
+def test_domain_names_and_service_urls_are_normalized():
+    assert normalize_domain("UI-UX Design") == "ui_ux_design"
+    assert parse_service_urls("Data Science=http://10.0.0.5:8008/, bad") == {"data_science": "http://10.0.0.5:8008"}
+
+
+def test_forward_streams_the_request_and_relays_the_response():
+    received = {}
+    stream = ChunkStream([b'{"type": "summary"}\n', b'{"type": "done"}\n'])
+
+    async def handler(request: httpx.Request):
+        received["url"] = str(request.url)
+        received["body"] = await request.aread()
+        return httpx.Response(200, headers={"content-type": "application/x-ndjson", "x-internal": "1"}, stream=stream)
+
+    async def request_body():
+        yield b'{"text": '
+        yield b'"cells"}'
+
+    async def run():
+        proxy = proxy_for(handler)
+        response = await proxy.forward("Biology", "/analyze/stream", request_body())
+        return response, await body_of(response)
+
+    response, chunks = asyncio.run(run())
+    assert received == {"url": "http://biology.test/analyze/stream", "body": b'{"text": "cells"}'}
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "x-internal" not in response.headers
+    assert chunks == stream.chunks
+    assert stream.closed
+
+
+def test_upstream_errors_map_to_gateway_statuses():
+    async def refused(request):
+        raise httpx.ConnectError("connection refused")
+
+    async def slow(request):
+        raise httpx.ReadTimeout("timed out")
+
+    async def run(handler, domain="biology"):
+        with pytest.raises(HTTPException) as error:
+            await proxy_for(handler).forward(domain, "/analyze", b"{}")
+        return error.value.status_code
+
+    assert asyncio.run(run(refused)) == 502
+    assert asyncio.run(run(slow)) == 504
+    assert asyncio.run(run(refused, domain="astrology")) == 400
+
+
+def test_relay_closes_the_response_when_the_client_goes_away():
+    stream = ChunkStream([b"a", b"b", b"c"])
+
+    async def run():
+        body = relay(httpx.Response(200, stream=stream))
+        assert await body.__anext__() == b"a"
+        # What Starlette does to the body iterator when the client disconnects
+        await body.aclose()
+
+    asyncio.run(run())
+    assert stream.closed
+
+
+def test_router_chat_becomes_an_analysis_request():
+    request = RouterChatRequest(tutor_id="Biology", messages=[
+        {"role": "user", "parts": [{"text": "hello"}]},
+        {"role": "user", "parts": [{"text": "Explain"}, {"text": "mitosis"}]},
+    ])
+    analysis = chat_to_analysis(request)
+    assert analysis["text"] == "Explain\nmitosis"
+    assert analysis["domain"] == "Biology" and analysis["queryType"] == "biology"
+    assert json.loads(json.dumps(analysis)) == analysis
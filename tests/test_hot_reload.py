@@ -0,0 +1,118 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+from model_discovery import (LazyAnalysisService, apply_engine_sources, load_engine_sources, prune_service_modules,
+                             read_metadata, source_stamps)
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+BIOLOGY_SHIM = os.path.join(MODELS_DIR, "Biology", "main.py")
+
+
+@pytest.fixture
+def engine():
+    """The imported engine; the real specs and engine module are put back afterwards."""
+    import analysis_engine
+    yield analysis_engine
+    apply_engine_sources(load_engine_sources(MODELS_DIR, []))
+    reloaded = sys.modules["analysis_engine"]
+    if reloaded is not analysis_engine:
+        sys.modules.pop(reloaded.__name__, None)
+    sys.modules["analysis_engine"] = analysis_engine
+    analysis_engine._analyzers.clear()
+
+
+def edited_models_dir(tmp_path, name, old, new):
+    """A copy of the engine sources with one replacement made in `name`."""
+    for source in ("domain_specs.py", "analysis_engine.py"):
+        shutil.copy(os.path.join(MODELS_DIR, source), tmp_path / source)
+    path = tmp_path / name
+    content = path.read_text(encoding="utf-8")
+    assert old in content
+    path.write_text(content.replace(old, new, 1), encoding="utf-8")
+    return str(tmp_path)
+
+
+def domain_check_prompt(version: int) -> str:
+    analyze = LazyAnalysisService("biology", BIOLOGY_SHIM, version=version).load()
+    return analyze.__self__.prompt("domain_check", text="mitosis")
+
+
+def test_spec_edit_rebuilds_the_analyzer(engine, tmp_path):
+    before = domain_check_prompt(version=901)
+    assert "a biology domain expert" in before
+
+    models_dir = edited_models_dir(tmp_path, "domain_specs.py", '"subject": "biology"', '"subject": "cell biology"')
+    apply_engine_sources(load_engine_sources(models_dir, ["domain_specs.py"]))
+
+    assert "a cell biology domain expert" in domain_check_prompt(version=902)
+    from domain_specs import DOMAIN_SPECS
+    assert DOMAIN_SPECS["biology"]["subject"] == "cell biology"
+
+
+def test_engine_edit_is_imported_as_a_new_module(engine, tmp_path):
+    old_analyzer = LazyAnalysisService("biology", BIOLOGY_SHIM, version=903).load().__self__
+
+    models_dir = edited_models_dir(tmp_path, "analysis_engine.py", "domain expert. Analyze if", "domain reviewer. Analyze if")
+    loaded = load_engine_sources(models_dir, ["analysis_engine.py"])
+    # Loading (on a worker thread in the gateway) leaves the importable engine alone
+    assert sys.modules["analysis_engine"] is engine
+    apply_engine_sources(loaded)
+
+    assert sys.modules["analysis_engine"] is loaded["engine"]
+    assert "domain reviewer" in domain_check_prompt(version=904)
+    # Requests already holding the previous analyzer keep the old code
+    assert "domain expert" in old_analyzer.prompt("domain_check", text="mitosis")
+
+
+def test_broken_spec_file_is_rejected_before_anything_is_swapped(engine, tmp_path):
+    models_dir = edited_models_dir(tmp_path, "domain_specs.py", "DOMAIN_SPECS = {", "DOMAIN_SPECS = {{")
+    with pytest.raises(SyntaxError):
+        load_engine_sources(models_dir, ["domain_specs.py"])
+    from domain_specs import DOMAIN_SPECS
+    assert DOMAIN_SPECS["biology"]["subject"] == "biology"
+
+
+def test_unparsable_module_is_skipped_by_discovery(tmp_path):
+    from model_discovery import discover_modules
+    (tmp_path / "good.py").write_text('MODEL_CONFIG = {"id": "good"}\n', encoding="utf-8")
+    (tmp_path / "broken.py").write_text("def oops(:\n", encoding="utf-8")
+    (tmp_path / "computed.py").write_text('MODEL_CONFIG = dict(id="computed")\n', encoding="utf-8")
+    errors = {}
+    modules = discover_modules(str(tmp_path), errors=errors)
+    assert [m.name for m in modules] == ["good"]
+    assert sorted(errors) == ["broken", "computed"]
+
+    # On a reload a file that stops parsing keeps its last good version
+    previous = {str(tmp_path / "broken.py"): read_metadata("good", str(tmp_path / "good.py"))}
+    assert len(discover_modules(str(tmp_path), previous)) == 2
+
+
+def test_only_live_service_versions_stay_in_sys_modules(engine):
+    old = LazyAnalysisService("biology", BIOLOGY_SHIM, version=905)
+    new = LazyAnalysisService("biology", BIOLOGY_SHIM, version=906)
+    old_analyze = old.load()
+    new.load()
+    prune_service_modules([new])
+    assert "analysis_service_biology_v905" not in sys.modules
+    assert "analysis_service_biology_v906" in sys.modules
+    # A request holding the old version still works
+    assert "biology" in old_analyze.__self__.prompt("domain_check", text="mitosis")
+    prune_service_modules([])
+
+
+def test_helper_edits_are_not_watched(tmp_path):
+    service, helper = tmp_path / "service.py", tmp_path / "helper.py"
+    service.write_text("async def analyze_text(request): ...\n", encoding="utf-8")
+    helper.write_text("VALUE = 1\n", encoding="utf-8")
+    helpers = {str(helper)}
+    before = source_stamps(str(tmp_path), helpers)
+
+    helper.write_text("VALUE = 22\n", encoding="utf-8")
+    assert source_stamps(str(tmp_path), helpers) == before
+    service.write_text("async def analyze_text(request): return None\n", encoding="utf-8")
+    assert source_stamps(str(tmp_path), helpers) != before
+    helper.unlink()
+    assert str(helper) not in source_stamps(str(tmp_path), helpers)
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from admission import BULK, AdmissionController, AdmissionRejected
+from long_document import LONG_DOC_CHUNK_TOKENS, condense, is_long, split_into_chunks
+from token_budget import estimate_tokens
+
+MODEL = "llama3:8b"
+
+
+def document(paragraphs: int) -> str:
+    """About one chunk of words per paragraph."""
+    paragraph = " ".join(["cell"] * (LONG_DOC_CHUNK_TOKENS - 10)) + "."
+    return "\n\n".join(f"Paragraph {i}. {paragraph}" for i in range(paragraphs))
+
+
+def test_chunks_stay_within_the_token_budget():
+    chunks = split_into_chunks(document(5))
+    assert len(chunks) == 5
+    assert all(estimate_tokens(chunk) <= LONG_DOC_CHUNK_TOKENS for chunk in chunks)
+
+
+def test_map_runs_at_most_max_parallel_chunks_and_keeps_their_order():
+    in_flight, peak = 0, 0
+
+    async def summarize(chunk, part, parts):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return f"note {part}/{parts}"
+
+    notes, report = asyncio.run(condense(document(6), summarize, max_parallel=2))
+    assert peak == 2
+    assert report["chunk_count"] == 6 and report["rounds"] == 1
+    assert notes.index("note 1/6") < notes.index("note 6/6")
+    assert not is_long(notes)
+
+
+def test_many_chunks_finish_behind_a_single_bulk_slot():
+    async def run(max_parallel):
+        admission = AdmissionController(default_limit=2, model_limits={}, max_queue=64, max_wait=0.2, reserve=1)
+
+        async def summarize(chunk, part, parts):
+            async with admission.slot(MODEL, BULK):
+                await asyncio.sleep(0.05)
+            return f"note {part}"
+
+        return await condense(document(12), summarize, max_parallel=max_parallel)
+
+    # Every chunk queued at once: the later ones outwait ADMISSION_MAX_WAIT
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(run(max_parallel=12))
+    # Bounded by the bulk slots, each chunk gets its slot as soon as it asks
+    notes, report = asyncio.run(run(max_parallel=1))
+    assert report["chunk_count"] == 12
+    assert "note 12" in notes
+
+
+def test_a_failed_chunk_fails_the_document():
+    async def summarize(chunk, part, parts):
+        if part == 3:
+            raise RuntimeError("model went away")
+        return "note"
+
+    with pytest.raises(RuntimeError, match="model went away"):
+        asyncio.run(condense(document(4), summarize, max_parallel=2))
@@ -0,0 +1,34 @@
+import os
+
+import metrics
+from metrics import Counter, Histogram
+
+
+def test_series_are_rendered_in_exposition_format():
+    counter = Counter("requests_total", "Requests", ("route",))
+    counter.inc("/analyze")
+    counter.inc("/analyze", amount=2)
+    histogram = Histogram("latency_seconds", "Latency", (), buckets=(0.1, 1))
+    histogram.observe(0.5)
+    assert counter.render() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/analyze"} 3',
+    ]
+    assert histogram.samples() == [
+        'latency_seconds_bucket{le="0.1"} 0',
+        'latency_seconds_bucket{le="1"} 1',
+        'latency_seconds_bucket{le="+Inf"} 1',
+        "latency_seconds_sum 0.5",
+        "latency_seconds_count 1",
+    ]
+
+
+def test_workers_label_their_series_with_the_pid(monkeypatch):
+    monkeypatch.setattr(metrics, "CONSTANT_LABELS", {"worker": str(os.getpid())})
+    counter = Counter("requests_total", "Requests", ("route",))
+    counter.inc("/analyze")
+    unlabelled = Counter("up", "Up")
+    unlabelled.inc()
+    assert counter.samples() == [f'requests_total{{worker="{os.getpid()}",route="/analyze"}} 1']
+    assert unlabelled.samples() == [f'up{{worker="{os.getpid()}"}} 1']
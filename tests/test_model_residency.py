@@ -0,0 +1,34 @@
+import asyncio
+
+import ollama_client
+from model_residency import ResidencyManager, normalize_model_name
+
+
+def test_normalize_model_name():
+    assert normalize_model_name("llama3") == "llama3:latest"
+    assert normalize_model_name("llama3:8b") == "llama3:8b"
+    assert normalize_model_name("registry.local:5000/team/llama3") == "registry.local:5000/team/llama3:latest"
+
+
+def test_preload_loads_each_model_once(monkeypatch):
+    loaded = []
+
+    async def fake_call(method, timeout=None, **kwargs):
+        if method == "list":
+            return {"models": [
+                {"name": "llama3:latest", "digest": "365c0bd3c000"},
+                {"name": "llama3:8b", "digest": "365c0bd3c000"},
+                {"name": "mistral:latest", "digest": "f974a74358d6"},
+            ]}
+        loaded.append(kwargs["model"])
+        return {"response": ""}
+
+    monkeypatch.setattr(ollama_client, "_call", fake_call)
+    residency = ResidencyManager()
+    monkeypatch.setattr(ollama_client, "get_residency", lambda: residency)
+
+    asyncio.run(residency.preload(["llama3", "llama3:8b", "mistral", "llama3:latest", "codellama"]))
+    assert sorted(loaded) == ["codellama:latest", "llama3:latest", "mistral:latest"]
+    state = residency.state()
+    assert sorted(state) == ["codellama:latest", "llama3:8b", "llama3:latest", "mistral:latest"]
+    assert state["llama3:8b"]["status"] == "resident"
@@ -0,0 +1,86 @@
+import multiprocessing
+import time
+
+import pytest
+
+from shared_cache import _SEQUENCE, SharedCache, _digest, create_segment
+
+
+@pytest.fixture
+def segment(tmp_path):
+    path = create_segment(str(tmp_path / "cache.seg"), slots=64, slot_bytes=1024)
+    cache = SharedCache(path)
+    yield cache
+    cache.close()
+
+
+def test_round_trip_and_expiry(segment):
+    assert segment.set("a", {"summary": "cells"}, ttl=60)
+    assert segment.get("a") == {"summary": "cells"}
+    assert segment.set("b", "soon gone", ttl=0.01)
+    time.sleep(0.02)
+    assert segment.get("b") is None
+    assert segment.get("missing") is None
+
+
+def test_values_larger_than_a_slot_are_not_stored(segment):
+    assert not segment.set_bytes("big", b"x" * 2048, ttl=60)
+    assert segment.get_bytes("big") is None
+
+
+def test_clear_empties_every_slot(segment):
+    for i in range(10):
+        segment.set(f"k{i}", i, ttl=60)
+    assert segment.stats()["used_slots"] == 10
+    segment.clear()
+    assert segment.stats()["used_slots"] == 0
+    assert segment.get("k1") is None
+
+
+def test_reader_skips_a_slot_being_written(segment):
+    segment.set("a", "value", ttl=60)
+    digest = _digest("a")
+    slot = next(slot for slot in segment._candidates(digest) if segment._read_slot(slot, digest) is not None)
+    offset = segment._offset(slot)
+    sequence = _SEQUENCE.unpack_from(segment._map, offset)[0]
+    # An odd sequence number means a writer is half-way through this slot
+    _SEQUENCE.pack_into(segment._map, offset, sequence + 1)
+    assert segment.get("a") is None
+    assert segment.torn_reads > 0
+    _SEQUENCE.pack_into(segment._map, offset, sequence + 2)
+    assert segment.get("a") == "value"
+
+
+def _write(path, rounds):
+    cache = SharedCache(path)
+    for i in range(rounds):
+        key = f"k{i % 20}"
+        cache.set(key, {"key": key, "i": i, "padding": "x" * (i % 700)}, ttl=60)
+
+
+def _read(path, seconds, results):
+    cache = SharedCache(path)
+    bad = hits = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for j in range(20):
+            value = cache.get(f"k{j}")
+            if value is not None:
+                hits += 1
+                if value["key"] != f"k{j}" or len(value["padding"]) != value["i"] % 700:
+                    bad += 1
+    results.put((hits, bad))
+
+
+def test_concurrent_processes_never_read_a_torn_value(tmp_path):
+    path = create_segment(str(tmp_path / "shared.seg"), slots=32, slot_bytes=1024)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_write, args=(path, 2000)) for _ in range(2)]
+    processes += [multiprocessing.Process(target=_read, args=(path, 0.5, results)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+    outcomes = [results.get(timeout=5) for _ in range(2)]
+    assert all(bad == 0 for _, bad in outcomes)
+    assert sum(hits for hits, _ in outcomes) > 0
@@ -0,0 +1,57 @@
+import json
+
+from combined_analysis import parse_combined_response
+from structured_output import (DEFAULT_DIFFICULTY, DIFFICULTY_LEVELS, IncrementalJSONParser, difficulty_from_text,
+                               parse_structured_summary, validate_field)
+
+COMPLETE = json.dumps({
+    "summary": "Cells divide by mitosis.\nEach daughter cell gets a copy of the genome.",
+    "key_concepts": ["mitosis", "chromosomes"],
+    "difficulty_level": "Beginner",
+})
+
+
+def test_complete_output_is_validated():
+    assert parse_structured_summary(COMPLETE) == json.loads(COMPLETE)
+
+
+def test_incremental_parser_streams_the_summary():
+    parser = IncrementalJSONParser()
+    deltas, fields = [], {}
+    for i in range(0, len(COMPLETE), 7):
+        for kind, key, value in parser.feed(COMPLETE[i:i + 7]):
+            if kind == "delta" and key == "summary":
+                deltas.append(value)
+            elif kind == "field":
+                fields[key] = value
+    assert parser.complete
+    assert "".join(deltas) == json.loads(COMPLETE)["summary"]
+    assert fields == json.loads(COMPLETE)
+
+
+def test_truncated_output_keeps_the_recovered_fields():
+    truncated = '{"summary": "Cells divide by mitosis", "key_concepts": ["mitosis", "chrom'
+    assert parse_structured_summary(truncated) == {"summary": "Cells divide by mitosis"}
+    assert parse_structured_summary("not json at all") == {}
+
+
+def test_near_misses_are_coerced():
+    assert validate_field("key_concepts", "mitosis, - meiosis, ") == ["mitosis", "meiosis"]
+    assert validate_field("difficulty_level", "intermediate (some algebra)") == "Intermediate"
+    assert validate_field("difficulty_level", "Medium") is None
+    assert validate_field("key_concepts", 3) is None
+
+
+def test_fallback_difficulty_is_a_valid_level():
+    assert DEFAULT_DIFFICULTY in DIFFICULTY_LEVELS
+    assert difficulty_from_text("Medium") == DEFAULT_DIFFICULTY
+    assert difficulty_from_text("") == DEFAULT_DIFFICULTY
+    assert difficulty_from_text(" advanced\n") == "Advanced"
+
+
+def test_single_pass_difficulty_falls_back_to_a_valid_level():
+    parsed = parse_combined_response("### DOMAIN CHECK\nrelated: yes; confidence: 0.9\n\n### SUMMARY\nCells.\n")
+    assert parsed["is_domain"] and parsed["confidence"] == 0.9
+    assert parsed["difficulty_level"] == DEFAULT_DIFFICULTY
+    parsed = parse_combined_response("### SUMMARY\nCells.\n### DIFFICULTY\nBeginner\n")
+    assert parsed["difficulty_level"] == "Beginner"
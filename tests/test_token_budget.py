@@ -0,0 +1,78 @@
+import asyncio
+
+import ollama_client
+import token_budget
+from long_document import truncate_to_tokens
+from token_budget import (COMPLETION_BUDGETS, CONTEXT_MARGIN, MIN_NUM_PREDICT, OLLAMA_NUM_CTX, TokenUsage,
+                          budgeted_options, completion_budget, estimate_tokens)
+
+
+def test_estimate_tokens_counts_words_numbers_and_punctuation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("the cell splits") == 3
+    # Long words split every ~6 letters, numbers every 3 digits
+    assert estimate_tokens("photosynthesis") == 3
+    assert estimate_tokens("12345") == 2
+    assert estimate_tokens("Hi, there!\n\n") == 5
+
+
+def test_completion_budget_grows_with_the_document_within_the_stage_range():
+    low, high = COMPLETION_BUDGETS["summary"]
+    assert completion_budget("summary", 0, 100) == low
+    assert low < completion_budget("summary", 1000, 100) < high
+    assert completion_budget("summary", 100_000, 100) == high
+    assert completion_budget("summary", 1000, 100, advanced=True) > completion_budget("summary", 1000, 100)
+
+
+def test_completion_budget_fits_the_context_window():
+    prompt_tokens = OLLAMA_NUM_CTX - 500
+    assert completion_budget("summary", 10_000, prompt_tokens) == 500 - CONTEXT_MARGIN
+    assert completion_budget("summary", 10_000, OLLAMA_NUM_CTX) == MIN_NUM_PREDICT
+
+
+def test_budgeted_options_only_sets_num_predict():
+    options = {"temperature": 0.8, "num_predict": 2000}
+    budgeted, prompt_tokens = budgeted_options(options, "roadmap", "Summarize the cell cycle.", 5)
+    assert budgeted == {"temperature": 0.8, "num_predict": completion_budget("roadmap", 5, prompt_tokens)}
+    assert prompt_tokens == estimate_tokens("Summarize the cell cycle.")
+    assert options["num_predict"] == 2000
+    assert "num_ctx" not in budgeted
+
+
+def test_token_usage_report():
+    usage = TokenUsage()
+    usage.plan("summary", 120, 400)
+    usage.record("summary", {"prompt_eval_count": 118, "eval_count": 350})
+    usage.plan("roadmap", 110, 400)
+    usage.record("roadmap", {"prompt_eval_count": None})
+    report = usage.report()
+    assert report["summary"] == {"calls": 1, "estimated_prompt_tokens": 120, "num_predict": 400,
+                                 "prompt_tokens": 118, "completion_tokens": 350}
+    assert report["total"] == {"prompt_tokens": 118, "completion_tokens": 350}
+
+
+def test_truncate_to_tokens_cuts_at_a_word_boundary():
+    text = "mitosis " * 2000
+    cut = truncate_to_tokens(text, 100)
+    assert len(cut) < len(text)
+    assert cut.endswith("mitosis")
+    assert truncate_to_tokens("short text", 100) == "short text"
+
+
+def test_every_call_sends_the_same_num_ctx(monkeypatch):
+    sent = []
+
+    async def fake_call(method, timeout=None, **kwargs):
+        sent.append(kwargs["options"])
+        return {"response": "ok"}
+
+    monkeypatch.setattr(ollama_client, "_call", fake_call)
+
+    async def run():
+        await ollama_client.generate(model="llama3:8b", prompt="hi", options={"num_predict": 10})
+        await ollama_client.generate(model="llama3:8b", prompt="hi")
+        await ollama_client.chat(model="llama3:8b", messages=[])
+
+    asyncio.run(run())
+    assert [options["num_ctx"] for options in sent] == [token_budget.OLLAMA_NUM_CTX] * 3
+    assert sent[0]["num_predict"] == 10
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+import verdict_cache
+from verdict_cache import VerdictCache, cached_llm_check, simhash
+
+NOTES = (
+    "Photosynthesis converts light energy into chemical energy. Chlorophyll in the chloroplasts absorbs "
+    "light, water is split to release oxygen, and the Calvin cycle fixes carbon dioxide into glucose. "
+    "The light reactions happen in the thylakoid membranes and produce ATP and NADPH for the cycle."
+)
+
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def test_simhash_is_stable_and_normalized():
+    assert simhash(NOTES) == simhash(NOTES)
+    assert simhash(NOTES) == simhash(NOTES.upper().replace(".", " ."))
+    assert simhash("") == 0
+
+
+def test_small_edits_stay_within_the_near_duplicate_distance():
+    edited = NOTES.replace("Chlorophyll", "Chlorophyl")
+    assert distance(simhash(NOTES), simhash(edited)) <= verdict_cache.VERDICT_MAX_DISTANCE
+    unrelated = "Derivatives measure how a function changes as its input changes; integrals accumulate area."
+    assert distance(simhash(NOTES), simhash(unrelated)) > verdict_cache.VERDICT_MAX_DISTANCE
+
+
+def test_near_duplicate_lookup():
+    cache = VerdictCache(max_entries=8, max_distance=3)
+    fingerprint = simhash(NOTES)
+    cache.set("biology", fingerprint, (True, 0.9))
+
+    assert cache.get("biology", fingerprint) == (True, 0.9)
+    assert cache.get("biology", fingerprint ^ 0b101) == (True, 0.9)
+    # Four flipped bits is past the distance; another domain never shares verdicts
+    assert cache.get("biology", fingerprint ^ 0b1111) is None
+    assert cache.get("math", fingerprint) is None
+    assert cache.stats() == {"hits": 2, "near_duplicate_hits": 1, "misses": 2, "entries": 1}
+
+
+def test_eviction_removes_band_index_entries():
+    cache = VerdictCache(max_entries=1)
+    cache.set("biology", 1, (True, 0.9))
+    cache.set("biology", (1 << 64) - 2, (False, 0.1))
+    assert cache.get("biology", 1) is None
+    assert all(1 not in bucket for bucket in cache._band_index.values())
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = VerdictCache()
+    monkeypatch.setattr(verdict_cache, "_verdict_cache", cache)
+    return cache
+
+
+def test_cached_llm_check_reuses_verdicts_for_edited_text(fresh_cache):
+    calls = []
+
+    async def llm_check(text):
+        calls.append(text)
+        return True, 0.85
+
+    async def run():
+        assert await cached_llm_check("biology", NOTES, llm_check) == (True, 0.85)
+        assert await cached_llm_check("biology", NOTES.replace("glucose", "glucose."), llm_check) == (True, 0.85)
+
+    asyncio.run(run())
+    assert len(calls) == 1
+
+
+def test_failed_checks_are_not_cached(fresh_cache):
+    calls = []
+
+    async def llm_check(text):
+        calls.append(text)
+        return False, 0.0
+
+    async def run():
+        await cached_llm_check("biology", NOTES, llm_check)
+        await cached_llm_check("biology", NOTES, llm_check)
+
+    asyncio.run(run())
+    assert len(calls) == 2